@@ -0,0 +1,311 @@
+"""
+音频采集模块
+整个程序只打开一次麦克风输入流，用回调模式按10~30ms的小周期采集，
+回调里把音频写进固定大小的NumPy环形缓冲区，再推给各个读取器的无锁队列，
+识别线程从读取器取音频；新读取器可以从过去几百毫秒开始读（预录），
+连续识别时也可以从上一句话结束的位置接着读，两句话之间说的话不会丢，
+不管用户说多久，占用的内存都不变
+麦克风按设备原生采样率打开，回调里重采样到16kHz再写缓冲区
+FileAudioSource用同样的接口回放WAV/PCM文件，可以在没有麦克风的机器上测试识别速度和准确率
+"""
+
+import os
+import queue
+import time
+import wave
+
+import numpy as np
+import pyaudio
+
+from resampler import PolyphaseResampler
+from config import AUDIO_RING_SECONDS, AUDIO_PRE_ROLL_MS, AUDIO_PERIOD_MS, AUDIO_DEVICE_RATE
+
+
+class RingBuffer:
+    """int16单声道环形缓冲区，用累计写入的样本数作为绝对位置"""
+
+    def __init__(self, capacity, buffer=None):
+        """buffer可以传入共享内存上的数组，供其他进程读取"""
+        self.buffer = buffer if buffer is not None else np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.written = 0  # 累计写入的样本数
+
+    def write(self, samples):
+        """写入样本，超过容量时覆盖最旧的数据"""
+        # 一次写入超过容量时只有最后capacity个样本有用
+        skipped = max(0, len(samples) - self.capacity)
+        self.written += skipped
+        samples = samples[skipped:]
+        start = self.written % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        self.buffer[:len(samples) - first] = samples[first:]
+        self.written += len(samples)
+
+    def oldest(self):
+        """缓冲区里最旧样本的绝对位置"""
+        return max(0, self.written - self.capacity)
+
+    def read(self, position):
+        """
+        读取从绝对位置到最新的所有样本
+
+        Returns:
+            tuple: (样本数组副本, 实际开始的位置)，位置太旧已被覆盖时从最旧的样本开始
+        """
+        position = max(position, self.oldest())
+        count = self.written - position
+        if count <= 0:
+            return np.zeros(0, dtype=np.int16), self.written
+        start = position % self.capacity
+        first = min(count, self.capacity - start)
+        samples = np.concatenate([self.buffer[start:start + first], self.buffer[:count - first]])
+        return samples, position
+
+
+class AudioReader:
+    """音频读取器，每次识别一个，用完关闭；采集回调把每个周期的音频放进它的队列"""
+
+    def __init__(self, capture, position, subscriber):
+        self.capture = capture
+        self.position = position  # 下一个要读的样本的绝对位置
+        self.queue = subscriber
+        self.finished = False  # 麦克风永远有数据，文件回放读完时为True
+        # 预录部分直接从环形缓冲区拷贝（开始位置离最旧的数据至少留了一段余量，不会和回调正在覆盖的部分重叠）
+        pre_roll, start = capture.ring.read(position)
+        # 接着上一句话读时可能积压了几秒，按采集周期切开，端点检测还是一小段一小段地处理
+        period = max(1, int(capture.rate * capture.period_ms / 1000))
+        self.pending = [(start + i, pre_roll[i:i + period]) for i in range(0, len(pre_roll), period)] or [(start, pre_roll)]
+
+    def read(self, min_samples=1, timeout=None):
+        """
+        读取新音频，凑够min_samples个样本或超时后返回
+
+        Returns:
+            bytes: 16位PCM数据，超时且没有新数据时为空
+        """
+        chunks = []
+        count = 0
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while count < min_samples:
+            if self.pending:
+                position, samples = self.pending.pop(0)
+            else:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                try:
+                    position, samples = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            # 订阅和拷贝预录之间的周期可能重复收到，去掉已经读过的部分
+            skip = max(0, self.position - position)
+            if skip >= len(samples):
+                continue
+            chunks.append(samples[skip:])
+            count += len(samples) - skip
+            self.position = position + len(samples)
+        if not chunks:
+            return b''
+        return np.concatenate(chunks).tobytes()
+
+    def close(self):
+        """停止接收音频"""
+        self.capture.unsubscribe(self.queue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AudioCapture:
+    def __init__(self, audio, rate=16000, period_ms=AUDIO_PERIOD_MS, ring_seconds=AUDIO_RING_SECONDS,
+                 device_rate=AUDIO_DEVICE_RATE):
+        """
+        初始化音频采集
+
+        Args:
+            audio (pyaudio.PyAudio): PyAudio实例
+            rate (int): 输出采样率（缓冲区和识别器使用的采样率）
+            period_ms (int): 采集周期（毫秒），越小端点检测反应越快
+            ring_seconds (float): 环形缓冲区保存最近多少秒音频
+            device_rate (int): 麦克风打开的采样率，None时用默认输入设备的采样率
+        """
+        self.audio = audio
+        self.rate = rate
+        self.period_ms = period_ms
+        self.device_rate = device_rate
+        self.resampler = None
+        self.ring = RingBuffer(int(rate * ring_seconds))
+        # 订阅队列用元组保存，增删时整体替换，回调遍历时不需要加锁
+        self.subscribers = ()
+        self.stream = None
+        self.overflows = 0
+
+    def start(self):
+        """打开输入流并开始采集，已经在采集时什么都不做"""
+        if self.stream and self.stream.is_active():
+            return
+        device_rate = int(self.device_rate or self.default_device_rate())
+        try:
+            self.open_stream(device_rate)
+        except Exception as e:
+            if device_rate == self.rate:
+                raise
+            # 少数驱动报告的默认采样率打不开，退回直接按输出采样率打开
+            print(f"⚠️ 按 {device_rate}Hz 打开麦克风失败（{str(e)}），改用 {self.rate}Hz")
+            device_rate = self.rate
+            self.open_stream(device_rate)
+        self.stream.start_stream()
+        resample = f"，重采样到 {self.rate}Hz" if self.resampler else ""
+        print(f"🎙️ 麦克风输入流已打开（{device_rate}Hz{resample}，周期 {self.period_ms}ms）")
+
+    def default_device_rate(self):
+        """默认输入设备的原生采样率，查询失败时用输出采样率"""
+        try:
+            return self.audio.get_default_input_device_info()['defaultSampleRate']
+        except Exception:
+            return self.rate
+
+    def open_stream(self, device_rate):
+        # 先建好重采样器再打开输入流，回调一开始就能用
+        self.resampler = PolyphaseResampler(device_rate, self.rate) if device_rate != self.rate else None
+        self.stream = self.audio.open(
+            format=pyaudio.paInt16,
+            channels=1,
+            rate=device_rate,
+            input=True,
+            frames_per_buffer=int(device_rate * self.period_ms / 1000),
+            stream_callback=self._callback
+        )
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio采集回调：只做写缓冲区和入队，必须很快返回"""
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        if self.resampler:
+            samples = self.resampler.process(samples)
+        position = self.ring.written
+        self.ring.write(samples)
+        for subscriber in self.subscribers:
+            subscriber.put((position, samples))
+        return (None, pyaudio.paContinue)
+
+    def reader(self, pre_roll_ms=AUDIO_PRE_ROLL_MS, position=None):
+        """
+        创建读取器，用完要close（或用with）
+
+        Args:
+            pre_roll_ms (int): 从多少毫秒之前开始读，避免开头的音节被截掉
+            position (int): 从这个绝对位置接着读（上一个读取器读到的位置），已经被覆盖时退回预录
+        """
+        # 留一秒余量，拷贝时回调不会正好覆盖到开始位置
+        if position is None or position < self.ring.oldest() + self.rate or position > self.ring.written:
+            if position is not None:
+                print("⚠️ 上一句话之后的音频已经被覆盖，从预录开始识别")
+            position = max(self.ring.oldest(), self.ring.written - int(self.rate * pre_roll_ms / 1000))
+        # 先订阅再拷贝预录，中间到达的周期靠位置去重，不会漏掉
+        subscriber = queue.SimpleQueue()
+        self.subscribers = self.subscribers + (subscriber,)
+        return AudioReader(self, position, subscriber)
+
+    def unsubscribe(self, subscriber):
+        """移除订阅队列"""
+        self.subscribers = tuple(q for q in self.subscribers if q is not subscriber)
+
+    def stop(self):
+        """停止采集并关闭输入流"""
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+
+
+def load_audio_file(path, rate=16000):
+    """
+    读取WAV或裸PCM文件（.pcm/.raw按16位单声道、目标采样率处理）
+
+    Returns:
+        np.ndarray: int16单声道样本
+    """
+    if os.path.splitext(path)[1].lower() in ('.pcm', '.raw'):
+        with open(path, 'rb') as f:
+            return np.frombuffer(f.read(), dtype=np.int16)
+
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"只支持16位WAV: {path}")
+        if f.getframerate() != rate:
+            raise ValueError(f"WAV采样率是 {f.getframerate()}Hz，需要 {rate}Hz: {path}")
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        if f.getnchannels() > 1:
+            samples = samples.reshape(-1, f.getnchannels()).mean(axis=1).astype(np.int16)
+    return samples
+
+
+class FileAudioReader:
+    """文件回放的读取器，接口和AudioReader一致"""
+
+    def __init__(self, source, position):
+        self.source = source
+        self.position = position
+
+    @property
+    def finished(self):
+        return self.position >= len(self.source.samples)
+
+    def read(self, min_samples=1, timeout=None):
+        """读取下一段音频，实时模式下按音频时长等待，否则立即返回"""
+        end = min(self.position + max(min_samples, self.source.period), len(self.source.samples))
+        data = self.source.samples[self.position:end]
+        if self.source.realtime and len(data):
+            time.sleep(len(data) / self.source.rate)
+        self.position = end
+        self.source.cursor = max(self.source.cursor, end)
+        return data.tobytes()
+
+    def close(self):
+        pass
+
+
+class FileAudioSource:
+    def __init__(self, path, rate=16000, period_ms=AUDIO_PERIOD_MS, trailing_silence_ms=1000, realtime=False):
+        """
+        文件音频源，代替AudioCapture把文件送进同一套识别和端点检测流程
+
+        Args:
+            path (str): WAV或PCM文件
+            rate (int): 采样率
+            period_ms (int): 每次至少读多少毫秒
+            trailing_silence_ms (int): 文件末尾补多少静音，让端点检测有机会按静音结束
+            realtime (bool): 是否按实际时长回放（默认尽快处理）
+        """
+        self.path = path
+        self.rate = rate
+        self.period = int(rate * period_ms / 1000)
+        self.realtime = realtime
+        audio = load_audio_file(path, rate)
+        self.duration = len(audio) / rate
+        self.samples = np.concatenate([audio, np.zeros(int(rate * trailing_silence_ms / 1000), dtype=np.int16)])
+        self.cursor = 0  # 已经读到的位置，下一个读取器从这里（减去预录）开始
+
+    @property
+    def finished(self):
+        return self.cursor >= len(self.samples)
+
+    def start(self):
+        pass
+
+    def reader(self, pre_roll_ms=AUDIO_PRE_ROLL_MS, position=None):
+        if position is None:
+            position = max(0, self.cursor - int(self.rate * pre_roll_ms / 1000))
+        return FileAudioReader(self, position)
+
+    def stop(self):
+        pass
@@ -0,0 +1,164 @@
+"""
+插话（barge-in）检测模块
+桌宠说话时麦克风继续采集，用正在播放的TTS音频作参考估计回声能量：
+开头一小段播放时学习扬声器到麦克风的耦合强度，之后麦克风能量明显高于估计的回声才算用户在说话，
+连续说话一段时间就触发插话，停止播放并开始新一轮对话
+没有参考音频（比如本地TTS）时退化为自适应门限：学习播放时的回声电平，超出一定余量才算用户说话
+
+用法（用录好的WAV测试）：
+    python barge_in.py 麦克风录音.wav [TTS参考音频.wav]
+"""
+
+import sys
+import wave
+
+import numpy as np
+
+from vad import frame_energies_db, split_frames
+from config import (BARGE_IN_MARGIN_DB, BARGE_IN_MIN_SPEECH_MS, BARGE_IN_LEARN_MS, BARGE_IN_MAX_DELAY_MS,
+                    BARGE_IN_HANGOVER_MS)
+
+# 参考音频能量低于这个值的帧（停顿）不用来学习耦合强度
+REFERENCE_SILENCE_DB = -60.0
+
+
+class EchoGate:
+    def __init__(self, rate=16000, frame_ms=10, margin_db=BARGE_IN_MARGIN_DB,
+                 min_speech_ms=BARGE_IN_MIN_SPEECH_MS, learn_ms=BARGE_IN_LEARN_MS,
+                 max_delay_ms=BARGE_IN_MAX_DELAY_MS, hangover_ms=BARGE_IN_HANGOVER_MS):
+        """
+        初始化回声门
+
+        Args:
+            rate (int): 麦克风采样率
+            frame_ms (int): 判断的帧长（毫秒）
+            margin_db (float): 麦克风能量比估计的回声高多少dB算用户在说话
+            min_speech_ms (int): 用户连续说话多久触发插话
+            learn_ms (int): 播放开始后多久用来学习回声强度（这段时间不检测插话）
+            max_delay_ms (int): 扬声器到麦克风的最大延迟，参考音频在这个窗口内取最大能量
+            hangover_ms (int): 用户的声音停了之后还算在说话多久，字间停顿时不丢掉攒着的人声
+        """
+        self.rate = rate
+        self.frame_ms = frame_ms
+        self.frame_size = int(rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.learn_ms = learn_ms
+        self.delay_frames = max(1, int(max_delay_ms / frame_ms))
+        self.hangover_frames = int(hangover_ms / frame_ms)
+        self.active = False
+        self.triggered = False
+
+    def start(self, reference=None):
+        """
+        开始播放
+
+        Args:
+            reference (np.ndarray): 正在播放的音频（与麦克风同采样率的int16单声道），None时用自适应门限
+        """
+        self.reference_db = None
+        if reference is not None and len(reference) >= self.frame_size:
+            energy = frame_energies_db(split_frames(reference, self.frame_size))
+            # 回声会延迟到达，每帧取它之前一段窗口内的最大能量
+            padded = np.concatenate([np.full(self.delay_frames - 1, -100.0), energy])
+            self.reference_db = np.lib.stride_tricks.sliding_window_view(padded, self.delay_frames).max(axis=1)
+        self.coupling_db = -100.0  # 参考音频到麦克风的能量差
+        self.echo_floor_db = -100.0  # 没有参考音频时是学到的回声电平，有参考音频时是房间底噪
+        self.speech_frames = 0
+        self.hangover_left = 0
+        self.triggered = False
+        self.active = True
+
+    def stop(self):
+        """播放结束"""
+        self.active = False
+
+    def estimate_echo_db(self, frame_times_ms):
+        """估计每帧麦克风里的回声能量"""
+        if self.reference_db is None:
+            return np.full(len(frame_times_ms), self.echo_floor_db)
+        index = (frame_times_ms / self.frame_ms).astype(np.int64)
+        echo = np.full(len(index), -100.0)
+        inside = (index >= 0) & (index < len(self.reference_db))
+        echo[inside] = self.reference_db[index[inside]] + self.coupling_db
+        return echo
+
+    def process(self, samples, elapsed_ms):
+        """
+        处理播放期间的一段麦克风音频
+
+        Args:
+            samples (np.ndarray): int16麦克风样本
+            elapsed_ms (float): 这段音频开头距离播放开始的毫秒数
+
+        Returns:
+            tuple: (这段里有没有用户说话（含说话后的短暂停顿）, 是否刚刚触发插话)
+        """
+        frames = split_frames(samples, self.frame_size)
+        if not self.active or len(frames) == 0:
+            return False, False
+
+        mic_db = frame_energies_db(frames)
+        frame_times = elapsed_ms + np.arange(len(frames)) * self.frame_ms
+
+        # 播放开始的一小段用来学习回声强度
+        learning = frame_times < self.learn_ms
+        if learning.any():
+            if self.reference_db is None:
+                self.echo_floor_db = max(self.echo_floor_db, float(mic_db[learning].max()))
+            else:
+                # 最安静的帧近似房间底噪，参考音频停顿时用它兜底
+                self.echo_floor_db = max(self.echo_floor_db, float(mic_db[learning].min()))
+                reference = self.estimate_echo_db(frame_times[learning]) - self.coupling_db
+                audible = reference > REFERENCE_SILENCE_DB
+                if audible.any():
+                    coupling = mic_db[learning][audible] - reference[audible]
+                    self.coupling_db = max(self.coupling_db, float(coupling.max()))
+            if learning.all():
+                return False, False
+
+        echo_db = np.maximum(self.estimate_echo_db(frame_times), self.echo_floor_db)
+        user = (mic_db > echo_db + self.margin_db) & ~learning
+
+        triggered_now = False
+        in_speech = False
+        for is_user in user:
+            self.speech_frames = self.speech_frames + 1 if is_user else 0
+            if self.speech_frames >= self.min_speech_frames and not self.triggered:
+                self.triggered = triggered_now = True
+            if is_user:
+                self.hangover_left = self.hangover_frames
+                in_speech = True
+            elif self.hangover_left > 0:
+                self.hangover_left -= 1
+                in_speech = True
+        return in_speech, triggered_now
+
+
+def read_wav(path):
+    """读取16位单声道WAV"""
+    with wave.open(path, 'rb') as f:
+        rate = f.getframerate()
+        samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        if f.getnchannels() > 1:
+            samples = samples.reshape(-1, f.getnchannels()).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+
+# 用录好的WAV测试插话检测
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    mic, rate = read_wav(sys.argv[1])
+    reference = read_wav(sys.argv[2])[0] if len(sys.argv) >= 3 else None
+    gate = EchoGate(rate)
+    gate.start(reference)
+    chunk = int(rate * 0.1)
+    for start in range(0, len(mic), chunk):
+        _, triggered = gate.process(mic[start:start + chunk], start * 1000 / rate)
+        if triggered:
+            print(f"🗣️ 在 {start * 1000 / rate:.0f}ms 处检测到插话")
+            break
+    else:
+        print("🔇 没有检测到插话")
@@ -0,0 +1,135 @@
+"""
+语音指令识别模块
+用小模型加限定语法（只认几条指令和桌宠的名字）再开一个KaldiRecognizer，
+在自己的线程里读同一路麦克风音频，大模型正在解码长句时"停""别说了"说完一停顿就生效；
+也可以当唤醒词用：没叫名字之前大模型完全不解码
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+import vosk
+
+from vad import EnergyVAD, VoiceGate
+from recognizer_process import RecognizerProcess
+from config import VOSK_FEED_MS, RECOGNIZER_OUT_OF_PROCESS, RECOGNIZER_PROCESS_TIMEOUT
+
+
+def compact(text):
+    """去掉Vosk中文结果里词之间的空格"""
+    return ''.join(text.split())
+
+
+class CommandRecognizer:
+    def __init__(self, capture, model_path, commands, rate=16000, callback=None, allow_trailing=('wake',)):
+        """
+        初始化指令识别
+
+        Args:
+            capture: 音频源（AudioCapture），指令识别有自己的读取器
+            model_path (str): 支持动态语法的Vosk小模型目录（大模型不支持限定语法）
+            commands (dict): 指令名 -> 触发短语列表
+            rate (int): 采样率
+            callback (callable): 识别到指令时调用 callback(指令名, 短语)，在指令识别线程中执行
+            allow_trailing (tuple): 后面可以接着说别的话的指令（叫名字后直接提问）
+        """
+        self.capture = capture
+        self.rate = rate
+        self.callback = callback
+        self.allow_trailing = set(allow_trailing)
+        self.feed_samples = int(rate * VOSK_FEED_MS / 1000)
+        self.phrases = {compact(phrase): name for name, phrases in commands.items() for phrase in phrases}
+        # 短语的词之间用空格分开，[unk]吸收其他所有说话内容
+        grammar = json.dumps([phrase for phrases in commands.values() for phrase in phrases] + ["[unk]"],
+                             ensure_ascii=False)
+
+        if RECOGNIZER_OUT_OF_PROCESS:
+            self.rec = RecognizerProcess(model_path, rate, grammar)
+        else:
+            self.model = vosk.Model(model_path)
+            self.rec = vosk.KaldiRecognizer(self.model, rate, grammar)
+        # 安静时不解码，指令识别常驻也几乎不占CPU
+        self.gate = VoiceGate(EnergyVAD(rate))
+
+        self.running = False
+        self.thread = None
+        self.pending = None  # 已经听到、等停顿确认的指令 (指令名, 短语)
+
+        # 统计
+        self.detections = 0
+        self.cpu_time = 0.0  # 指令识别线程用掉的CPU时间（秒），独立进程时包括识别进程的解码时间
+
+    def start(self):
+        if self.running:
+            return
+        # stop()之后线程要等这次读音频超时才退出，先等它结束，不能两个线程同时喂识别器
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=RECOGNIZER_PROCESS_TIMEOUT + 1)
+            if self.thread.is_alive():
+                print("⚠️ 上次的语音指令线程还没有结束，暂不启动")
+                return
+        self.pending = None
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        print(f"👂 语音指令识别已启动: {', '.join(self.phrases)}")
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        """指令识别线程：只把有声音的音频送给限定语法的识别器，中间结果一出现指令就触发"""
+        self.capture.start()
+        cpu_start = time.thread_time()
+        process_cpu_start = getattr(self.rec, 'cpu_time', 0.0)
+        with self.capture.reader(pre_roll_ms=0) as reader:
+            while self.running:
+                data = reader.read(self.feed_samples, timeout=1)
+                if not data:
+                    continue
+                voiced, _ = self.gate.process(np.frombuffer(data, dtype=np.int16))
+                if voiced is not None:
+                    if self.rec.AcceptWaveform(voiced.tobytes()):
+                        self.check(json.loads(self.rec.Result()).get('text', ''), final=True)
+                    else:
+                        self.check(json.loads(self.rec.PartialResult()).get('partial', ''), final=False)
+                elif self.pending:
+                    # 说完指令停顿了，后面没有接着说别的
+                    self.trigger(*self.pending)
+                self.cpu_time = (time.thread_time() - cpu_start
+                                 + getattr(self.rec, 'cpu_time', 0.0) - process_cpu_start)
+
+    def check(self, text, final):
+        """
+        指令必须在句首（"我不想停"不算"停"）；叫名字后面可以跟别的话（"笨逼，今天天气怎么样"），
+        其他指令后面跟着别的话（"停车场在哪"）不算，要等到句子结束或者停顿才触发
+        """
+        words = text.split()
+        phrase = compact(' '.join(word for word in words if word != '[unk]'))
+        name = self.phrases.get(phrase) if words and words[0] != '[unk]' else None
+        self.pending = None
+        if not name:
+            return
+        if name in self.allow_trailing or (final and '[unk]' not in words):
+            self.trigger(name, phrase)
+        elif '[unk]' not in words:
+            self.pending = (name, phrase)
+
+    def trigger(self, name, phrase):
+        """触发指令，并重置识别器，避免同一句话重复触发"""
+        self.pending = None
+        self.detections += 1
+        self.rec.Reset()
+        print(f"👂 识别到语音指令[{name}]: {phrase}")
+        if self.callback:
+            self.callback(name, phrase)
+
+    def close(self):
+        self.stop()
+        if isinstance(self.rec, RecognizerProcess):
+            self.rec.close()
+
+    def get_stats(self):
+        return {'detections': self.detections, 'cpu_seconds': self.cpu_time}
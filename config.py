@@ -23,3 +23,112 @@ DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1/chat/completions"
 WINDOW_WIDTH = 400
 WINDOW_HEIGHT = 600
 WINDOW_TITLE = "AI桌宠"
+
+# 搜索配置
+SEARCH_CONTEXT_MAX_TOKENS = 300  # 搜索结果放进系统提示的token上限
+SEARCH_DEADLINE = 6  # 并发搜索的总等待时间（秒）
+SEARCH_MIN_RESULT_CHARS = 10  # 搜索结果至少多少字才算有效
+SERPER_API_KEY = os.environ.get("SERPER_API_KEY")  # 可选：Serper(Google)搜索的API Key
+SEARCH_CACHE_PATH = os.path.join(os.path.dirname(__file__), "search_cache.db")  # 搜索结果缓存数据库（和程序放在一起，不随工作目录变）
+SEARCH_CACHE_HIT_TTL = 24 * 3600  # 有结果的缓存有效期（秒）
+SEARCH_CACHE_MISS_TTL = 30 * 60  # 无结果的缓存有效期（秒）
+SPECULATIVE_MIN_CONFIDENCE = 0.6  # 说话过程中意图置信度达到多少才提前搜索
+SPECULATIVE_STABLE_PARTIALS = 2  # 关键词连续几次中间结果不变才提前搜索
+SPECULATIVE_MAX_LAUNCHES = 2  # 每句话最多提前搜索几次
+KNOWLEDGE_DIR = "knowledge"  # 本地知识库目录（Markdown/文本攻略）
+KNOWLEDGE_INDEX_DIR = "knowledge_index"  # 本地知识库索引目录
+ENRICH_ENABLED = True  # 搜索结果只有摘要时，抓取相关网页正文补充上下文
+ENRICH_MAX_SUMMARY_CHARS = 200  # 摘要短于这么多字才算只有摘要，需要补充正文
+ENRICH_MAX_PAGES = 3  # 最多抓取几个相关网页
+ENRICH_MAX_CONNECTIONS = 3  # 同时最多几个网页连接
+ENRICH_MAX_BYTES = 200 * 1024  # 每个网页最多下载多少字节
+ENRICH_DEADLINE = 2.5  # 抓取网页正文的总时间上限（秒）
+
+# 多模态配置
+VISION_MODELS = []  # 支持图像输入的模型ID（DeepSeek官方接口目前都不支持，换成兼容接口时再填）
+IMAGE_TOKEN_BUDGET = 1105  # 每张截图允许的估算token开销（85基础 + 每个512px图块170）
+
+# 连接预热配置
+CONNECTION_REFRESH_INTERVAL = 50  # 连接闲置超过多少秒后重新预热（秒）
+EDGE_TTS_HOST = "speech.platform.bing.com"  # Edge-TTS服务域名
+
+# 闲置聊天预生成配置
+IDLE_CHATTER_BUDGET_PER_HOUR = 6  # 每小时最多预生成几次（每次一个API调用）
+IDLE_CHATTER_CACHE_SIZE = 2  # 最多缓存几句
+IDLE_CHATTER_TTL = 600  # 预生成内容的有效期（秒）
+
+# 语义答案复用配置
+SEMANTIC_CACHE_PATH = "semantic_cache"  # 持久化文件路径（会生成 .npy 和 .json）
+SEMANTIC_CACHE_DIM = 2048  # 哈希向量维度
+SEMANTIC_CACHE_MAX_ENTRIES = 500  # 最多保存多少个问题
+SEMANTIC_CACHE_THRESHOLD = 0.75  # 复用答案的最低相似度
+
+# 语音模型下载配置
+VOSK_MODEL_URL = "https://alphacephei.com/vosk/models/vosk-model-cn-0.22.zip"
+VOSK_MODEL_SHA256 = None  # 模型压缩包的SHA-256（十六进制，填官网公布的值），None时不校验，只打印算出的值
+MODEL_DOWNLOAD_MIN_CHUNK = 64 * 1024  # 每次读取的最小字节数，网速快时自动加倍
+MODEL_DOWNLOAD_MAX_CHUNK = 4 * 1024 * 1024  # 每次读取的最大字节数
+MODEL_DOWNLOAD_RETRIES = 3  # 断线后自动续传几次
+
+# 语音采集配置
+AUDIO_RING_SECONDS = 10  # 环形缓冲区保存最近多少秒音频
+AUDIO_PRE_ROLL_MS = 300  # 开始识别时往前多读多少毫秒，避免开头的音节被截掉
+AUDIO_PERIOD_MS = 20  # 采集周期（毫秒），10~30ms
+AUDIO_DEVICE_RATE = None  # 麦克风按多少采样率打开，None时用设备默认采样率（再重采样到16kHz）
+VOSK_FEED_MS = 100  # 每次送给Vosk识别的音频长度（毫秒），和采集周期分开设置
+
+# 语音端点检测配置（毫秒）
+ENDPOINT_SPEECH_START_MS = 60  # 连续有声音多久才算开始说话
+ENDPOINT_END_SILENCE_MS = 800  # 说话后静音多久一定结束
+ENDPOINT_HANGOVER_MS = 250  # 说话后至少静音多久才允许提前结束
+ENDPOINT_PARTIAL_STABLE_MS = 400  # 识别中间结果多久不变算说完
+ENDPOINT_MAX_UTTERANCE_MS = 15000  # 一句话最长多久
+ENDPOINT_ENERGY_DB = -45  # 能量超过多少dBFS算有声音
+
+# 语音活动检测(VAD)配置
+VAD_FRAME_MS = 10  # 判断人声的帧长（毫秒）
+VAD_MARGIN_DB = 10  # 能量比噪声底高多少dB算人声
+VAD_MIN_DB = -50  # 能量至少多少dBFS才算人声
+VAD_ZCR_MAX = 0.35  # 过零率上限，超过像是嘶嘶的噪声
+VAD_NOISE_WINDOW_MS = 3000  # 用最近多少毫秒的音频估计噪声底
+VAD_NOISE_PERCENTILE = 10  # 窗口内帧能量的这个分位数当作噪声底
+VAD_PRE_ROLL_MS = 200  # 检测到人声时一起送给识别器的前置音频
+VAD_HANGOVER_MS = 300  # 人声消失后继续送给识别器多久
+VAD_USE_WEBRTC = False  # 装了webrtcvad时改用WebRTC VAD
+
+# 插话（barge-in）配置
+BARGE_IN_ENABLED = True  # 桌宠说话时继续监听，用户开口就停止播放
+BARGE_IN_MARGIN_DB = 8  # 麦克风能量比估计的回声高多少dB算用户在说话
+BARGE_IN_MIN_SPEECH_MS = 200  # 用户连续说话多久触发插话
+BARGE_IN_HANGOVER_MS = 150  # 疑似用户说话的声音停了多久才丢掉攒着的人声（字与字之间的停顿不算）
+BARGE_IN_LEARN_MS = 400  # 播放开始后多久用来学习回声强度
+BARGE_IN_MAX_DELAY_MS = 200  # 扬声器到麦克风的最大延迟
+
+# 识别进程配置
+RECOGNIZER_OUT_OF_PROCESS = True  # Vosk解码放到独立进程（False时在主进程的识别线程里解码）
+RECOGNIZER_PROCESS_TIMEOUT = 5  # 单次识别请求最多等多久（秒），超时自动重启识别进程
+
+# 语音指令配置
+COMMAND_MODEL_PATH = "vosk_model_small_cn"  # 指令识别用的Vosk小模型（大模型不支持限定语法）
+VOICE_COMMANDS = {  # 指令名 -> 触发短语（词之间用空格分开，每个词都要在模型词表里）
+    'stop': ["停", "停 下", "别 说 了", "不要 说 了", "闭嘴", "安静"],
+    'wake': ["笨 逼"],
+}
+WAKE_WORD_REQUIRED = False  # 是否要先叫名字才开始完整识别
+WAKE_WINDOW_SECONDS = 10  # 叫过名字（或者说过话）之后多久内不用再叫
+
+# 大小模型配合识别配置
+DUAL_MODEL_ENABLED = False  # 小模型实时出中间结果和判断句尾，大模型只解码确认说话的那段音频
+SMALL_MODEL_URL = "https://alphacephei.com/vosk/models/vosk-model-small-cn-0.22.zip"  # 小模型装到COMMAND_MODEL_PATH
+SMALL_MODEL_SHA256 = None  # 小模型压缩包的SHA-256，同VOSK_MODEL_SHA256
+RESCORE_TIMEOUT = 3  # 句子结束后最多等大模型多久（秒），超时用小模型的结果
+
+# 在线语音识别配置（VoiceHandler）
+MIC_NOISE_WINDOW_SECONDS = 5  # 用最近多少秒的音频估计噪声底
+MIC_NOISE_PERCENTILE = 20  # 窗口内能量的这个分位数当作噪声底（说话中的停顿也能测到噪声）
+MIC_ENERGY_RATIO = 1.5  # 能量门限 = 噪声底 × 这个倍数
+MIC_MIN_ENERGY_THRESHOLD = 100  # 能量门限下限，完全安静时不至于把电流声当成说话
+MIC_PHRASE_TIME_LIMIT = 15  # 单句最长录多少秒
+RECOGNITION_LANGUAGES = ['zh-CN', 'zh-TW', 'zh-HK']  # 同时发给在线识别的语言，排在前面的优先
+RECOGNITION_POLICY = 'priority'  # first：最先返回的非空结果；priority：前面的语言都没听清才用后面的；combine：等全部返回后取多数
+RECOGNITION_TIMEOUT = 8  # 在线识别最多等多久（秒）
@@ -0,0 +1,131 @@
+"""
+连接预热模块
+启动时以及用户开始说话时，提前建立到DeepSeek的HTTPS连接、解析Edge-TTS的域名，
+等真正发请求时连接池已经是热的，省掉DNS/TCP/TLS握手时间
+"""
+
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from config import CONNECTION_REFRESH_INTERVAL
+
+
+class ConnectionWarmer:
+    def __init__(self, session, urls, dns_hosts=(), refresh_interval=CONNECTION_REFRESH_INTERVAL):
+        """
+        初始化连接预热器
+
+        Args:
+            session (requests.Session): 真正发请求用的会话，预热的连接留在它的连接池里
+            urls (list): 需要保持HTTPS连接的地址
+            dns_hosts (list): 只能预解析域名的主机（如Edge-TTS每次新建websocket）
+            refresh_interval (float): 连接多久没用就重新预热（秒），要小于服务端的空闲断开时间
+        """
+        self.session = session
+        self.urls = list(urls)
+        self.dns_hosts = list(dns_hosts)
+        self.refresh_interval = refresh_interval
+
+        self.last_warm_time = 0.0
+        self.is_warming = False
+        self.lock = threading.Lock()
+
+        # 统计：冷连接和热连接的探测耗时，以及用上热连接的请求数
+        self.cold_times = []
+        self.hot_times = []
+        self.dns_times = []
+        self.warm_requests = 0
+        self.cold_requests = 0
+
+    def is_hot(self):
+        """连接池是否还在有效期内"""
+        return time.time() - self.last_warm_time < self.refresh_interval
+
+    def warm(self):
+        """同步预热所有连接"""
+        was_hot = self.is_hot()
+
+        for host in self.dns_hosts:
+            start_time = time.perf_counter()
+            try:
+                socket.getaddrinfo(host, 443, proto=socket.IPPROTO_TCP)
+                self.dns_times.append(time.perf_counter() - start_time)
+            except OSError as e:
+                print(f"⚠️ 域名预解析失败 {host}: {str(e)}")
+
+        for url in self.urls:
+            start_time = time.perf_counter()
+            try:
+                # 任何响应都行，目的只是让连接留在连接池里
+                self.session.head(url, timeout=5)
+                elapsed = time.perf_counter() - start_time
+                if was_hot:
+                    self.hot_times.append(elapsed)
+                else:
+                    self.cold_times.append(elapsed)
+                    # 冷连接后紧接着再探测一次，采样热连接的往返时间，用于估算节省
+                    if len(self.hot_times) < 5:
+                        start_time = time.perf_counter()
+                        self.session.head(url, timeout=5)
+                        self.hot_times.append(time.perf_counter() - start_time)
+            except Exception as e:
+                print(f"⚠️ 连接预热失败 {urlsplit(url).netloc}: {str(e)}")
+                return
+
+        self.last_warm_time = time.time()
+
+    def warm_async(self, force=False):
+        """
+        在后台线程预热，已经在预热或连接还热着时直接返回
+
+        Args:
+            force (bool): 连接还热着也重新预热
+        """
+        with self.lock:
+            if self.is_warming or (not force and self.is_hot()):
+                return
+            self.is_warming = True
+
+        def _warm():
+            try:
+                self.warm()
+            finally:
+                self.is_warming = False
+
+        thread = threading.Thread(target=_warm)
+        thread.daemon = True
+        thread.start()
+
+    def on_voice_activity(self):
+        """检测到用户开始说话，趁用户说话时把连接准备好"""
+        self.warm_async()
+
+    def note_request(self):
+        """真正发请求前调用，记录这次请求是否用上了热连接"""
+        if self.is_hot():
+            self.warm_requests += 1
+        else:
+            self.cold_requests += 1
+        # 请求本身会刷新连接
+        self.last_warm_time = time.time()
+
+    def get_stats(self):
+        """
+        获取统计信息
+
+        冷探测包含DNS+TCP+TLS+一次往返，热探测只有一次往返，
+        两者之差就是每个用上热连接的请求省下的时间
+        """
+        avg_cold = sum(self.cold_times) / len(self.cold_times) if self.cold_times else 0.0
+        avg_hot = sum(self.hot_times) / len(self.hot_times) if self.hot_times else 0.0
+        saving = max(0.0, avg_cold - avg_hot)
+        return {
+            'avg_cold_ms': avg_cold * 1000,
+            'avg_hot_ms': avg_hot * 1000,
+            'avg_dns_ms': sum(self.dns_times) / len(self.dns_times) * 1000 if self.dns_times else 0.0,
+            'warm_requests': self.warm_requests,
+            'cold_requests': self.cold_requests,
+            'estimated_saved_ms': saving * 1000 * self.warm_requests
+        }
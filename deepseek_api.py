@@ -1,7 +1,10 @@
 import requests
 import json
-from config import DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL
+from config import DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL, VISION_MODELS
 from search_api import SearchAPI
+from intent_engine import INTENT_SEARCH
+from search_compressor import SearchContextCompressor, estimate_tokens
+from speculative_search import SpeculativeSearch
 
 class DeepSeekAPI:
     def __init__(self):
@@ -11,8 +14,14 @@ class DeepSeekAPI:
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
+        # 复用连接的会话，配合连接预热使用
+        self.session = requests.Session()
+        self.connection_warmer = None
         # 初始化搜索功能
         self.search_api = SearchAPI()
+        self.search_compressor = SearchContextCompressor()
+        # 用户说话过程中提前搜索
+        self.speculative_search = SpeculativeSearch(self.search_api)
         
         # 可用模型配置
         self.available_models = {
@@ -21,6 +30,9 @@ class DeepSeekAPI:
             "DeepSeek V3 (代码)": "deepseek-coder"
         }
         
+        # 支持图像输入的模型
+        self.vision_models = set(VISION_MODELS)
+        
         # 默认使用Chat模型（稳定可用）
         self.current_model_name = "DeepSeek V3 (Chat)"
         self.current_model = self.available_models[self.current_model_name]
@@ -44,27 +56,46 @@ class DeepSeekAPI:
         """获取可用模型列表"""
         return list(self.available_models.keys())
     
-    def chat(self, message, conversation_history=None):
+    def supports_images(self):
+        """当前模型是否接受图像输入"""
+        return self.current_model in self.vision_models
+    
+    def build_search_context(self, message):
+        """需要搜索时执行搜索，并把结果压缩成系统提示的附加内容"""
+        intent = self.search_api.classify(message)
+        if intent.kind != INTENT_SEARCH:
+            self.speculative_search.discard()
+            return ""
+
+        print(f"🔍 检测到搜索请求: {message} (置信度 {intent.confidence:.2f})")
+        search_query = intent.query
+        # 说话过程中已经提前搜过同样的关键词就直接用
+        search_result = self.speculative_search.claim(search_query)
+        if search_result is None:
+            search_result = self.search_api.search_web(search_query)
+        if not search_result:
+            return ""
+
+        compressed = self.search_compressor.compress(search_query, search_result)
+        print(f"✅ 搜索完成: {search_query} "
+              f"(约{estimate_tokens(search_result)} -> {estimate_tokens(compressed)} tokens)")
+        return f"\n\n[搜索结果参考信息]: {compressed}"
+    
+    def chat(self, message, conversation_history=None, allow_search=True):
         """
         发送消息到DeepSeek API并获取回复
         
         Args:
             message (str): 用户输入的消息
             conversation_history (list): 对话历史记录
+            allow_search (bool): 是否允许根据消息内容联网搜索
         
         Returns:
             str: AI的回复
         """
         try:
             # 检查是否需要搜索
-            search_context = ""
-            if self.search_api.is_search_query(message):
-                print(f"🔍 检测到搜索请求: {message}")
-                search_query = self.search_api.extract_search_query(message)
-                search_result = self.search_api.search_web(search_query)
-                if search_result:
-                    search_context = f"\n\n[搜索结果参考信息]: {search_result}"
-                    print(f"✅ 搜索完成: {search_query}")
+            search_context = self.build_search_context(message) if allow_search else ""
 
             # 构建消息列表
             messages = []
@@ -121,7 +152,9 @@ class DeepSeekAPI:
             }
             
             # 发送请求
-            response = requests.post(
+            if self.connection_warmer:
+                self.connection_warmer.note_request()
+            response = self.session.post(
                 self.base_url, 
                 headers=self.headers, 
                 json=data,
@@ -145,7 +178,7 @@ class DeepSeekAPI:
         
         Args:
             message (str): 用户输入的消息
-            image_base64 (str): base64编码的图像
+            image_base64 (str): base64编码的JPEG图像，当前模型不支持图像时忽略（可以传None，不用截图）
             conversation_history (list): 对话历史记录
         
         Returns:
@@ -153,14 +186,7 @@ class DeepSeekAPI:
         """
         try:
             # 检查是否需要搜索
-            search_context = ""
-            if self.search_api.is_search_query(message):
-                print(f"🔍 检测到搜索请求: {message}")
-                search_query = self.search_api.extract_search_query(message)
-                search_result = self.search_api.search_web(search_query)
-                if search_result:
-                    search_context = f"\n\n[搜索结果参考信息]: {search_result}"
-                    print(f"✅ 搜索完成: {search_query}")
+            search_context = self.build_search_context(message)
 
             # 构建消息列表
             messages = []
@@ -210,8 +236,21 @@ class DeepSeekAPI:
                         if isinstance(msg['content'], str):
                             messages.append(msg)
             
-            # DeepSeek 目前可能不支持标准多模态格式，先用文本分析
-            enhanced_message = f"""用户发送了一张屏幕截图，并询问：{message}
+            if image_base64 and self.supports_images():
+                # OpenAI风格的多模态内容
+                messages.append({
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": message},
+                        {
+                            "type": "image_url",
+                            "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}
+                        }
+                    ]
+                })
+            else:
+                # 当前模型不支持图像，退回纯文本分析
+                enhanced_message = f"""用户发送了一张屏幕截图，并询问：{message}
 
 请根据以下情况回复：
 1. 如果用户问的是关于屏幕内容的问题，请告诉用户你暂时无法直接查看图像，但可以根据他们的描述来帮助解答
@@ -219,8 +258,8 @@ class DeepSeekAPI:
 3. 建议用户可以描述屏幕上的内容，你会根据描述来提供帮助
 
 请保持友好和有帮助的语气。"""
-            
-            messages.append({"role": "user", "content": enhanced_message})
+                
+                messages.append({"role": "user", "content": enhanced_message})
             
             # 构建请求数据
             data = {
@@ -231,7 +270,9 @@ class DeepSeekAPI:
             }
             
             # 发送请求
-            response = requests.post(
+            if self.connection_warmer:
+                self.connection_warmer.note_request()
+            response = self.session.post(
                 self.base_url, 
                 headers=self.headers, 
                 json=data,
@@ -3,7 +3,7 @@ from tkinter import scrolledtext, messagebox
 import threading
 from deepseek_api import DeepSeekAPI
 from screen_capture import ScreenCapture, ScreenRegionSelector
-from config import WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_TITLE
+from config import WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_TITLE, IMAGE_TOKEN_BUDGET
 from PIL import Image, ImageTk
 import os
 
@@ -269,9 +269,12 @@ class DesktopPet:
     def handle_api_response(self, user_input):
         """处理API响应"""
         try:
-            if self.screenshot_mode:
+            if self.screenshot_mode and not self.api.supports_images():
+                # 截图模式但模型不支持图像：不截图，用纯文本提示告诉模型用户发来了截图
+                response = self.api.chat_with_image(user_input, None, self.conversation_history)
+            elif self.screenshot_mode:
                 # 截图模式：同时发送文本和图像
-                image_base64 = self.screen_capture.quick_screenshot_for_ai()
+                image_base64 = self.screen_capture.quick_screenshot_for_ai(IMAGE_TOKEN_BUDGET)
                 
                 if image_base64:
                     response = self.api.chat_with_image(
@@ -363,10 +366,11 @@ class DesktopPet:
     def handle_screenshot_request(self, default_message):
         """处理截图请求"""
         try:
-            # 截取屏幕
-            image_base64 = self.screen_capture.quick_screenshot_for_ai()
+            # 当前模型不支持图像时不浪费时间截图和编码，由纯文本提示告诉模型用户发来了截图
+            supports_images = self.api.supports_images()
+            image_base64 = self.screen_capture.quick_screenshot_for_ai(IMAGE_TOKEN_BUDGET) if supports_images else None
             
-            if image_base64:
+            if image_base64 or not supports_images:
                 # 调用多模态API
                 response = self.api.chat_with_image(
                     default_message,
@@ -10,6 +10,7 @@ import io
 import threading
 import tempfile
 import os
+import numpy as np
 
 class EdgeTTSHandler:
     def __init__(self):
@@ -34,6 +35,10 @@ class EdgeTTSHandler:
         
         self.is_speaking = False
         
+        # 播放开始/结束时的通知，用于插话检测（开始时传入16kHz的参考音频）
+        self.on_playback_start = None
+        self.on_playback_end = None
+        
     async def _generate_speech(self, text):
         """异步生成语音"""
         try:
@@ -66,8 +71,72 @@ class EdgeTTSHandler:
             print(f"生成语音失败: {str(e)}")
             return None
     
-    def speak(self, text, callback=None):
-        """文字转语音播放"""
+    def synthesize(self, text):
+        """同步生成语音数据，失败返回None"""
+        if not text or not text.strip():
+            return None
+        
+        # 在新的事件循环中运行异步函数
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            return loop.run_until_complete(self._generate_speech(text))
+        finally:
+            loop.close()
+    
+    def play_audio(self, audio_data):
+        """同步播放已生成的语音数据"""
+        # 创建临时文件播放音频
+        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
+            temp_file.write(audio_data)
+            temp_file_path = temp_file.name
+        
+        try:
+            # 使用pygame播放音频
+            pygame.mixer.music.load(temp_file_path)
+            reference = self.decode_reference(temp_file_path) if self.on_playback_start else None
+            pygame.mixer.music.play()
+            if self.on_playback_start:
+                self.on_playback_start(reference)
+            
+            # 等待播放完成
+            while pygame.mixer.music.get_busy():
+                pygame.time.wait(100)
+            
+            print("✅ Edge-TTS播放完成")
+        finally:
+            if self.on_playback_end:
+                self.on_playback_end()
+            # 清理临时文件
+            try:
+                os.unlink(temp_file_path)
+            except:
+                pass
+    
+    def decode_reference(self, file_path, rate=16000):
+        """把语音文件解码成16kHz单声道int16，作为回声参考，失败返回None"""
+        try:
+            sound = pygame.mixer.Sound(file_path)
+            samples = pygame.sndarray.array(sound).astype(np.float32)
+            if samples.ndim == 2:
+                samples = samples.mean(axis=1)
+            mixer_rate = pygame.mixer.get_init()[0]
+            # 回声参考只用来估计能量，线性插值重采样就够了
+            target = np.arange(int(len(samples) * rate / mixer_rate)) * mixer_rate / rate
+            return np.interp(target, np.arange(len(samples)), samples).astype(np.int16)
+        except Exception as e:
+            print(f"⚠️ 解码回声参考音频失败: {str(e)}")
+            return None
+    
+    def speak(self, text, callback=None, audio_data=None):
+        """
+        文字转语音播放
+        
+        Args:
+            text (str): 要播放的文本
+            callback (callable): 播放结束后的回调
+            audio_data (bytes): 提前生成好的语音数据，提供时跳过生成直接播放
+        """
         if not text or not text.strip():
             return
             
@@ -76,35 +145,10 @@ class EdgeTTSHandler:
                 self.is_speaking = True
                 print(f"🔊 Edge-TTS正在播放: {text}")
                 
-                # 在新的事件循环中运行异步函数
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+                data = audio_data or self.synthesize(text)
                 
-                audio_data = loop.run_until_complete(self._generate_speech(text))
-                loop.close()
-                
-                if audio_data:
-                    # 创建临时文件播放音频
-                    with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as temp_file:
-                        temp_file.write(audio_data)
-                        temp_file_path = temp_file.name
-                    
-                    try:
-                        # 使用pygame播放音频
-                        pygame.mixer.music.load(temp_file_path)
-                        pygame.mixer.music.play()
-                        
-                        # 等待播放完成
-                        while pygame.mixer.music.get_busy():
-                            pygame.time.wait(100)
-                        
-                        print("✅ Edge-TTS播放完成")
-                    finally:
-                        # 清理临时文件
-                        try:
-                            os.unlink(temp_file_path)
-                        except:
-                            pass
+                if data:
+                    self.play_audio(data)
                 else:
                     print("❌ Edge-TTS生成失败")
                     
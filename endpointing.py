@@ -0,0 +1,144 @@
+"""
+语音端点检测模块
+按音频时长（毫秒）而不是块数判断一句话的开始和结束：
+能量/VAD判断有没有声音，Vosk中间结果不再变化说明话已经说完，
+静音超过短暂的拖尾时间且中间结果稳定就提前结束，静音再长或者说得太久也会结束，
+每次结束都记录时间戳，用于追踪语音轮次的延迟
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from config import (ENDPOINT_SPEECH_START_MS, ENDPOINT_END_SILENCE_MS, ENDPOINT_HANGOVER_MS,
+                    ENDPOINT_PARTIAL_STABLE_MS, ENDPOINT_MAX_UTTERANCE_MS, ENDPOINT_ENERGY_DB)
+
+# 端点结束原因
+END_SILENCE = "silence"            # 静音时间达到上限
+END_STABLE_PARTIAL = "stable"      # 短暂静音且中间结果稳定
+END_MAX_LENGTH = "max_length"      # 一句话说得太久
+END_NO_SPEECH = "no_speech"        # 一直没有人说话
+END_RECOGNIZER = "recognizer"      # Vosk自己判断句子结束
+
+# 一句话的端点信息，时间都是从开始检测算起的音频毫秒数，detected_at是做出判断时的系统时间
+Endpoint = namedtuple('Endpoint', ['reason', 'speech_start_ms', 'speech_end_ms', 'end_ms', 'detected_at'])
+
+
+def frame_energy_db(samples):
+    """16位PCM样本的RMS能量（dBFS）"""
+    if len(samples) == 0:
+        return -100.0
+    rms = np.sqrt(np.mean(np.square(samples.astype(np.float32))))
+    return float(20 * np.log10(max(rms, 1.0) / 32768.0))
+
+
+class EndpointDetector:
+    def __init__(self, speech_start_ms=ENDPOINT_SPEECH_START_MS, end_silence_ms=ENDPOINT_END_SILENCE_MS,
+                 hangover_ms=ENDPOINT_HANGOVER_MS, partial_stable_ms=ENDPOINT_PARTIAL_STABLE_MS,
+                 max_utterance_ms=ENDPOINT_MAX_UTTERANCE_MS, no_speech_timeout_ms=None,
+                 energy_db=ENDPOINT_ENERGY_DB):
+        """
+        初始化端点检测
+
+        Args:
+            speech_start_ms (int): 连续有声音多久才算开始说话
+            end_silence_ms (int): 说话后静音多久一定结束
+            hangover_ms (int): 说话后至少静音多久才允许根据中间结果稳定提前结束
+            partial_stable_ms (int): 中间结果多久不变算稳定
+            max_utterance_ms (int): 一句话最长多久
+            no_speech_timeout_ms (int): 一直没人说话多久后放弃，None表示不限
+            energy_db (float): 没有外部VAD时，能量超过多少dBFS算有声音
+        """
+        self.speech_start_ms = speech_start_ms
+        self.end_silence_ms = end_silence_ms
+        self.hangover_ms = hangover_ms
+        self.partial_stable_ms = partial_stable_ms
+        self.max_utterance_ms = max_utterance_ms
+        self.no_speech_timeout_ms = no_speech_timeout_ms
+        self.energy_db = energy_db
+        self.reset()
+
+    def reset(self):
+        """开始检测新的一句话"""
+        self.audio_ms = 0.0
+        self.voiced_run_ms = 0.0
+        self.speech_start = None
+        self.last_speech_ms = None
+        self.last_partial = ''
+        self.partial_changed_ms = 0.0
+        self.endpoint = None
+
+    @property
+    def in_speech(self):
+        return self.speech_start is not None
+
+    def update(self, samples, partial='', is_speech=None, duration_ms=None, rate=16000):
+        """
+        送入一段音频的检测结果
+
+        Args:
+            samples (np.ndarray): 这段音频的int16样本
+            partial (str): 送入这段音频后Vosk的中间结果
+            is_speech (bool): 外部VAD的判断，None时用能量阈值判断
+            duration_ms (float): 这段音频的时长，None时按样本数和采样率计算
+            rate (int): 采样率
+
+        Returns:
+            Endpoint: 这句话结束时返回端点信息，否则返回None
+        """
+        if self.endpoint:
+            return self.endpoint
+        if duration_ms is None:
+            duration_ms = len(samples) * 1000.0 / rate
+        if is_speech is None:
+            is_speech = frame_energy_db(samples) > self.energy_db
+        self.audio_ms += duration_ms
+
+        partial = partial.strip()
+        if partial != self.last_partial:
+            self.last_partial = partial
+            self.partial_changed_ms = self.audio_ms
+            # 中间结果有新字也算在说话
+            if partial:
+                is_speech = True
+
+        if is_speech:
+            self.voiced_run_ms += duration_ms
+            self.last_speech_ms = self.audio_ms
+            if not self.in_speech and (self.voiced_run_ms >= self.speech_start_ms or partial):
+                self.speech_start = self.audio_ms - self.voiced_run_ms
+        else:
+            self.voiced_run_ms = 0.0
+
+        if not self.in_speech:
+            if self.no_speech_timeout_ms and self.audio_ms >= self.no_speech_timeout_ms:
+                return self.finish(END_NO_SPEECH)
+            return None
+
+        silence_ms = self.audio_ms - self.last_speech_ms
+        if silence_ms >= self.end_silence_ms:
+            return self.finish(END_SILENCE)
+        if (silence_ms >= self.hangover_ms and self.last_partial
+                and self.audio_ms - self.partial_changed_ms >= self.partial_stable_ms):
+            return self.finish(END_STABLE_PARTIAL)
+        if self.audio_ms - self.speech_start >= self.max_utterance_ms:
+            return self.finish(END_MAX_LENGTH)
+        return None
+
+    def finish(self, reason):
+        """结束这句话并记录端点时间戳"""
+        self.endpoint = Endpoint(
+            reason=reason,
+            speech_start_ms=self.speech_start,
+            speech_end_ms=self.last_speech_ms,
+            end_ms=self.audio_ms,
+            detected_at=time.time()
+        )
+        return self.endpoint
+
+    def end_of_speech_time(self):
+        """估算用户实际停止说话时的系统时间，用于计算端点延迟"""
+        if not self.endpoint or self.endpoint.speech_end_ms is None:
+            return None
+        return self.endpoint.detected_at - (self.endpoint.end_ms - self.endpoint.speech_end_ms) / 1000
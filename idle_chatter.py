@@ -0,0 +1,173 @@
+"""
+闲置聊天预生成模块
+在安静的时候后台让AI结合最近的对话准备几句闲聊，并提前合成好语音，
+闲置时直接播放，不用临时等API和TTS
+"""
+
+import re
+import threading
+import time
+from collections import deque
+
+from config import IDLE_CHATTER_BUDGET_PER_HOUR, IDLE_CHATTER_CACHE_SIZE, IDLE_CHATTER_TTL
+
+IDLE_CHATTER_PROMPT = """（系统提示：主人已经有一会儿没说话了。请你结合刚才的聊天内容，主动说一句简短的话来引起主人注意，
+比如接着刚才的话题、关心主人或者撒娇。不超过30个字，只说这一句，记得在开头加情绪标签。）"""
+
+
+class IdleChatterPrefetcher:
+    def __init__(self, api, tts, budget_per_hour=IDLE_CHATTER_BUDGET_PER_HOUR,
+                 cache_size=IDLE_CHATTER_CACHE_SIZE, ttl=IDLE_CHATTER_TTL):
+        """
+        初始化闲聊预生成器
+
+        Args:
+            api (DeepSeekAPI): 生成文本用的API
+            tts (EdgeTTSHandler): 合成语音用的TTS
+            budget_per_hour (int): 每小时最多发起多少次预生成API调用
+            cache_size (int): 最多缓存几句
+            ttl (float): 缓存的过期时间（秒），过期后内容可能已和当前话题无关
+        """
+        self.api = api
+        self.tts = tts
+        self.budget_per_hour = budget_per_hour
+        self.cache_size = cache_size
+        self.ttl = ttl
+
+        # 缓存：[(过期时间, 对话轮次, 情绪, 文本, 语音数据)]
+        self.cache = deque()
+        self.call_times = deque()
+        self.is_generating = False
+        self.lock = threading.Lock()
+        # 最新的对话轮次和对话记录，话题变了之前准备的闲聊就不能再用
+        self.turn = None
+        self.history = []
+
+        # 统计
+        self.served = 0
+        self.expired = 0
+        self.misses = 0
+        self.stale = 0  # 对话继续后作废的闲聊
+
+    def drop_expired(self):
+        """丢掉过期的缓存"""
+        now = time.time()
+        with self.lock:
+            while self.cache and self.cache[0][0] <= now:
+                self.cache.popleft()
+                self.expired += 1
+
+    @staticmethod
+    def turn_of(conversation_history):
+        """用最后两条消息标识对话轮次（对话记录会截断，不能只看长度）"""
+        return tuple(message.get('content') for message in (conversation_history or [])[-2:])
+
+    def update_turn(self, conversation_history):
+        """对话有新的一轮时，丢掉为之前的话题准备的闲聊"""
+        turn = self.turn_of(conversation_history)
+        with self.lock:
+            if turn == self.turn:
+                return
+            self.turn = turn
+            self.history = list(conversation_history or [])
+            fresh = deque(entry for entry in self.cache if entry[1] == turn)
+            self.stale += len(self.cache) - len(fresh)
+            self.cache = fresh
+
+    def has_budget(self):
+        """最近一小时的调用次数是否还在预算内"""
+        hour_ago = time.time() - 3600
+        while self.call_times and self.call_times[0] < hour_ago:
+            self.call_times.popleft()
+        return len(self.call_times) < self.budget_per_hour
+
+    def prefetch_async(self, conversation_history=None):
+        """
+        在后台补充缓存，缓存已满、正在生成或预算用完时直接返回
+        对话有新的一轮时先丢掉之前准备的闲聊
+
+        Args:
+            conversation_history (list): 最近的对话记录，用于生成有上下文的闲聊
+        """
+        self.update_turn(conversation_history)
+        self.drop_expired()
+        with self.lock:
+            if self.is_generating or len(self.cache) >= self.cache_size or not self.has_budget():
+                return
+            self.is_generating = True
+            self.call_times.append(time.time())
+
+        history = list(conversation_history or [])
+        turn = self.turn_of(history)
+
+        def _generate():
+            try:
+                self.generate_one(history, turn)
+            except Exception as e:
+                print(f"⚠️ 闲聊预生成失败: {str(e)}")
+            finally:
+                self.is_generating = False
+            # 生成期间对话又有了新的一轮，按新的对话再准备一句
+            if turn != self.turn:
+                self.prefetch_async(self.history)
+
+        thread = threading.Thread(target=_generate)
+        thread.daemon = True
+        thread.start()
+
+    def generate_one(self, conversation_history, turn=None):
+        """生成一句闲聊并合成语音，生成完时对话已经有了新的一轮就不要了"""
+        if turn is None:
+            turn = self.turn_of(conversation_history)
+        response = self.api.chat(IDLE_CHATTER_PROMPT, conversation_history, allow_search=False)
+        emotion_match = re.search(r'\[emotion:(\w+)\]', response)
+        if not emotion_match:
+            # 没有情绪标签多半是API报错信息，不能拿来播放
+            return
+
+        emotion = emotion_match.group(1)
+        text = re.sub(r'\[emotion:\w+\]\s*', '', response).strip()
+        audio_data = self.tts.synthesize(text)
+        if not audio_data:
+            return
+
+        with self.lock:
+            if turn != self.turn:
+                self.stale += 1
+                return
+            self.cache.append((time.time() + self.ttl, turn, emotion, text, audio_data))
+        print(f"💭 已预生成闲聊: {text}")
+
+    def pop(self, conversation_history=None):
+        """
+        取出一句预生成的闲聊，跳过在最近一轮对话之前准备的
+
+        Args:
+            conversation_history (list): 当前的对话记录，None时按最近一次预生成时的对话判断
+
+        Returns:
+            tuple: (情绪, 文本, 语音数据)，没有可用缓存时返回None
+        """
+        if conversation_history is not None:
+            self.update_turn(conversation_history)
+        self.drop_expired()
+        with self.lock:
+            while self.cache and self.cache[0][1] != self.turn:
+                self.cache.popleft()
+                self.stale += 1
+            if not self.cache:
+                self.misses += 1
+                return None
+            _, _, emotion, text, audio_data = self.cache.popleft()
+            self.served += 1
+            return emotion, text, audio_data
+
+    def get_stats(self):
+        """获取统计信息"""
+        return {
+            'served': self.served,
+            'misses': self.misses,
+            'expired': self.expired,
+            'stale': self.stale,
+            'calls_last_hour': len(self.call_times)
+        }
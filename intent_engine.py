@@ -0,0 +1,209 @@
+"""
+意图识别模块
+所有线索词合并成一个预编译正则，一次扫描就完成分类（不搜索/搜索/本地指令/屏幕问题），
+同时提取搜索关键词并给出置信度
+"""
+
+import os
+import re
+import time
+from collections import namedtuple
+
+INTENT_NONE = 'none'
+INTENT_SEARCH = 'search'
+INTENT_LOCAL_COMMAND = 'local_command'
+INTENT_SCREEN_QUESTION = 'screen_question'
+
+Intent = namedtuple('Intent', ['kind', 'query', 'confidence'])
+
+# 线索表：(正则, 意图, 权重, 提取关键词时是否删掉)
+# 同一位置按顺序优先匹配，较长的写法要放在前面
+INTENT_CUES = [
+    # 明确的搜索指令
+    (r'帮我(?:搜索?|查找?)一?下?|给我(?:搜|查|找)一?下?|搜索一?下?|搜一下|查一下|查查|查找|查询|百度一下|search', INTENT_SEARCH, 1.0, True),
+    # 知识类提问
+    (r'什么是|是什么意思|是什么(?!时候)|是谁|是哪[个位国年]', INTENT_SEARCH, 0.6, True),
+    (r'怎么(?:玩|打|过|出装|配|做|弄|办|用|选)|如何', INTENT_SEARCH, 0.6, False),
+    (r'攻略|出装|铭文|阵容|配队|技巧|策略|教程|打法|加点|天赋', INTENT_SEARCH, 0.5, False),
+    (r'有哪些|是哪些', INTENT_SEARCH, 0.5, True),
+    (r'多少钱|什么时候|在哪里?|哪个好|为什么|历史|原理', INTENT_SEARCH, 0.5, False),
+    (r'你知道(?=.{2,})|听说过|了解一下', INTENT_SEARCH, 0.5, True),
+    # 屏幕相关
+    (r'屏幕|截图|截屏|画面上|这个界面|我的桌面|看看这个|帮我看看', INTENT_SCREEN_QUESTION, 0.9, False),
+    # 本地指令（与本地技能对应）
+    (r'几点了?|几点钟|星期几|礼拜几|几号|停止说话|别说了|不要说了|闭嘴|切换模型|换个模型', INTENT_LOCAL_COMMAND, 0.9, False),
+    # 闲聊和关于桌宠自己的问题，不值得搜索
+    (r'你(?:是谁|是什么|是啥|叫什么|怎么样|会什么|喜欢|觉得|真|好|在干|能不能)|我(?:觉得|喜欢|想你|今天|好)', INTENT_NONE, 0.6, False),
+    (r'你好|谢谢|哈哈|嘿嘿|晚安|早上好|无聊|陪我', INTENT_NONE, 0.5, False),
+]
+
+# 句首的问候不参与分类，"你好，请问什么是黑洞"仍然是搜索
+GREETING_PREFIX_PATTERN = re.compile(r'^(?:(?:你好|您好|哈喽|嗨|hello|hi|早上好|晚上好|笨逼)[呀啊哦]?[\s，,。！!~～]*)+',
+                                     re.IGNORECASE)
+# 提取关键词时去掉的语气词和提问的说法
+FILLER_PATTERN = re.compile(r'^(?:请问|请|那|嗯|哎|笨逼|我想知道|想知道|我想问一?下?|告诉我)+|(?:吗|呢|呀|啊|吧|哦|嘛|啦)+$')
+# 后面还有内容的"怎么""如何"是提问的说法，不是关键词（"后羿怎么出装" -> "后羿出装"）
+QUESTION_WORD_PATTERN = re.compile(r'(?:怎么|怎样|如何)(?=[一-鿿]{2})')
+# 只剩代词的关键词没法搜索（"你是什么"、"那个是什么"），要在去掉语气词之前判断，"那"也是语气词
+PRONOUN_PATTERN = re.compile(r'^(?:你|您|我|他|她|它|这|那)(?:们|个)?$')
+PUNCTUATION_PATTERN = re.compile(r'[\s，。！？、,.!?~～：:；;“”"\']+')
+# Vosk的识别结果词之间带空格，中文之间的空格会打断线索词
+CJK_SPACE_PATTERN = re.compile(r'(?<=[一-鿿]) +(?=[一-鿿])')
+
+# 得分达到阈值才认定为该意图
+INTENT_THRESHOLD = 0.5
+
+
+class IntentEngine:
+    def __init__(self, cues=INTENT_CUES, threshold=INTENT_THRESHOLD):
+        """
+        初始化意图识别引擎
+
+        Args:
+            cues (list): 线索表 [(正则, 意图, 权重, 提取时是否删掉)]
+            threshold (float): 判定意图的最低得分
+        """
+        self.cues = cues
+        self.threshold = threshold
+        self.pattern = re.compile('|'.join(
+            f'(?P<c{i}>{cue[0]})' for i, cue in enumerate(cues)
+        ), re.IGNORECASE)
+
+    def classify(self, text):
+        """
+        对一句话分类
+
+        Returns:
+            Intent: (意图, 搜索关键词, 置信度)，非搜索意图的关键词为原文
+        """
+        text = CJK_SPACE_PATTERN.sub('', text.strip())
+        # 只有问候时按原句分类（闲聊）
+        body = GREETING_PREFIX_PATTERN.sub('', text) or text
+        scores = {}
+        strip_spans = []
+
+        # 一次扫描收集所有线索
+        for match in self.pattern.finditer(body):
+            index = int(match.lastgroup[1:])
+            _, kind, weight, strip = self.cues[index]
+            scores[kind] = scores.get(kind, 0.0) + weight
+            if strip:
+                strip_spans.append(match.span())
+
+        # 闲聊线索抵消搜索线索
+        chat_score = scores.pop(INTENT_NONE, 0.0)
+        if INTENT_SEARCH in scores:
+            scores[INTENT_SEARCH] -= chat_score
+
+        kind = INTENT_NONE
+        confidence = min(1.0, chat_score) if chat_score else 0.0
+        if scores:
+            best_kind = max(scores, key=scores.get)
+            if scores[best_kind] >= self.threshold:
+                kind = best_kind
+                confidence = min(1.0, scores[best_kind])
+
+        if kind != INTENT_SEARCH:
+            return Intent(kind, text, confidence)
+
+        query = self.extract_query(body, strip_spans)
+        # 没剩下关键词或者只剩一个字时搜不出有用的东西
+        if len(query) < 2:
+            return Intent(INTENT_NONE, text, confidence)
+        return Intent(kind, query, confidence)
+
+    def extract_query(self, text, strip_spans):
+        """删掉指令性线索、提问的说法、语气词和标点，得到搜索关键词，只剩代词或什么都不剩时返回空字符串"""
+        parts = []
+        last_end = 0
+        for start, end in strip_spans:
+            parts.append(text[last_end:start])
+            last_end = end
+        parts.append(text[last_end:])
+
+        query = QUESTION_WORD_PATTERN.sub('', ' '.join(parts))
+        query = PUNCTUATION_PATTERN.sub(' ', query).strip()
+        if PRONOUN_PATTERN.match(query):
+            return ''
+        query = FILLER_PATTERN.sub('', query).strip()
+        query = CJK_SPACE_PATTERN.sub('', query)
+        return query
+
+
+def load_corpus(path):
+    """读取标注语料，每行：意图<TAB>句子[<TAB>期望的搜索关键词]"""
+    samples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            label, text, *query = line.split('\t')
+            samples.append((label, text, query[0] if query else None))
+    return samples
+
+
+def legacy_is_search_query(text):
+    """旧版关键词判断，用于对比"""
+    search_keywords = [
+        '搜索', 'search', '查找', '找', '查询',
+        '你知道', '知道', '了解', '听说过',
+        '什么是', '是什么', '怎么', '如何',
+        '游戏攻略', '攻略', '策略', '技巧',
+        '怎么玩', '怎么做', '方法'
+    ]
+    text_lower = text.lower()
+    return any(keyword in text_lower for keyword in search_keywords)
+
+
+def run_benchmark(corpus_path):
+    """在标注语料上对比新旧方法的准确率和多余搜索次数，标了期望关键词的句子同时检查关键词"""
+    samples = load_corpus(corpus_path)
+    engine = IntentEngine()
+
+    correct = 0
+    search_correct = 0
+    legacy_search_correct = 0
+    needless = 0
+    legacy_needless = 0
+    query_total = 0
+    query_correct = 0
+
+    start_time = time.perf_counter()
+    predictions = [engine.classify(text) for _, text, _ in samples]
+    elapsed = time.perf_counter() - start_time
+
+    for (label, text, expected_query), intent in zip(samples, predictions):
+        is_search = label == INTENT_SEARCH
+        legacy_search = legacy_is_search_query(text)
+        if intent.kind == label:
+            correct += 1
+        else:
+            print(f"  ✗ [{label} -> {intent.kind}] {text}")
+        if (intent.kind == INTENT_SEARCH) == is_search:
+            search_correct += 1
+        if legacy_search == is_search:
+            legacy_search_correct += 1
+        if intent.kind == INTENT_SEARCH and not is_search:
+            needless += 1
+        if legacy_search and not is_search:
+            legacy_needless += 1
+        if expected_query is not None:
+            query_total += 1
+            if intent.kind == label and intent.query == expected_query:
+                query_correct += 1
+            else:
+                print(f"  ✗ [关键词 {expected_query} -> {intent.query}] {text}")
+
+    total = len(samples)
+    print(f"📊 语料 {total} 条，平均每条 {elapsed / total * 1e6:.1f}µs")
+    print(f"🎯 四分类准确率: {correct / total:.1%}")
+    if query_total:
+        print(f"🔑 搜索关键词准确率: {query_correct / query_total:.1%} ({query_correct}/{query_total})")
+    print(f"🔍 是否搜索准确率: 新 {search_correct / total:.1%} / 旧 {legacy_search_correct / total:.1%}")
+    print(f"🚫 多余搜索: 新 {needless} 次 / 旧 {legacy_needless} 次，避免了 {legacy_needless - needless} 次")
+
+
+# 测试代码
+if __name__ == "__main__":
+    run_benchmark(os.path.join(os.path.dirname(__file__), "benchmark", "intent_corpus.tsv"))
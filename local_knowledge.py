@@ -0,0 +1,462 @@
+"""
+本地知识库模块
+对一个文件夹里的Markdown/文本攻略建立全文索引：中文按双字切分，BM25打分，
+倒排表以二进制数组存盘并用numpy.memmap按需读取，作为搜索提供方毫秒级回答
+索引分段存储：增量构建时只把新增和修改过的文件写成一个新段，旧段里被替换的段落查询时跳过，
+段数太多或失效段落太多时再合并成一个段
+
+用法：
+    python local_knowledge.py build [知识库目录]   # 增量更新索引
+    python local_knowledge.py search 查询内容
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from config import KNOWLEDGE_DIR, KNOWLEDGE_INDEX_DIR
+from search_providers import SearchProvider
+
+KNOWLEDGE_EXTENSIONS = ('.md', '.txt')
+# 每个段落最多多少字，太长的段落按句子再切
+PASSAGE_MAX_CHARS = 300
+# 段数超过这个数就把所有段合并成一个
+MAX_SEGMENTS = 8
+CJK_RUN_PATTERN = re.compile(r'[一-鿿]+')
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+SENTENCE_END_PATTERN = re.compile(r'(?<=[。！？!?；;])')
+HEADING_PATTERN = re.compile(r'^#{1,6}\s+')
+# 查询里的疑问词和语气词攻略正文里一般没有，当成分隔符去掉，免得和前后的字拼成查询词拉低覆盖率
+QUERY_FILLER_PATTERN = re.compile(
+    r'请问|我想知道|告诉我|怎么样|怎么|怎样|如何|什么|哪些|哪个|为什么|是不是|有没有|一下|吗|呢|吧|啊|呀|的'
+)
+
+
+def tokenize(text):
+    """中文切成相邻双字，英文用小写单词；单个汉字单独成词"""
+    text = text.lower()
+    tokens = WORD_PATTERN.findall(text)
+    for run in CJK_RUN_PATTERN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_terms(query):
+    """查询词：先去掉疑问词和语气词再切分，全被去掉时用原句"""
+    terms = tokenize(QUERY_FILLER_PATTERN.sub(' ', query)) or tokenize(query)
+    return list(dict.fromkeys(terms))
+
+
+def split_passages(text):
+    """按空行切成段落，Markdown标题并到后面的段落里，过长的段落按句子合并成不超过上限的片段"""
+    passages = []
+    heading = ''
+    for block in re.split(r'\n\s*\n', text):
+        lines = [line.strip() for line in block.splitlines() if line.strip()]
+        if not lines:
+            continue
+        # 只有标题的块不单独成段，拼到下一个段落前面
+        if all(HEADING_PATTERN.match(line) for line in lines):
+            heading = ' '.join([heading] + [HEADING_PATTERN.sub('', line) for line in lines]).strip()
+            continue
+        block = ' '.join(HEADING_PATTERN.sub('', line) for line in lines)
+        prefix = heading + ' ' if heading else ''
+        heading = ''
+        if len(prefix) + len(block) <= PASSAGE_MAX_CHARS:
+            passages.append(prefix + block)
+            continue
+        # 切开的每一片都带上标题
+        current = ''
+        for sentence in SENTENCE_END_PATTERN.split(block):
+            if current and len(prefix) + len(current) + len(sentence) > PASSAGE_MAX_CHARS:
+                passages.append(prefix + current)
+                current = ''
+            current += sentence
+        if current:
+            passages.append(prefix + current)
+    if heading:
+        passages.append(heading)
+    return passages
+
+
+class LocalKnowledgeIndex:
+    def __init__(self, index_dir=KNOWLEDGE_INDEX_DIR, k1=1.2, b=0.75):
+        """
+        初始化本地知识库索引
+
+        Args:
+            index_dir (str): 索引文件目录
+            k1 (float): BM25词频饱和参数
+            b (float): BM25长度归一化参数
+        """
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+
+        self.segments = []  # [{'vocab', 'doc_ids', 'term_freqs', 'base'}]
+        self.passages = []
+        self.doc_lengths = None
+        self.live = None  # 每个段落是否还有效（所在文件没有被更新或删除）
+        self.live_count = 0
+        self.avg_length = 1.0
+        self.loaded_version = None
+
+    def path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def read_meta(self):
+        if not self.exists():
+            return None
+        with open(self.path('meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def build(self, source_dir=KNOWLEDGE_DIR):
+        """
+        增量构建索引：没变化的文件留在原来的段里，只把新增和修改过的文件写成一个新段
+
+        Returns:
+            dict: 本次构建的统计信息
+        """
+        start_time = time.perf_counter()
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        meta = self.read_meta()
+        # 旧格式的索引没有记录文件信息，整个重建
+        if meta and 'files' in meta:
+            files, segments = meta['files'], list(meta['segments'])
+        else:
+            files, segments = {}, []
+
+        new_files = {}
+        changed = {}  # 相对路径 -> (文件信息, 段落)
+        for root, _, filenames in os.walk(source_dir):
+            for filename in sorted(filenames):
+                if not filename.lower().endswith(KNOWLEDGE_EXTENSIONS):
+                    continue
+                file_path = os.path.join(root, filename)
+                rel_path = os.path.relpath(file_path, source_dir)
+                stat = os.stat(file_path)
+                cached = files.get(rel_path)
+                if cached and cached['mtime'] == stat.st_mtime and cached['size'] == stat.st_size:
+                    new_files[rel_path] = cached
+                    continue
+
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    passages = split_passages(f.read())
+                changed[rel_path] = ({'mtime': stat.st_mtime, 'size': stat.st_size}, passages)
+
+        removed = len(set(files) - set(new_files) - set(changed))
+        if not changed and removed == 0 and meta:
+            print("📚 知识库没有变化，无需重建索引")
+            return {'files': len(new_files), 'changed': 0, 'removed': 0}
+
+        if changed:
+            version = self.new_version(segments)
+            self.write_new_segment(version, {rel_path: passages for rel_path, (_, passages) in changed.items()})
+            segments.append(version)
+            for rel_path, (info, _) in changed.items():
+                new_files[rel_path] = dict(info, segment=version)
+
+        # 只保留还有有效段落的段
+        segments = [segment for segment in segments
+                    if any(info['segment'] == segment for info in new_files.values())]
+        merged = False
+        if len(segments) > MAX_SEGMENTS or self.dead_fraction(segments, new_files) > 0.5:
+            version = self.new_version(segments)
+            self.merge_segments(version, segments, new_files)
+            segments = [version]
+            for info in new_files.values():
+                info['segment'] = version
+            merged = True
+
+        used = segments + [meta['version']] if meta else segments
+        self.write_meta({'version': self.new_version(used), 'segments': segments, 'files': new_files})
+        self.remove_unused(segments)
+
+        elapsed = time.perf_counter() - start_time
+        print(f"📚 索引构建完成: {len(new_files)} 个文件，更新 {len(changed)} 个，删除 {removed} 个，"
+              f"{len(segments)} 个段{'（已合并）' if merged else ''}，用时 {elapsed:.2f}s")
+        return {'files': len(new_files), 'changed': len(changed), 'removed': removed,
+                'segments': len(segments), 'merged': merged}
+
+    def new_version(self, used):
+        """用毫秒时间戳做版本号，和已有的重复时往后加"""
+        version = int(time.time() * 1000)
+        while str(version) in used:
+            version += 1
+        return str(version)
+
+    def write_new_segment(self, version, file_passages):
+        """把新增和修改过的文件分词，写成一个段"""
+        passages = []
+        postings = {}
+        doc_lengths = []
+        for rel_path in sorted(file_passages):
+            for text in file_passages[rel_path]:
+                doc_id = len(passages)
+                passages.append({'file': rel_path, 'text': text})
+                term_counts = Counter(tokenize(text))
+                doc_lengths.append(sum(term_counts.values()))
+                for term, count in term_counts.items():
+                    postings.setdefault(term, []).append((doc_id, count))
+
+        vocab = {}
+        total = sum(len(p) for p in postings.values())
+        doc_ids = np.zeros(total, dtype=np.uint32)
+        term_freqs = np.zeros(total, dtype=np.uint16)
+        offset = 0
+        for term in sorted(postings):
+            entries = postings[term]
+            vocab[term] = [offset, len(entries)]
+            for i, (doc_id, count) in enumerate(entries):
+                doc_ids[offset + i] = doc_id
+                term_freqs[offset + i] = min(count, 65535)
+            offset += len(entries)
+
+        self.write_segment(version, passages, vocab, doc_ids, term_freqs, doc_lengths)
+
+    def merge_segments(self, version, segments, files):
+        """把所有段里还有效的段落合并成一个段，直接合并倒排表，不重新分词"""
+        passages = []
+        doc_lengths = []
+        term_ids = []
+        new_doc_ids = []
+        term_freqs = []
+        terms = {}
+        for segment in segments:
+            vocab, segment_passages, seg_doc_ids, seg_term_freqs, seg_lengths = self.read_segment(segment)
+            # 段内序号 -> 合并后的序号，失效段落为-1
+            remap = np.full(len(segment_passages), -1, dtype=np.int64)
+            for i, passage in enumerate(segment_passages):
+                if files.get(passage['file'], {}).get('segment') == segment:
+                    remap[i] = len(passages)
+                    passages.append(passage)
+                    doc_lengths.append(int(seg_lengths[i]))
+            if not len(seg_doc_ids):
+                continue
+
+            # 每条倒排记录属于哪个词
+            seg_term_ids = np.zeros(len(seg_doc_ids), dtype=np.int64)
+            for term, (offset, length) in vocab.items():
+                seg_term_ids[offset:offset + length] = terms.setdefault(term, len(terms))
+            mapped = remap[seg_doc_ids.astype(np.int64)]
+            keep = mapped >= 0
+            term_ids.append(seg_term_ids[keep])
+            new_doc_ids.append(mapped[keep])
+            term_freqs.append(seg_term_freqs[keep])
+
+        term_list = sorted(terms)
+        if term_ids:
+            # 词按字典序重新编号，再按（词, 段落）排序
+            rank = np.zeros(len(terms), dtype=np.int64)
+            rank[[terms[term] for term in term_list]] = np.arange(len(term_list))
+            term_ids = rank[np.concatenate(term_ids)]
+            new_doc_ids = np.concatenate(new_doc_ids)
+            term_freqs = np.concatenate(term_freqs)
+            order = np.lexsort((new_doc_ids, term_ids))
+            term_ids, new_doc_ids, term_freqs = term_ids[order], new_doc_ids[order], term_freqs[order]
+            counts = np.bincount(term_ids, minlength=len(term_list))
+        else:
+            new_doc_ids = np.zeros(0, dtype=np.int64)
+            term_freqs = np.zeros(0, dtype=np.uint16)
+            counts = np.zeros(len(term_list), dtype=np.int64)
+
+        vocab = {}
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]) if len(counts) else []
+        for term, offset, count in zip(term_list, offsets, counts):
+            if count:
+                vocab[term] = [int(offset), int(count)]
+        self.write_segment(version, passages, vocab, new_doc_ids.astype(np.uint32),
+                           term_freqs.astype(np.uint16), doc_lengths)
+
+    def write_segment(self, version, passages, vocab, doc_ids, term_freqs, doc_lengths):
+        # 每个段写一组带版本号的文件，已经写好的段不再改动，
+        # 正在运行的桌宠还映射着旧文件也不影响（Windows下被映射的文件不能覆盖）
+        np.asarray(doc_ids, dtype=np.uint32).tofile(self.path(f'doc_ids.{version}.u32'))
+        np.asarray(term_freqs, dtype=np.uint16).tofile(self.path(f'term_freqs.{version}.u16'))
+        np.array(doc_lengths, dtype=np.uint32).tofile(self.path(f'doc_lengths.{version}.u32'))
+        with open(self.path(f'passages.{version}.json'), 'w', encoding='utf-8') as f:
+            json.dump(passages, f, ensure_ascii=False)
+        with open(self.path(f'vocab.{version}.json'), 'w', encoding='utf-8') as f:
+            json.dump(vocab, f, ensure_ascii=False)
+
+    def read_segment(self, version, mapped=False):
+        """读取一个段，mapped为True时倒排表用memmap映射"""
+        with open(self.path(f'vocab.{version}.json'), 'r', encoding='utf-8') as f:
+            vocab = json.load(f)
+        with open(self.path(f'passages.{version}.json'), 'r', encoding='utf-8') as f:
+            passages = json.load(f)
+        doc_ids_path = self.path(f'doc_ids.{version}.u32')
+        term_freqs_path = self.path(f'term_freqs.{version}.u16')
+        if mapped and os.path.getsize(doc_ids_path) > 0:
+            doc_ids = np.memmap(doc_ids_path, dtype=np.uint32, mode='r')
+            term_freqs = np.memmap(term_freqs_path, dtype=np.uint16, mode='r')
+        else:
+            doc_ids = np.fromfile(doc_ids_path, dtype=np.uint32)
+            term_freqs = np.fromfile(term_freqs_path, dtype=np.uint16)
+        doc_lengths = np.fromfile(self.path(f'doc_lengths.{version}.u32'), dtype=np.uint32)
+        return vocab, passages, doc_ids, term_freqs, doc_lengths
+
+    def dead_fraction(self, segments, files):
+        """各段里失效段落所占的比例（按文件数估算）"""
+        total = 0
+        dead = 0
+        for segment in segments:
+            with open(self.path(f'passages.{segment}.json'), 'r', encoding='utf-8') as f:
+                for passage in json.load(f):
+                    total += 1
+                    if files.get(passage['file'], {}).get('segment') != segment:
+                        dead += 1
+        return dead / total if total else 0.0
+
+    def write_meta(self, meta):
+        """最后写meta.json切换到新的段列表"""
+        with open(self.path('meta.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(self.path('meta.json.tmp'), self.path('meta.json'))
+
+    def remove_unused(self, segments):
+        """清理不再使用的段，还在被映射的删不掉，下次构建再删"""
+        for name in os.listdir(self.index_dir):
+            parts = name.split('.')
+            if (len(parts) == 3 and parts[1].isdigit() and parts[1] not in segments) or name == 'cache.json':
+                try:
+                    os.remove(self.path(name))
+                except OSError:
+                    pass
+
+    def exists(self):
+        """索引是否已经构建过"""
+        return os.path.exists(self.path('meta.json'))
+
+    def load(self):
+        """加载索引，倒排表用memmap映射，不整个读进内存；索引更新后自动重新加载"""
+        meta = self.read_meta()
+        if meta is None:
+            return False
+        if meta['version'] == self.loaded_version:
+            return True
+
+        with self.lock:
+            files = meta.get('files')
+            segments = []
+            passages = []
+            doc_lengths = []
+            live = []
+            for version in meta.get('segments', [meta['version']]):
+                vocab, segment_passages, doc_ids, term_freqs, lengths = self.read_segment(version, mapped=True)
+                segments.append({'vocab': vocab, 'doc_ids': doc_ids, 'term_freqs': term_freqs,
+                                 'base': len(passages)})
+                passages.extend(segment_passages)
+                doc_lengths.append(lengths)
+                # 旧格式的索引只有一个段，全部有效
+                live.extend(files is None or files.get(p['file'], {}).get('segment') == version
+                            for p in segment_passages)
+
+            self.segments = segments
+            self.passages = passages
+            self.doc_lengths = (np.concatenate(doc_lengths).astype(np.float32)
+                                if doc_lengths else np.zeros(0, dtype=np.float32))
+            self.live = np.array(live, dtype=bool)
+            self.live_count = int(self.live.sum())
+            self.avg_length = float(self.doc_lengths[self.live].mean()) if self.live_count else 1.0
+            self.loaded_version = meta['version']
+        return True
+
+    def search(self, query, top_k=3):
+        """
+        BM25检索
+
+        Returns:
+            list: [(分数, 命中的查询词比例, 段落dict)]，按分数从高到低
+        """
+        if not self.load() or not self.live_count:
+            return []
+
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        with self.lock:
+            n = self.live_count
+            scores = np.zeros(len(self.passages), dtype=np.float32)
+            matched_terms = np.zeros(len(self.passages), dtype=np.int32)
+            for term in terms:
+                ids = []
+                tfs = []
+                for segment in self.segments:
+                    entry = segment['vocab'].get(term)
+                    if not entry:
+                        continue
+                    offset, length = entry
+                    ids.append(np.asarray(segment['doc_ids'][offset:offset + length], dtype=np.int64)
+                               + segment['base'])
+                    tfs.append(np.asarray(segment['term_freqs'][offset:offset + length], dtype=np.float32))
+                if not ids:
+                    continue
+                ids = np.concatenate(ids)
+                tf = np.concatenate(tfs)
+                keep = self.live[ids]
+                ids, tf = ids[keep], tf[keep]
+                length = len(ids)
+                if not length:
+                    continue
+                idf = np.log(1 + (n - length + 0.5) / (length + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[ids] / self.avg_length)
+                scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+                matched_terms[ids] += 1
+
+            top = np.argsort(-scores)[:top_k]
+            return [(float(scores[i]), matched_terms[i] / len(terms), self.passages[i])
+                    for i in top if scores[i] > 0]
+
+
+class LocalKnowledgeProvider(SearchProvider):
+    """本地知识库搜索提供方"""
+    name = "local"
+    is_local = True
+
+    def __init__(self, index=None, min_coverage=0.6):
+        """
+        Args:
+            index (LocalKnowledgeIndex): 知识库索引
+            min_coverage (float): 最好的段落至少要覆盖多少比例的查询词才算命中
+        """
+        self.index = index or LocalKnowledgeIndex()
+        self.min_coverage = min_coverage
+
+    def search(self, query, timeout):
+        results = self.index.search(query)
+        if not results or results[0][1] < self.min_coverage:
+            return None
+        # 只保留和最佳段落分数接近、同样覆盖了大部分查询词的段落
+        best_score = results[0][0]
+        texts = [passage['text'] for score, coverage, passage in results
+                 if score >= best_score * 0.5 and coverage >= self.min_coverage]
+        return {'text': '\n'.join(texts), 'urls': []}
+
+
+# 命令行工具
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "build":
+        source = sys.argv[2] if len(sys.argv) >= 3 else KNOWLEDGE_DIR
+        LocalKnowledgeIndex().build(source)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "search":
+        index = LocalKnowledgeIndex()
+        start = time.perf_counter()
+        results = index.search(' '.join(sys.argv[2:]))
+        print(f"⏱️ 检索用时 {(time.perf_counter() - start) * 1000:.2f}ms")
+        for score, coverage, passage in results:
+            print(f"[{score:.2f} 覆盖{coverage:.0%}] {passage['file']}: {passage['text'][:80]}")
+    else:
+        print(__doc__)
@@ -0,0 +1,209 @@
+"""
+本地技能模块
+在调用远程API之前，用预编译的正则表匹配简单意图（时间、日期、算术、控制指令），
+毫秒级直接在本地回复，回复格式与AI一致（带[emotion:xxx]标签）
+"""
+
+import re
+import time
+import threading
+from datetime import datetime
+
+# 中文数字
+CN_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+             '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+CN_UNITS = {'十': 10, '百': 100, '千': 1000, '万': 10000}
+NUMBER_PATTERN = r'[0-9.]+|[零〇一二两三四五六七八九十百千万点]+'
+WEEKDAYS = ['一', '二', '三', '四', '五', '六', '日']
+
+
+def parse_number(text):
+    """解析阿拉伯数字或中文数字，失败返回None"""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    if '点' in text:
+        integer_part, _, decimal_part = text.partition('点')
+        integer = parse_number(integer_part) if integer_part else 0
+        digits = [CN_DIGITS.get(ch) for ch in decimal_part]
+        if integer is None or not digits or None in digits:
+            return None
+        return float(f"{int(integer)}." + ''.join(str(d) for d in digits))
+
+    total = 0
+    section = 0
+    digit = None
+    for ch in text:
+        if ch in CN_DIGITS:
+            digit = CN_DIGITS[ch]
+        elif ch in CN_UNITS:
+            unit = CN_UNITS[ch]
+            if unit == 10000:
+                total = (total + section + (digit or 0)) * unit
+                section = 0
+            else:
+                # "十二" 里的十前面没有数字，按一十处理
+                section += (1 if digit is None else digit) * unit
+            digit = None
+        else:
+            return None
+    return total + section + (digit or 0)
+
+
+def format_number(value):
+    """整数不带小数点，其余保留最多4位小数"""
+    if value == int(value):
+        return str(int(value))
+    return f"{value:.4f}".rstrip('0').rstrip('.')
+
+
+class LocalSkillDispatcher:
+    def __init__(self):
+        """初始化本地技能分发器"""
+        # 技能表：[(名称, 正则, 处理函数, 忙碌时是否也响应)]
+        self.skills = []
+        self.combined_pattern = None
+        self.lock = threading.Lock()
+
+        # 统计
+        self.total_turns = 0
+        self.local_turns = 0
+        self.local_time_total = 0.0
+
+        self.register_builtin_skills()
+
+    def register(self, name, pattern, handler, allow_while_busy=False):
+        """
+        注册技能
+
+        Args:
+            name (str): 技能名称
+            pattern (str): 匹配整句的正则（匹配前会去掉空白和句末标点）
+            handler (callable): handler(match) -> str，返回带情绪标签的回复
+            allow_while_busy (bool): 桌宠正在说话/处理时是否也响应（如打断指令）
+        """
+        with self.lock:
+            self.skills.append((name, re.compile(pattern), handler, allow_while_busy))
+            # 所有技能合并成一个正则，一次匹配完成分发
+            # 技能内部的命名分组改成普通分组，避免不同技能的分组重名
+            combined = '|'.join(
+                f"(?P<skill{i}>{re.sub(r'[(][?]P<[^>]+>', '(?:', skill[1].pattern)})"
+                for i, skill in enumerate(self.skills)
+            )
+            self.combined_pattern = re.compile(f'^(?:{combined})$')
+
+    def register_builtin_skills(self):
+        """注册不依赖桌宠状态的内置技能"""
+        self.register('time', r'(?:现在)?(?:几点了?|几点钟|什么时间|几点几分)(?:了|啦|呀)?', self.handle_time)
+        self.register('date', r'(?:今天)?(?:几号|几月几号|星期几|礼拜几|周几)(?:了|啦|呀)?', self.handle_date)
+        self.register(
+            'arithmetic',
+            rf'(?:请问|帮我算一?下|算一?下|计算)?(?P<a>{NUMBER_PATTERN})'
+            rf'(?P<op>加上?|减去?|乘以?|除以|[+\-*/x×÷])(?P<b>{NUMBER_PATTERN})'
+            r'(?:等于|是)?(?:多少|几)?(?:呀|啊|呢)?',
+            self.handle_arithmetic
+        )
+
+    def normalize(self, text):
+        """去掉空白（Vosk的结果带空格）和句末标点"""
+        text = re.sub(r'\s+', '', text)
+        return text.rstrip('。！？!?~，,')
+
+    def match(self, text, busy=False):
+        """匹配技能，返回(名称, match, 处理函数)或None"""
+        if not self.combined_pattern:
+            return None
+
+        normalized = self.normalize(text)
+        combined_match = self.combined_pattern.match(normalized)
+        if not combined_match:
+            return None
+
+        index = int(combined_match.lastgroup[len('skill'):])
+        name, pattern, handler, allow_while_busy = self.skills[index]
+        if busy and not allow_while_busy:
+            return None
+        # 用技能自己的正则再匹配一次，拿到命名分组
+        return name, pattern.fullmatch(normalized), handler
+
+    def dispatch(self, text, busy=False):
+        """
+        尝试在本地处理输入
+
+        Args:
+            text (str): 用户输入
+            busy (bool): 桌宠是否正在说话/处理，忙碌时只响应允许打断的技能
+
+        Returns:
+            str: 带情绪标签的回复，无法本地处理时返回None
+        """
+        start_time = time.perf_counter()
+        if not busy:
+            self.total_turns += 1
+
+        matched = self.match(text, busy)
+        if not matched:
+            return None
+
+        name, skill_match, handler = matched
+        try:
+            response = handler(skill_match)
+        except Exception as e:
+            print(f"⚠️ 本地技能执行失败 {name}: {str(e)}")
+            return None
+
+        if response is None:
+            return None
+
+        elapsed = time.perf_counter() - start_time
+        if not busy:
+            self.local_turns += 1
+            self.local_time_total += elapsed
+        print(f"⚡ 本地技能[{name}]处理完成，用时 {elapsed * 1000:.2f}ms，"
+              f"已省去 {self.local_turns}/{self.total_turns} 次网络请求")
+        return response
+
+    def get_stats(self):
+        """获取统计信息"""
+        return {
+            'total_turns': self.total_turns,
+            'local_turns': self.local_turns,
+            'network_avoided_rate': self.local_turns / self.total_turns if self.total_turns else 0.0,
+            'avg_local_ms': self.local_time_total / self.local_turns * 1000 if self.local_turns else 0.0
+        }
+
+    def handle_time(self, match):
+        """报时"""
+        now = datetime.now()
+        period = '上午' if now.hour < 12 else '下午'
+        hour = now.hour if now.hour <= 12 else now.hour - 12
+        return f"[emotion:happy] 现在是{period}{hour}点{now.minute:02d}分哦~"
+
+    def handle_date(self, match):
+        """报日期"""
+        now = datetime.now()
+        return (f"[emotion:happy] 今天是{now.year}年{now.month}月{now.day}日，"
+                f"星期{WEEKDAYS[now.weekday()]}~")
+
+    def handle_arithmetic(self, match):
+        """四则运算"""
+        a = parse_number(match.group('a'))
+        b = parse_number(match.group('b'))
+        if a is None or b is None:
+            return None
+
+        op = match.group('op')
+        if op.startswith('加') or op == '+':
+            result = a + b
+        elif op.startswith('减') or op == '-':
+            result = a - b
+        elif op.startswith('乘') or op in ('*', 'x', '×'):
+            result = a * b
+        else:
+            if b == 0:
+                return "[emotion:surprised] 除数不能是零呀，笨逼算不出来~"
+            result = a / b
+
+        return f"[emotion:happy] 等于{format_number(result)}，笨逼算得快吧~"
@@ -0,0 +1,417 @@
+"""
+语音模型安装模块
+在后台下载Vosk模型压缩包：断线后用HTTP Range续传（下次启动也能接着下），读取块大小随网速自动调整，
+边下载边算SHA-256、边按本地文件头解压到临时目录，校验通过后用os.replace一步放到模型目录，
+中途失败不会留下半个模型；进度可以随时查询，界面上显示下载百分比
+
+用法（手动安装）：
+    python model_installer.py 下载地址 模型目录 [SHA-256]
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+
+import requests
+
+from config import MODEL_DOWNLOAD_MIN_CHUNK, MODEL_DOWNLOAD_MAX_CHUNK, MODEL_DOWNLOAD_RETRIES
+
+LOCAL_HEADER = b'PK\x03\x04'
+CENTRAL_HEADER = b'PK\x01\x02'
+END_OF_CENTRAL = b'PK\x05\x06'
+DATA_DESCRIPTOR = b'PK\x07\x08'
+LOCAL_HEADER_FORMAT = '<4sHHHHHIIIHH'
+LOCAL_HEADER_SIZE = struct.calcsize(LOCAL_HEADER_FORMAT)
+
+# 单次读取用时低于这个值就加大读取块，高于SLOW_READ_SECONDS就减小
+FAST_READ_SECONDS = 0.1
+SLOW_READ_SECONDS = 0.5
+
+
+def safe_join(directory, name):
+    """压缩包里的路径不能跳出解压目录"""
+    path = os.path.normpath(os.path.join(directory, name))
+    if os.path.isabs(name) or not path.startswith(os.path.normpath(directory) + os.sep):
+        raise ValueError(f"压缩包里有不安全的路径: {name}")
+    return path
+
+
+class StreamingZipExtractor:
+    """
+    边下载边解压：按顺序解析本地文件头，解出一个条目就写一个文件
+    遇到加密、ZIP64、分卷等解析不了的格式就放弃，下载完后再用zipfile整体解压
+    """
+
+    def __init__(self, target_dir):
+        self.target_dir = target_dir
+        self.buffer = bytearray()
+        self.entry = None
+        self.files = []  # 已经解出的文件名
+        self.finished = False  # 读到了中央目录，所有条目都解完了
+        self.failed = None  # 放弃流式解压的原因
+
+    def feed(self, data):
+        if self.finished or self.failed:
+            return
+        self.buffer += data
+        try:
+            while self.buffer and not self.finished and self.step():
+                pass
+        except Exception as e:
+            self.failed = str(e)
+            self.close_entry()
+
+    def step(self):
+        """处理缓冲区里的数据，数据不够时返回False等待更多数据"""
+        if self.entry is None:
+            return self.read_header()
+        if self.entry['descriptor_pending']:
+            return self.read_descriptor()
+        return self.read_data()
+
+    def read_header(self):
+        if len(self.buffer) < 4:
+            return False
+        signature = bytes(self.buffer[:4])
+        if signature in (CENTRAL_HEADER, END_OF_CENTRAL):
+            self.finished = True
+            return False
+        if signature != LOCAL_HEADER:
+            raise ValueError("无法识别的压缩包结构")
+        if len(self.buffer) < LOCAL_HEADER_SIZE:
+            return False
+        (_, _, flags, method, _, _, crc, compressed_size, _, name_length,
+         extra_length) = struct.unpack(LOCAL_HEADER_FORMAT, bytes(self.buffer[:LOCAL_HEADER_SIZE]))
+        header_size = LOCAL_HEADER_SIZE + name_length + extra_length
+        if len(self.buffer) < header_size:
+            return False
+
+        raw_name = bytes(self.buffer[LOCAL_HEADER_SIZE:LOCAL_HEADER_SIZE + name_length])
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+        has_descriptor = bool(flags & 0x08)
+        if flags & 0x01:
+            raise ValueError("不支持加密的压缩包")
+        if method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            raise ValueError(f"不支持的压缩方式: {method}")
+        if compressed_size == 0xFFFFFFFF:
+            raise ValueError("不支持ZIP64")
+        if has_descriptor and method == zipfile.ZIP_STORED:
+            raise ValueError("未压缩条目没有写明长度")
+        del self.buffer[:header_size]
+
+        path = safe_join(self.target_dir, name)
+        self.entry = {
+            'name': name,
+            'file': None,
+            'decompressor': zlib.decompressobj(-15) if method == zipfile.ZIP_DEFLATED else None,
+            'remaining': None if has_descriptor else compressed_size,
+            'expected_crc': None if has_descriptor else crc,
+            'crc': 0,
+            'descriptor_pending': False
+        }
+        if name.endswith('/'):
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.entry['file'] = open(path, 'wb')
+        return True
+
+    def write(self, data):
+        if data:
+            self.entry['crc'] = zlib.crc32(data, self.entry['crc'])
+            if self.entry['file']:
+                self.entry['file'].write(data)
+
+    def read_data(self):
+        entry = self.entry
+        decompressor = entry['decompressor']
+        if entry['remaining'] is not None:
+            take = min(len(self.buffer), entry['remaining'])
+            chunk = bytes(self.buffer[:take])
+            del self.buffer[:take]
+            entry['remaining'] -= take
+            self.write(decompressor.decompress(chunk) if decompressor else chunk)
+            if entry['remaining'] > 0:
+                return False
+            if decompressor:
+                self.write(decompressor.flush())
+            self.finish_entry()
+            return True
+
+        # 长度写在数据后面的描述符里，靠deflate流自己的结束标记找到条目结尾
+        self.write(decompressor.decompress(bytes(self.buffer)))
+        self.buffer = bytearray(decompressor.unused_data)
+        if not decompressor.eof:
+            return False
+        entry['descriptor_pending'] = True
+        return True
+
+    def read_descriptor(self):
+        offset = 4 if self.buffer[:4] == DATA_DESCRIPTOR else 0
+        if len(self.buffer) < offset + 12:
+            return False
+        self.entry['expected_crc'] = struct.unpack('<I', bytes(self.buffer[offset:offset + 4]))[0]
+        del self.buffer[:offset + 12]
+        self.finish_entry()
+        return True
+
+    def finish_entry(self):
+        entry = self.entry
+        self.close_entry()
+        if entry['crc'] != entry['expected_crc']:
+            raise ValueError(f"CRC校验失败: {entry['name']}")
+        if not entry['name'].endswith('/'):
+            self.files.append(entry['name'])
+
+    def close_entry(self):
+        if self.entry and self.entry['file']:
+            self.entry['file'].close()
+        self.entry = None
+
+
+class ModelInstaller:
+    def __init__(self, url, target_dir, sha256=None, progress_callback=None, session=None,
+                 min_chunk=MODEL_DOWNLOAD_MIN_CHUNK, max_chunk=MODEL_DOWNLOAD_MAX_CHUNK,
+                 retries=MODEL_DOWNLOAD_RETRIES):
+        """
+        初始化模型安装器
+
+        Args:
+            url (str): 模型压缩包下载地址
+            target_dir (str): 模型目录（安装完成前不存在）
+            sha256 (str): 压缩包的SHA-256，None时不校验
+            progress_callback (callable): 进度变化时调用 callback(进度字典)，在下载线程中执行
+            session (requests.Session): HTTP会话
+            min_chunk (int): 每次读取的最小字节数
+            max_chunk (int): 每次读取的最大字节数
+            retries (int): 断线后自动续传几次
+        """
+        self.url = url
+        self.target_dir = os.path.abspath(str(target_dir))
+        self.sha256 = sha256.lower() if sha256 else None
+        self.progress_callback = progress_callback
+        self.session = session or requests.Session()
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.retries = retries
+        # 未下载完的压缩包和它的ETag，下次启动可以接着下
+        self.part_path = self.target_dir + '.zip.part'
+        self.meta_path = self.part_path + '.json'
+
+        self.thread = None
+        self.lock = threading.Lock()
+        self.progress = {
+            'state': 'idle',  # idle / downloading / extracting / done / failed
+            'downloaded': 0,
+            'total': 0,
+            'percent': 0.0,
+            'speed': 0.0,  # 字节/秒
+            'resumed_from': 0,
+            'error': None
+        }
+
+    def start(self, on_done=None):
+        """
+        在后台线程安装
+
+        Args:
+            on_done (callable): 安装结束后调用 on_done(是否成功)
+        """
+        def _run():
+            success = self.install()
+            if on_done:
+                on_done(success)
+
+        self.thread = threading.Thread(target=_run, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def get_progress(self):
+        with self.lock:
+            return dict(self.progress)
+
+    def update_progress(self, **changes):
+        with self.lock:
+            self.progress.update(changes)
+            if self.progress['total']:
+                self.progress['percent'] = min(100.0, self.progress['downloaded'] / self.progress['total'] * 100)
+            progress = dict(self.progress)
+        if self.progress_callback:
+            self.progress_callback(progress)
+
+    def install(self):
+        """下载、校验并安装模型，返回是否成功"""
+        if os.path.isdir(self.target_dir):
+            self.update_progress(state='done', percent=100.0)
+            return True
+
+        parent = os.path.dirname(self.target_dir)
+        for attempt in range(self.retries + 1):
+            staging = tempfile.mkdtemp(prefix='.' + os.path.basename(self.target_dir) + '.', dir=parent)
+            try:
+                extractor = StreamingZipExtractor(staging)
+                digest = self.download(extractor)
+                if self.sha256 and digest != self.sha256:
+                    # 压缩包坏了，从头重新下载
+                    self.remove_partial()
+                    raise ValueError(f"SHA-256校验失败: {digest}")
+                if not self.sha256:
+                    print(f"⚠️ 没有配置SHA-256，未校验模型压缩包: {digest}")
+
+                self.update_progress(state='extracting')
+                self.finish_extract(extractor, staging)
+                os.replace(self.model_root(staging), self.target_dir)
+                self.remove_partial()
+                self.update_progress(state='done', error=None)
+                print(f"✅ 模型安装完成: {self.target_dir}")
+                return True
+            except Exception as e:
+                print(f"⚠️ 模型下载失败（第 {attempt + 1} 次）: {str(e)}")
+                self.update_progress(error=str(e))
+                if isinstance(e, zipfile.BadZipFile):
+                    self.remove_partial()
+                if attempt < self.retries:
+                    time.sleep(min(2 ** attempt, 10))
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+
+        self.update_progress(state='failed')
+        return False
+
+    def download(self, extractor):
+        """续传或从头下载压缩包，返回SHA-256"""
+        offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        headers = {}
+        validator = self.load_validator() if offset else None
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            if validator:
+                # 服务器上的文件变了就返回整个新文件，不会拼出坏压缩包
+                headers['If-Range'] = validator
+
+        hasher = hashlib.sha256()
+        with self.session.get(self.url, headers=headers, stream=True, timeout=(10, 30)) as response:
+            if response.status_code == 416:
+                # 上次已经下载完整
+                total = offset
+            elif response.status_code == 206:
+                total = self.parse_total(response, offset)
+            else:
+                response.raise_for_status()
+                offset = 0
+                total = int(response.headers.get('content-length', 0))
+                self.save_validator(response)
+            self.update_progress(state='downloading', downloaded=offset, total=total, resumed_from=offset)
+            if offset:
+                print(f"⏯️ 从 {offset / 1024 / 1024:.1f}MB 处继续下载模型")
+                self.replay_partial(hasher, extractor)
+            if response.status_code != 416:
+                self.stream_to_disk(response, offset, hasher, extractor)
+        return hasher.hexdigest()
+
+    def replay_partial(self, hasher, extractor):
+        """已经下载的部分也要算进哈希并解压"""
+        with open(self.part_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(block)
+                extractor.feed(block)
+
+    def stream_to_disk(self, response, offset, hasher, extractor):
+        chunk_size = self.min_chunk
+        downloaded = offset
+        started = time.perf_counter()
+        with open(self.part_path, 'ab' if offset else 'wb') as f:
+            while True:
+                read_start = time.perf_counter()
+                data = response.raw.read(chunk_size, decode_content=True)
+                if not data:
+                    break
+                read_time = time.perf_counter() - read_start
+                f.write(data)
+                hasher.update(data)
+                extractor.feed(data)
+                downloaded += len(data)
+                self.update_progress(downloaded=downloaded,
+                                     speed=(downloaded - offset) / max(time.perf_counter() - started, 1e-6))
+                # 网速快时读大块减少系统调用，慢时读小块让进度及时刷新
+                if read_time < FAST_READ_SECONDS and len(data) == chunk_size:
+                    chunk_size = min(chunk_size * 2, self.max_chunk)
+                elif read_time > SLOW_READ_SECONDS:
+                    chunk_size = max(chunk_size // 2, self.min_chunk)
+        total = self.get_progress()['total']
+        if total and downloaded < total:
+            raise IOError(f"下载中断（{downloaded}/{total} 字节）")
+
+    def finish_extract(self, extractor, staging):
+        """流式解压没解完或者和中央目录对不上时，用zipfile重新解压"""
+        with zipfile.ZipFile(self.part_path) as archive:
+            expected = [info.filename for info in archive.infolist() if not info.is_dir()]
+            if extractor.finished and not extractor.failed and sorted(extractor.files) == sorted(expected):
+                return
+            if extractor.failed:
+                print(f"💡 无法边下载边解压（{extractor.failed}），下载完后整体解压")
+            for entry in os.listdir(staging):
+                shutil.rmtree(os.path.join(staging, entry), ignore_errors=True)
+            for info in archive.infolist():
+                safe_join(staging, info.filename)
+            archive.extractall(staging)
+
+    @staticmethod
+    def model_root(staging):
+        """压缩包里只有一个顶层目录（如 vosk-model-cn-0.22/）时，它才是模型目录"""
+        entries = os.listdir(staging)
+        if len(entries) == 1 and os.path.isdir(os.path.join(staging, entries[0])):
+            return os.path.join(staging, entries[0])
+        return staging
+
+    @staticmethod
+    def parse_total(response, offset):
+        """从 Content-Range: bytes 100-199/200 取出文件总长度"""
+        content_range = response.headers.get('content-range', '')
+        if '/' in content_range and not content_range.endswith('*'):
+            return int(content_range.rsplit('/', 1)[1])
+        return offset + int(response.headers.get('content-length', 0))
+
+    def load_validator(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('validator')
+        except (OSError, ValueError):
+            return None
+
+    def save_validator(self, response):
+        validator = response.headers.get('etag') or response.headers.get('last-modified')
+        try:
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': self.url, 'validator': validator}, f)
+        except OSError:
+            pass
+
+    def remove_partial(self):
+        for path in (self.part_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# 手动安装模型
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+
+    def print_progress(progress):
+        if progress['state'] == 'downloading':
+            print(f"\r📥 下载进度: {progress['percent']:.1f}% ({progress['speed'] / 1024 / 1024:.1f}MB/s)",
+                  end='', flush=True)
+
+    installer = ModelInstaller(sys.argv[1], sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None,
+                               progress_callback=print_progress)
+    sys.exit(0 if installer.install() else 1)
@@ -0,0 +1,193 @@
+"""
+网页正文补充模块
+搜索结果只有一句摘要时，并发抓取前几个相关链接，用流式HTML解析器边下载边提取正文，
+限制连接数、每页字节数和总时间，提取的正文交给搜索上下文压缩器筛选
+"""
+
+import codecs
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+
+import requests
+
+from config import ENRICH_MAX_PAGES, ENRICH_MAX_CONNECTIONS, ENRICH_MAX_BYTES, ENRICH_DEADLINE
+
+# 这些标签里的内容不是正文
+SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form', 'svg', 'button', 'select'}
+# 这些标签里的内容算正文
+CONTENT_TAGS = {'p', 'li', 'h1', 'h2', 'h3', 'h4', 'td', 'dd', 'blockquote', 'pre'}
+# 正文段落至少多少字
+MIN_BLOCK_CHARS = 8
+# Content-Type没写编码时，在网页开头这么多字节里找<meta charset>
+SNIFF_BYTES = 4096
+META_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-z0-9_\-]+)', re.IGNORECASE)
+# 网页声明的编码按浏览器的习惯换成兼容的超集
+CHARSET_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'iso-8859-1': 'cp1252', 'ascii': 'cp1252'}
+
+
+def header_charset(content_type):
+    """Content-Type里声明的编码，没有声明返回None"""
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.partition('=')
+        value = value.strip(' "\'')
+        if key.strip().lower() == 'charset' and value:
+            return value
+    return None
+
+
+def sniff_charset(head):
+    """按网页开头判断编码：BOM、<meta charset>，都没有时UTF-8解得开就用UTF-8，否则猜编码"""
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    match = META_CHARSET_PATTERN.search(head)
+    if match:
+        return match.group(1).decode('ascii')
+    try:
+        # 不是最后一块，结尾被截断的多字节字符不算错
+        codecs.getincrementaldecoder('utf-8')().decode(head)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return requests.compat.chardet.detect(head)['encoding'] or 'utf-8'
+
+
+def get_decoder(charset):
+    """按编码名创建增量解码器，不认识的编码用UTF-8"""
+    charset = CHARSET_ALIASES.get(charset.lower(), charset)
+    try:
+        return codecs.getincrementaldecoder(charset)(errors='ignore')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='ignore')
+
+
+class MainTextExtractor(HTMLParser):
+    """流式正文提取器，可以分多次feed"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skip_depth = 0
+        self.content_depth = 0
+        self.current = []
+        self.blocks = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in CONTENT_TAGS:
+            self.content_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in CONTENT_TAGS:
+            self.content_depth = max(0, self.content_depth - 1)
+            if self.content_depth == 0:
+                self.flush_block()
+
+    def handle_data(self, data):
+        if self.skip_depth == 0 and self.content_depth > 0:
+            self.current.append(data)
+
+    def flush_block(self):
+        block = ' '.join(''.join(self.current).split())
+        self.current = []
+        if len(block) >= MIN_BLOCK_CHARS:
+            self.blocks.append(block)
+
+    def get_text(self):
+        self.flush_block()
+        return '\n'.join(self.blocks)
+
+
+class PageEnricher:
+    def __init__(self, max_pages=ENRICH_MAX_PAGES, max_connections=ENRICH_MAX_CONNECTIONS,
+                 max_bytes=ENRICH_MAX_BYTES, deadline=ENRICH_DEADLINE):
+        """
+        初始化网页正文补充
+
+        Args:
+            max_pages (int): 最多抓取几个链接
+            max_connections (int): 同时最多几个连接
+            max_bytes (int): 每个网页最多下载多少字节
+            deadline (float): 整个补充过程的总时间上限（秒）
+        """
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="enrich")
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (DesktopPet)'
+
+    def fetch_text(self, url, end_time):
+        """流式下载网页并提取正文，超过字节数或时间上限就停止，只返回已经解析出的部分"""
+        remaining = end_time - time.time()
+        if remaining <= 0:
+            return ''
+
+        extractor = MainTextExtractor()
+        with self.session.get(url, stream=True, timeout=(min(remaining, 2), remaining)) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', 'text/html')
+            if 'html' not in content_type:
+                return ''
+
+            # 没有声明编码时不能用requests默认的ISO-8859-1，先攒一段开头判断编码
+            charset = header_charset(content_type)
+            decoder = get_decoder(charset) if charset else None
+            head = b''
+            received = 0
+            for chunk in response.iter_content(chunk_size=min(16384, self.max_bytes)):
+                chunk = chunk[:self.max_bytes - received]
+                received += len(chunk)
+                finished = received >= self.max_bytes or time.time() >= end_time
+                if decoder is None:
+                    head += chunk
+                    if len(head) < SNIFF_BYTES and not finished:
+                        continue
+                    decoder = get_decoder(sniff_charset(head))
+                    chunk = head
+                extractor.feed(decoder.decode(chunk))
+                if finished:
+                    break
+            if decoder is None and head:
+                extractor.feed(get_decoder(sniff_charset(head)).decode(head, final=True))
+
+        return extractor.get_text()
+
+    def enrich(self, urls, deadline=None):
+        """
+        并发抓取相关链接的正文，搜索结果只有一句摘要（短于ENRICH_MAX_SUMMARY_CHARS）时由搜索调用
+
+        Args:
+            urls (list): 候选链接，按相关度排序
+            deadline (float): 本次最多用多少秒，默认使用初始化时的设置
+
+        Returns:
+            str: 按链接顺序拼接的正文，超时未完成的页面被丢弃
+        """
+        urls = list(dict.fromkeys(urls))[:self.max_pages]
+        if not urls:
+            return ''
+
+        deadline = min(deadline, self.deadline) if deadline is not None else self.deadline
+        end_time = time.time() + deadline
+        futures = [self.executor.submit(self.fetch_text, url, end_time) for url in urls]
+        done, pending = wait(futures, timeout=max(0.0, deadline))
+        for future in pending:
+            future.cancel()
+
+        texts = []
+        for url, future in zip(urls, futures):
+            if future not in done:
+                continue
+            try:
+                text = future.result()
+            except Exception as e:
+                print(f"⚠️ 抓取网页失败 {url}: {str(e)}")
+                continue
+            if text:
+                texts.append(text)
+
+        print(f"📄 网页正文补充: {len(texts)}/{len(urls)} 个页面，用时 {deadline - max(0.0, end_time - time.time()):.2f}s")
+        return '\n'.join(texts)
@@ -0,0 +1,136 @@
+"""
+多语言并发识别模块
+同一段录音同时发给几个语言版本的在线识别（zh-CN / zh-TW / zh-HK），
+按配置的策略选结果，选定后取消还没开始的请求，没听清时不用再串行多等几个网络往返
+识别后端可以替换：backend(audio, language) 返回文本，没听清返回None或空字符串，网络错误直接抛出
+"""
+
+import re
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from config import RECOGNITION_LANGUAGES, RECOGNITION_POLICY, RECOGNITION_TIMEOUT
+
+POLICY_FIRST = 'first'  # 最先返回的非空结果
+POLICY_PRIORITY = 'priority'  # 排在前面的语言都没听清才用后面的结果
+POLICY_COMBINE = 'combine'  # 等全部返回，取出现最多的结果，一样多时按语言顺序
+# 比较结果时忽略空格和标点
+IGNORED_CHARS_PATTERN = re.compile(r'[\s，。！？、,.!?]')
+
+
+class ParallelRecognizer:
+    def __init__(self, backend, languages=RECOGNITION_LANGUAGES, policy=RECOGNITION_POLICY,
+                 timeout=RECOGNITION_TIMEOUT):
+        """
+        初始化并发识别
+
+        Args:
+            backend (callable): backend(audio, language) -> 文本，没听清返回None
+            languages (list): 语言列表，排在前面的优先
+            policy (str): 选结果的策略（first / priority / combine）
+            timeout (float): 一次识别最多等多久（秒）
+        """
+        if policy not in (POLICY_FIRST, POLICY_PRIORITY, POLICY_COMBINE):
+            raise ValueError(f"未知的识别策略: {policy}")
+        self.backend = backend
+        self.languages = list(languages)
+        self.policy = policy
+        self.timeout = timeout
+        # 被取消的请求如果已经在跑，会占着线程直到自己超时，多留一倍线程给下一句话
+        self.executor = ThreadPoolExecutor(max_workers=len(self.languages) * 2, thread_name_prefix="recognize")
+
+        # 统计
+        self.recognized = 0
+        self.wins = Counter()
+        self.total_latency = 0.0
+
+    def recognize(self, audio):
+        """
+        识别一段录音
+
+        Returns:
+            str: 识别文本，都没听清或超时返回None
+
+        Raises:
+            Exception: 没有任何语言给出非空结果、并且有请求出错时抛出第一个错误
+        """
+        start_time = time.perf_counter()
+        end_time = start_time + self.timeout
+        futures = {self.executor.submit(self.backend, audio, language): language for language in self.languages}
+        pending = set(futures)
+        results = {}  # 语言 -> 文本，按返回顺序
+        errors = {}  # 语言 -> 异常
+
+        try:
+            while pending:
+                remaining = end_time - time.perf_counter()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    language = futures[future]
+                    try:
+                        results[language] = (future.result() or '').strip()
+                    except Exception as e:
+                        errors[language] = e
+                winner = self.choose(results, errors, finished=not pending)
+                if winner:
+                    return self.accept(winner, results, start_time)
+        finally:
+            # 取消还没开始的请求，已经在跑的结果被丢弃
+            for future in pending:
+                future.cancel()
+
+        winner = self.choose(results, errors, finished=True)
+        if winner:
+            return self.accept(winner, results, start_time)
+        # 没选出结果说明没有非空结果，其中有出错的就不能当成没听清
+        if errors:
+            raise next(iter(errors.values()))
+        return None
+
+    def choose(self, results, errors, finished):
+        """按策略从已返回的结果里选一个语言，还需要等其他结果时返回None"""
+        if self.policy == POLICY_FIRST:
+            return next((language for language, text in results.items() if text), None)
+
+        if self.policy == POLICY_PRIORITY:
+            for language in self.languages:
+                if language not in results:
+                    # 出错的语言不用等，还没返回的语言要等它（除非已经结束）
+                    if finished or language in errors:
+                        continue
+                    return None
+                if results[language]:
+                    return language
+            return None
+
+        # 合并：全部返回后投票
+        if not finished:
+            return None
+        votes = Counter(IGNORED_CHARS_PATTERN.sub('', text) for text in results.values() if text)
+        if not votes:
+            return None
+        best = max(votes.values())
+        for language in self.languages:
+            text = results.get(language)
+            if text and votes[IGNORED_CHARS_PATTERN.sub('', text)] == best:
+                return language
+        return None
+
+    def accept(self, language, results, start_time):
+        self.recognized += 1
+        self.wins[language] += 1
+        self.total_latency += time.perf_counter() - start_time
+        return results[language]
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self):
+        return {
+            'recognized': self.recognized,
+            'wins': dict(self.wins),
+            'avg_latency_ms': self.total_latency / self.recognized * 1000 if self.recognized else 0.0
+        }
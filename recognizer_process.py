@@ -0,0 +1,182 @@
+"""
+独立进程语音识别模块
+Vosk解码放到单独的进程里，不和Tk动画、图片解码、TTS播放抢GIL：
+音频写进共享内存环形缓冲区，只通过队列传递位置，识别结果和中间结果从结果队列返回，
+识别进程崩溃或卡住时自动重启
+RecognizerProcess的接口和vosk.KaldiRecognizer一致，可以直接替换
+"""
+
+import json
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from audio_capture import RingBuffer
+from config import AUDIO_RING_SECONDS, RECOGNIZER_PROCESS_TIMEOUT
+
+# 加载大模型可能要十几秒
+MODEL_LOAD_TIMEOUT = 120
+
+
+def recognizer_worker(shm_name, capacity, model_path, rate, grammar, commands, results):
+    """识别进程入口：从共享内存读音频，结果放进结果队列"""
+    import vosk
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    ring = RingBuffer(capacity, np.ndarray((capacity,), dtype=np.int16, buffer=shm.buf))
+    model = vosk.Model(model_path)
+    rec = vosk.KaldiRecognizer(model, rate, grammar) if grammar else vosk.KaldiRecognizer(model, rate)
+    results.put(('ready', None, 0.0))
+
+    try:
+        while True:
+            command = commands.get()
+            cpu_start = time.thread_time()
+            if command[0] == 'accept':
+                _, start, end = command
+                # 写入方在主进程，位置由命令带过来
+                ring.written = end
+                samples, _ = ring.read(start)
+                accepted = rec.AcceptWaveform(samples.tobytes())
+                text = rec.Result() if accepted else rec.PartialResult()
+                results.put(('accept', (accepted, text), time.thread_time() - cpu_start))
+            elif command[0] == 'final':
+                results.put(('final', rec.FinalResult(), time.thread_time() - cpu_start))
+            elif command[0] == 'reset':
+                rec.Reset()
+                results.put(('reset', None, time.thread_time() - cpu_start))
+            elif command[0] == 'stop':
+                break
+    finally:
+        # 先释放共享内存上的数组，否则无法关闭
+        del ring
+        shm.close()
+
+
+class RecognizerProcess:
+    def __init__(self, model_path, rate=16000, grammar=None, ring_seconds=AUDIO_RING_SECONDS,
+                 timeout=RECOGNIZER_PROCESS_TIMEOUT):
+        """
+        启动识别进程
+
+        Args:
+            model_path (str): Vosk模型目录
+            rate (int): 采样率
+            grammar (str): 限定识别范围的JSON短语列表，None表示完整听写
+            ring_seconds (float): 共享环形缓冲区的长度（秒），必须大于单次送入的音频
+            timeout (float): 单次识别请求最多等多久（秒），超时认为进程卡死并重启
+        """
+        self.model_path = model_path
+        self.rate = rate
+        self.grammar = grammar
+        self.timeout = timeout
+        self.context = mp.get_context('spawn')
+
+        capacity = int(rate * ring_seconds)
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity * 2)
+        self.ring = RingBuffer(capacity, np.ndarray((capacity,), dtype=np.int16, buffer=self.shm.buf))
+
+        self.process = None
+        self.last_accepted = False
+        self.last_text = '{}'
+
+        # 统计
+        self.restarts = 0
+        self.cpu_time = 0.0  # 识别进程里解码用的CPU时间（秒）
+
+        self.start()
+
+    def start(self):
+        """启动识别进程并等待模型加载完成"""
+        self.commands = self.context.Queue()
+        self.results = self.context.Queue()
+        self.process = self.context.Process(
+            target=recognizer_worker,
+            args=(self.shm.name, self.ring.capacity, self.model_path, self.rate, self.grammar,
+                  self.commands, self.results),
+            daemon=True
+        )
+        self.process.start()
+        deadline = time.time() + MODEL_LOAD_TIMEOUT
+        while True:
+            try:
+                self.results.get(timeout=0.5)
+                break
+            except queue.Empty:
+                # 进程在加载模型时退出（模型损坏、内存不足等）不用等到超时
+                if not self.process.is_alive() or time.time() > deadline:
+                    raise RuntimeError("识别进程启动失败")
+        print(f"🧵 识别进程已启动 (pid {self.process.pid})")
+
+    def restart(self):
+        """识别进程崩溃或卡住时重启，当前这句话的识别状态会丢失"""
+        self.restarts += 1
+        print(f"⚠️ 识别进程无响应，正在重启（第 {self.restarts} 次）")
+        if self.process and self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        try:
+            self.start()
+        except Exception as e:
+            print(f"❌ 识别进程重启失败: {str(e)}")
+
+    def call(self, *command):
+        """发送命令并等待结果，失败时重启进程并返回None"""
+        if not self.process.is_alive():
+            self.restart()
+            return None
+        self.commands.put(command)
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                kind, payload, cpu = self.results.get(timeout=0.2)
+                break
+            except queue.Empty:
+                # 进程崩溃时马上重启，不用等到超时
+                if not self.process.is_alive() or time.time() > deadline:
+                    self.restart()
+                    return None
+        self.cpu_time += cpu
+        return payload
+
+    def AcceptWaveform(self, data):
+        start = self.ring.written
+        self.ring.write(np.frombuffer(data, dtype=np.int16))
+        payload = self.call('accept', start, self.ring.written)
+        if payload is None:
+            self.last_accepted, self.last_text = False, '{}'
+        else:
+            self.last_accepted, self.last_text = payload
+        return self.last_accepted
+
+    def Result(self):
+        return self.last_text if self.last_accepted else json.dumps({'text': ''})
+
+    def PartialResult(self):
+        return self.last_text if not self.last_accepted else json.dumps({'partial': ''})
+
+    def FinalResult(self):
+        return self.call('final') or json.dumps({'text': ''})
+
+    def Reset(self):
+        self.call('reset')
+
+    def close(self):
+        """停止识别进程并释放共享内存"""
+        try:
+            if self.process and self.process.is_alive():
+                self.commands.put(('stop',))
+                self.process.join(timeout=2)
+                if self.process.is_alive():
+                    self.process.kill()
+        finally:
+            # 先释放共享内存上的数组，否则无法关闭
+            self.ring = None
+            self.shm.close()
+            self.shm.unlink()
+
+    def get_stats(self):
+        return {'restarts': self.restarts, 'cpu_seconds': self.cpu_time}
@@ -0,0 +1,122 @@
+"""
+流式多相重采样模块
+很多USB/蓝牙麦克风只支持44.1kHz或48kHz，强行按16kHz打开会失败或者走系统重采样多一层延迟，
+所以按设备原生采样率采集，再用多相FIR滤波器转成Vosk要的16kHz int16：
+滤波器设计和scipy.signal.resample_poly一样（Kaiser窗sinc），每个输出样本只算用得到的那一相，
+整块用NumPy矩阵运算，块之间保存历史样本，分块处理和整段处理结果一致
+
+用法（测试每秒音频的重采样耗时）：
+    python resampler.py [设备采样率 ...]
+"""
+
+import sys
+import time
+from math import gcd
+
+import numpy as np
+
+# 滤波器半长 = 这个数 × max(上采样倍数, 下采样倍数)，和resample_poly相同
+HALF_LENGTH_FACTOR = 10
+KAISER_BETA = 5.0
+
+
+def design_filter(up, down, half_length_factor=HALF_LENGTH_FACTOR, beta=KAISER_BETA):
+    """低通原型滤波器（上采样后的采样率下），截止频率在输入和输出奈奎斯特频率中较低的那个"""
+    max_rate = max(up, down)
+    half_length = half_length_factor * max_rate
+    n = np.arange(2 * half_length + 1) - half_length
+    cutoff = 1.0 / max_rate
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(2 * half_length + 1, beta)
+    # 上采样插了零，增益要乘回来
+    return taps / taps.sum() * up
+
+
+class PolyphaseResampler:
+    def __init__(self, in_rate, out_rate=16000):
+        """
+        初始化重采样器
+
+        Args:
+            in_rate (int): 输入采样率（设备原生采样率）
+            out_rate (int): 输出采样率
+        """
+        in_rate, out_rate = int(round(in_rate)), int(out_rate)
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+
+        taps = design_filter(self.up, self.down)
+        # 拆成up相，每相taps_per_phase个系数；phases[p, k] 乘的是倒数第k个输入样本
+        self.taps_per_phase = -(-len(taps) // self.up)
+        padded = np.zeros(self.taps_per_phase * self.up)
+        padded[:len(taps)] = taps
+        self.phases = padded.reshape(self.taps_per_phase, self.up).T.astype(np.float32)
+        self.delay = (len(taps) - 1) // 2  # 滤波器群延迟（上采样后的样本数）
+        self.reset()
+
+    def reset(self):
+        """清空历史，开始一段新的音频"""
+        # 历史样本和它第一个样本的绝对位置，开头用零补齐
+        self.history = np.zeros(self.taps_per_phase - 1, dtype=np.float32)
+        self.history_start = -(self.taps_per_phase - 1)
+        # 下一个输出样本的序号
+        self.next_output = 0
+
+    def process(self, samples):
+        """
+        重采样一块音频
+
+        Args:
+            samples (np.ndarray): int16输入样本
+
+        Returns:
+            np.ndarray: int16输出样本（长度随块变化，整体平均是 输入长度 × out_rate / in_rate）
+        """
+        if self.up == self.down:
+            return samples
+        buffer = np.concatenate([self.history, samples.astype(np.float32)])
+        last_input = self.history_start + len(buffer) - 1
+
+        # 输出样本n取滤波结果的第 n*down + delay 个（扣掉群延迟，和输入对齐），要用到的最新输入是它整除up
+        last_output = (last_input * self.up + self.up - 1 - self.delay) // self.down
+        outputs = np.arange(self.next_output, last_output + 1, dtype=np.int64)
+        if len(outputs):
+            position = outputs * self.down + self.delay
+            newest = position // self.up
+            phase = position % self.up
+            index = newest[:, None] - np.arange(self.taps_per_phase)[None, :] - self.history_start
+            result = np.einsum('ij,ij->i', buffer[index], self.phases[phase])
+            self.next_output = last_output + 1
+        else:
+            result = np.zeros(0, dtype=np.float32)
+
+        # 只保留下一个输出样本还要用到的历史
+        keep_from = (self.next_output * self.down + self.delay) // self.up - (self.taps_per_phase - 1)
+        self.history = buffer[keep_from - self.history_start:]
+        self.history_start = keep_from
+        return np.clip(np.rint(result), -32768, 32767).astype(np.int16)
+
+
+def benchmark(in_rate, out_rate=16000, seconds=10, period_ms=20):
+    """按采集周期分块重采样一段噪声，返回每秒音频的处理耗时（毫秒）"""
+    resampler = PolyphaseResampler(in_rate, out_rate)
+    samples = (np.random.default_rng(0).standard_normal(int(in_rate * seconds)) * 3000).astype(np.int16)
+    block = int(in_rate * period_ms / 1000)
+    start = time.perf_counter()
+    produced = 0
+    for offset in range(0, len(samples), block):
+        produced += len(resampler.process(samples[offset:offset + block]))
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / seconds, produced
+
+
+# 测试重采样耗时
+if __name__ == "__main__":
+    rates = [int(rate) for rate in sys.argv[1:]] or [44100, 48000, 32000, 22050]
+    for rate in rates:
+        resampler = PolyphaseResampler(rate)
+        cost_ms, produced = benchmark(rate)
+        print(f"⏱️ {rate}Hz -> 16000Hz（{resampler.up}/{resampler.down}，每相 {resampler.taps_per_phase} 个系数）: "
+              f"每秒音频 {cost_ms:.2f}ms，输出 {produced} 个样本")
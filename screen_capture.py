@@ -3,9 +3,47 @@ from PIL import Image, ImageTk
 import io
 import base64
 from PIL import ImageGrab
+import math
 import os
 from datetime import datetime
 
+# 图像token开销估算（OpenAI风格：固定开销 + 每个512px图块的开销）
+IMAGE_BASE_TOKENS = 85
+IMAGE_TILE_TOKENS = 170
+IMAGE_TILE_SIZE = 512
+
+def estimate_image_tokens(width, height):
+    """估算一张图像的token开销"""
+    tiles = math.ceil(width / IMAGE_TILE_SIZE) * math.ceil(height / IMAGE_TILE_SIZE)
+    return IMAGE_BASE_TOKENS + IMAGE_TILE_TOKENS * tiles
+
+def fit_size_to_token_budget(width, height, token_budget):
+    """
+    计算在token预算内的最大缩放尺寸
+    
+    Args:
+        width (int): 原图宽度
+        height (int): 原图高度
+        token_budget (int): token预算
+        
+    Returns:
+        tuple: (宽, 高)，预算连一个图块都不够时返回单图块内的尺寸
+    """
+    max_tiles = max(1, (token_budget - IMAGE_BASE_TOKENS) // IMAGE_TILE_TOKENS)
+    scale = 1.0
+    # 逐步缩小直到图块数满足预算，每次只缩到刚好少一列或一行图块
+    while True:
+        w = max(1, int(width * scale))
+        h = max(1, int(height * scale))
+        cols = math.ceil(w / IMAGE_TILE_SIZE)
+        rows = math.ceil(h / IMAGE_TILE_SIZE)
+        if cols * rows <= max_tiles:
+            return w, h
+        if cols >= rows:
+            scale = min(scale, (cols - 1) * IMAGE_TILE_SIZE / width)
+        else:
+            scale = min(scale, (rows - 1) * IMAGE_TILE_SIZE / height)
+
 class ScreenCapture:
     def __init__(self):
         self.screenshot_dir = "screenshots"
@@ -71,12 +109,13 @@ class ScreenCapture:
             print(f"区域截图失败: {str(e)}")
             return None
     
-    def image_to_base64(self, image):
+    def image_to_base64(self, image, token_budget=None):
         """
         将PIL图像转换为base64编码字符串
         
         Args:
             image (PIL.Image): 图像对象
+            token_budget (int): 图像token预算，设置后按预算缩放
             
         Returns:
             str: base64编码的图像字符串
@@ -87,11 +126,16 @@ class ScreenCapture:
             
             # 压缩图像以减少API调用的数据量
             # 如果图像太大，先调整大小
-            max_size = 1024  # 最大边长
-            if max(image.size) > max_size:
-                ratio = max_size / max(image.size)
-                new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
+            if token_budget:
+                new_size = fit_size_to_token_budget(image.size[0], image.size[1], token_budget)
+                if new_size != image.size:
+                    image = image.resize(new_size, Image.Resampling.LANCZOS)
+            else:
+                max_size = 1024  # 最大边长
+                if max(image.size) > max_size:
+                    ratio = max_size / max(image.size)
+                    new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
+                    image = image.resize(new_size, Image.Resampling.LANCZOS)
             
             # 保存为JPEG格式以减少大小
             if image.mode == 'RGBA':
@@ -112,16 +156,19 @@ class ScreenCapture:
             print(f"图像转换base64失败: {str(e)}")
             return None
     
-    def quick_screenshot_for_ai(self):
+    def quick_screenshot_for_ai(self, token_budget=None):
         """
         快速截图并转换为API可用的格式
         
+        Args:
+            token_budget (int): 图像token预算，设置后按预算缩放
+        
         Returns:
             str: base64编码的图像字符串，可直接用于API调用
         """
         screenshot = self.capture_full_screen(save_to_file=False)
         if screenshot:
-            return self.image_to_base64(screenshot)
+            return self.image_to_base64(screenshot, token_budget)
         return None
 
 class ScreenRegionSelector:
@@ -1,104 +1,188 @@
-import requests
-import json
-from typing import List, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Optional
+from config import (SEARCH_DEADLINE, SEARCH_MIN_RESULT_CHARS, SERPER_API_KEY, ENRICH_ENABLED,
+                    ENRICH_MAX_SUMMARY_CHARS)
+from search_cache import SearchCache
+from search_providers import SearchProvider, DuckDuckGoProvider, SerperProvider
+from local_knowledge import LocalKnowledgeIndex, LocalKnowledgeProvider
+from page_enricher import PageEnricher
+from intent_engine import IntentEngine, Intent, INTENT_SEARCH
 
 class SearchAPI:
     def __init__(self):
         """初始化搜索API"""
+        # 搜索结果缓存，重复的问题直接返回
+        self.cache = SearchCache()
+        # 意图识别，判断是否需要搜索并提取关键词
+        self.intent_engine = IntentEngine()
+        
+        # 搜索提供方注册表，所有提供方并发查询，第一个合格结果胜出
+        self.providers = []
+        self.provider_stats = {}
+        self.stats_lock = threading.Lock()  # 提供方在线程池里并发执行，统计要加锁
+        self.deadline = SEARCH_DEADLINE
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search")
         # 使用免费的搜索API - DuckDuckGo Instant Answer API
-        self.search_url = "https://api.duckduckgo.com/"
-        self.serper_url = "https://google.serper.dev/search"
+        self.register_provider(DuckDuckGoProvider())
+        # 本地知识库（先运行 python local_knowledge.py build 建索引）
+        knowledge_index = LocalKnowledgeIndex()
+        if knowledge_index.exists():
+            self.register_provider(LocalKnowledgeProvider(knowledge_index))
+        if SERPER_API_KEY:
+            self.register_provider(SerperProvider(SERPER_API_KEY))
+        # 抓取相关网页正文，补充只有一句摘要的搜索结果
+        self.enricher = PageEnricher() if ENRICH_ENABLED else None
+    
+    def register_provider(self, provider: SearchProvider):
+        """注册搜索提供方"""
+        self.providers.append(provider)
+        with self.stats_lock:
+            self.provider_stats[provider.name] = {
+                'calls': 0, 'wins': 0, 'errors': 0, 'empty': 0, 'total_latency': 0.0
+            }
+    
+    def is_good_result(self, result: Optional[Dict]) -> bool:
+        """结果质量检查：太短的摘要没有参考价值"""
+        return bool(result and result.get('text') and len(result['text'].strip()) >= SEARCH_MIN_RESULT_CHARS)
+    
+    def _run_provider(self, provider: SearchProvider, query: str, timeout: float):
+        """执行单个提供方并记录耗时"""
+        self._count(provider, 'calls')
+        start_time = time.perf_counter()
+        try:
+            result = provider.search(query, timeout)
+            if not result:
+                self._count(provider, 'empty')
+            return result
+        except Exception:
+            self._count(provider, 'errors')
+            raise
+        finally:
+            self._count(provider, 'total_latency', time.perf_counter() - start_time)
+    
+    def _count(self, provider: SearchProvider, key: str, amount=1):
+        """累加提供方的统计"""
+        with self.stats_lock:
+            self.provider_stats[provider.name][key] += amount
+    
+    def search_providers(self, query: str, deadline: float = None):
+        """
+        并发查询所有提供方，第一个通过质量检查的结果胜出
+        
+        Args:
+            query (str): 搜索关键词
+            deadline (float): 总的等待时间（秒）
+        
+        Returns:
+            tuple: (结果dict或None, 是否可以缓存)，有提供方出错或超时且没有结果时不可缓存
+        """
+        deadline = deadline or self.deadline
+        end_time = time.time() + deadline
+        
+        # 本地提供方毫秒级返回，先同步查询，命中就不再联网
+        for provider in self.providers:
+            if not provider.is_local:
+                continue
+            try:
+                result = self._run_provider(provider, query, deadline)
+            except Exception as e:
+                print(f"{provider.name}搜索失败: {str(e)}")
+                continue
+            if self.is_good_result(result):
+                self._count(provider, 'wins')
+                return result, True
+        
+        futures = {
+            self.executor.submit(self._run_provider, provider, query, deadline): provider
+            for provider in self.providers if not provider.is_local
+        }
+        pending = set(futures)
+        fallback = None
+        definitive = True
         
-    def search_duckduckgo(self, query: str) -> str:
-        """使用DuckDuckGo搜索"""
         try:
-            params = {
-                'q': query,
-                'format': 'json',
-                'no_html': '1',
-                'skip_disambig': '1'
-            }
-            
-            response = requests.get(self.search_url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                
-                # 优先使用Abstract（摘要）
-                if data.get('Abstract'):
-                    return data['Abstract']
-                
-                # 然后使用Definition（定义）
-                if data.get('Definition'):
-                    return data['Definition']
-                
-                # 最后使用RelatedTopics的第一个
-                if data.get('RelatedTopics') and len(data['RelatedTopics']) > 0:
-                    first_topic = data['RelatedTopics'][0]
-                    if isinstance(first_topic, dict) and 'Text' in first_topic:
-                        return first_topic['Text']
-                
-                return None
-            
-            return None
-            
-        except Exception as e:
-            print(f"DuckDuckGo搜索失败: {str(e)}")
-            return None
+            while pending:
+                remaining = end_time - time.time()
+                if remaining <= 0:
+                    definitive = False
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    provider = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"{provider.name}搜索失败: {str(e)}")
+                        definitive = False
+                        continue
+                    if self.is_good_result(result):
+                        self._count(provider, 'wins')
+                        return result, True
+                    if result and not fallback:
+                        fallback = result
+        finally:
+            # 取消还没开始的请求，已经在跑的会在自己的超时后结束，结果被丢弃
+            for future in pending:
+                future.cancel()
+        
+        return fallback, definitive and fallback is None
     
     def search_web(self, query: str) -> str:
         """综合网络搜索 - 主要搜索方法"""
         try:
-            # 首先尝试DuckDuckGo
-            result = self.search_duckduckgo(query)
-            if result:
-                return result
+            # 先查缓存，没有结果的查询也会缓存一段时间
+            found, text = self.cache.get(query)
+            if not found:
+                # 并发查询所有提供方，搜索失败不写缓存
+                start_time = time.time()
+                result, cacheable = self.search_providers(query)
+                text = result['text'] if result else None
+                if (text and self.enricher and result.get('urls')
+                        and len(text.strip()) < ENRICH_MAX_SUMMARY_CHARS):
+                    # 只有一句摘要时补充正文，和搜索共用总时间，正文较长时由搜索上下文压缩器挑选相关句子
+                    remaining = self.deadline - (time.time() - start_time)
+                    extra = self.enricher.enrich(result['urls'], deadline=max(0.0, remaining))
+                    if extra:
+                        text = text + '\n' + extra
+                if text or cacheable:
+                    self.cache.put(query, text)
+            else:
+                print(f"📦 搜索缓存命中: {query}")
+            
+            if text:
+                return text
             
-            # 如果DuckDuckGo没有结果，返回提示信息
+            # 如果所有提供方都没有结果，返回提示信息
             return f"未找到关于'{query}'的详细信息。建议您换个关键词搜索，或者描述更具体的问题。"
             
         except Exception as e:
             return f"搜索时出现错误: {str(e)}"
     
+    def classify(self, text: str) -> Intent:
+        """一次扫描完成意图分类和关键词提取"""
+        return self.intent_engine.classify(text)
+    
     def is_search_query(self, text: str) -> bool:
         """判断是否为搜索查询"""
-        search_keywords = [
-            '搜索', 'search', '查找', '找', '查询', 
-            '你知道', '知道', '了解', '听说过',
-            '什么是', '是什么', '怎么', '如何',
-            '游戏攻略', '攻略', '策略', '技巧',
-            '怎么玩', '怎么做', '方法'
-        ]
-        
-        text_lower = text.lower()
-        for keyword in search_keywords:
-            if keyword in text_lower:
-                return True
-        
-        return False
+        return self.classify(text).kind == INTENT_SEARCH
     
     def extract_search_query(self, text: str) -> str:
         """从用户输入中提取搜索关键词"""
-        # 移除常见的前缀词
-        prefixes_to_remove = [
-            '搜索', 'search', '查找', '找一下', '查询',
-            '你知道', '知道不知道', '听说过', 
-            '什么是', '是什么', '告诉我',
-            '我想了解', '给我找', '帮我查'
-        ]
-        
-        cleaned_query = text.strip()
-        
-        # 移除问号和感叹号
-        cleaned_query = cleaned_query.replace('？', '').replace('?', '').replace('！', '').replace('!', '')
-        
-        # 移除前缀词
-        for prefix in prefixes_to_remove:
-            if cleaned_query.startswith(prefix):
-                cleaned_query = cleaned_query[len(prefix):].strip()
-                break
-        
-        # 如果查询为空，返回原文本
-        if not cleaned_query:
-            return text
-            
-        return cleaned_query
+        return self.classify(text).query
+    
+    def get_provider_stats(self) -> Dict:
+        """获取各提供方的平均耗时和胜出率"""
+        with self.stats_lock:
+            snapshot = {name: dict(s) for name, s in self.provider_stats.items()}
+        stats = {}
+        for name, s in snapshot.items():
+            stats[name] = {
+                'calls': s['calls'],
+                'wins': s['wins'],
+                'errors': s['errors'],
+                'avg_latency_ms': s['total_latency'] / s['calls'] * 1000 if s['calls'] else 0.0,
+                'win_rate': s['wins'] / s['calls'] if s['calls'] else 0.0
+            }
+        return stats
@@ -0,0 +1,132 @@
+"""
+搜索结果缓存模块
+用SQLite持久化缓存搜索结果，查询先归一化（去断句的标点、全角转半角、合并空白），
+有结果和无结果分别设置过期时间
+"""
+
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from config import SEARCH_CACHE_PATH, SEARCH_CACHE_HIT_TTL, SEARCH_CACHE_MISS_TTL
+
+# 关键词里的符号：夹在词中间的 . - _ ' / & @（3.5、node.js、gpt-4），粘在词上的 + #（c++、c#）
+TOKEN_SYMBOL_PATTERN = re.compile(r"(?<=\w)[.\-_'/&@](?=\w)|(?<=\w)[+#]+|[+#]+(?=\w)")
+
+
+def normalize_query(query):
+    """
+    归一化查询：全角转半角、转小写、去掉断句的标点符号、合并空白（中文之间的空白直接去掉）
+    词里的符号保留，"c++"、"c#"和"c"是不同的查询
+    """
+    query = unicodedata.normalize('NFKC', query).lower()
+    kept = set()
+    for match in TOKEN_SYMBOL_PATTERN.finditer(query):
+        kept.update(range(match.start(), match.end()))
+    chars = []
+    for i, ch in enumerate(query):
+        category = unicodedata.category(ch)
+        if category[0] in ('P', 'S') and i not in kept:
+            chars.append(' ')
+        else:
+            chars.append(ch)
+    query = ' '.join(''.join(chars).split())
+    # Vosk的识别结果词之间带空格，中文旁边的空格没有意义
+    return re.sub(r'(?<=[\u4e00-\u9fff]) | (?=[\u4e00-\u9fff])', '', query)
+
+
+class SearchCache:
+    def __init__(self, db_path=SEARCH_CACHE_PATH, hit_ttl=SEARCH_CACHE_HIT_TTL, miss_ttl=SEARCH_CACHE_MISS_TTL):
+        """
+        初始化搜索缓存
+
+        Args:
+            db_path (str): SQLite数据库路径，":memory:"表示只缓存在内存中
+            hit_ttl (float): 有结果的缓存有效期（秒）
+            miss_ttl (float): 无结果的缓存有效期（秒），通常短一些以便内容更新后能搜到
+        """
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.lock = threading.Lock()
+
+        # 搜索在后台线程里执行，连接需要跨线程使用
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "key TEXT PRIMARY KEY, result TEXT, created REAL NOT NULL)"
+        )
+        self.conn.commit()
+
+        # 统计
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.purged = 0
+
+        # 打开时清理一次过期缓存，之后写入时每隔一个无结果有效期清理一次
+        self.last_purge = 0.0
+        self.purge_expired()
+
+    def get(self, query):
+        """
+        查询缓存
+
+        Returns:
+            tuple: (是否命中, 结果)，命中的无结果缓存返回(True, None)
+        """
+        key = normalize_query(query)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT result, created FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row:
+                result, created = row
+                ttl = self.hit_ttl if result is not None else self.miss_ttl
+                if time.time() - created < ttl:
+                    if result is None:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                    return True, result
+
+            self.misses += 1
+            return False, None
+
+    def put(self, query, result):
+        """写入缓存，result为None表示没有搜索结果"""
+        key = normalize_query(query)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, result, created) VALUES (?, ?, ?)",
+                (key, result, time.time())
+            )
+            self.conn.commit()
+        if time.time() - self.last_purge >= self.miss_ttl:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """清理过期缓存"""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "DELETE FROM search_cache WHERE "
+                "(result IS NOT NULL AND created < ?) OR (result IS NULL AND created < ?)",
+                (now - self.hit_ttl, now - self.miss_ttl)
+            )
+            self.conn.commit()
+            self.purged += cursor.rowcount
+            self.last_purge = now
+
+    def get_stats(self):
+        """获取命中率统计"""
+        total = self.hits + self.negative_hits + self.misses
+        return {
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'purged': self.purged,
+            'hit_rate': (self.hits + self.negative_hits) / total if total else 0.0
+        }
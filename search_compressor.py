@@ -0,0 +1,128 @@
+"""
+搜索结果压缩模块
+把搜索结果切分成句子，用BM25对查询打分，只保留token预算内最相关的句子
+"""
+
+import re
+import numpy as np
+
+from config import SEARCH_CONTEXT_MAX_TOKENS
+
+# 中英文句子分隔符
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[。！？!?；;\n])|(?<=\.)\s+')
+# 中文字符 / 英文单词或数字
+CJK_PATTERN = re.compile(r'[一-鿿]')
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """分词：中文用单字+双字，英文用小写单词"""
+    text = text.lower()
+    tokens = WORD_PATTERN.findall(text)
+    chars = CJK_PATTERN.findall(text)
+    tokens.extend(chars)
+    # 只在连续的中文里组成双字
+    for run in re.findall(r'[一-鿿]{2,}', text):
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def estimate_tokens(text):
+    """粗略估算token数：中文每字约1个token，英文每4个字符约1个token"""
+    cjk_count = len(CJK_PATTERN.findall(text))
+    other = CJK_PATTERN.sub('', text)
+    return cjk_count + (len(other.strip()) + 3) // 4
+
+
+def split_sentences(text):
+    """把文本切分成句子，去掉空白句"""
+    sentences = []
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+        sentence = sentence.strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+class SearchContextCompressor:
+    def __init__(self, max_tokens=SEARCH_CONTEXT_MAX_TOKENS, k1=1.5, b=0.75):
+        """
+        初始化压缩器
+
+        Args:
+            max_tokens (int): 保留的搜索上下文token上限
+            k1 (float): BM25词频饱和参数
+            b (float): BM25长度归一化参数
+        """
+        self.max_tokens = max_tokens
+        self.k1 = k1
+        self.b = b
+
+    def score_sentences(self, query, sentences):
+        """用BM25对每个句子打分，返回numpy数组"""
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or not sentences:
+            return np.zeros(len(sentences))
+
+        term_index = {term: i for i, term in enumerate(query_terms)}
+        tf = np.zeros((len(sentences), len(query_terms)))
+        lengths = np.zeros(len(sentences))
+
+        for row, sentence in enumerate(sentences):
+            tokens = tokenize(sentence)
+            lengths[row] = len(tokens)
+            for token in tokens:
+                col = term_index.get(token)
+                if col is not None:
+                    tf[row, col] += 1
+
+        n = len(sentences)
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        avg_len = lengths.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / avg_len)
+        scores = (tf * (self.k1 + 1)) / (tf + norm[:, None])
+        return scores @ idf
+
+    def compress(self, query, text, max_tokens=None):
+        """
+        压缩搜索结果
+
+        Args:
+            query (str): 用户查询
+            text (str): 原始搜索结果
+            max_tokens (int): 本次的token预算，默认使用初始化时的设置
+
+        Returns:
+            str: 按原文顺序拼接的高分句子
+        """
+        if not text:
+            return text
+
+        budget = max_tokens or self.max_tokens
+        if estimate_tokens(text) <= budget:
+            return text.strip()
+
+        # 去掉重复句子
+        sentences = list(dict.fromkeys(split_sentences(text)))
+        scores = self.score_sentences(query, sentences)
+
+        # 分数相同时保留靠前的句子；有命中的句子时不再用无关句子填充预算
+        order = np.argsort(-scores, kind='stable')
+        if scores.max() > 0:
+            order = order[scores[order] > 0]
+        selected = []
+        used = 0
+        for idx in order:
+            cost = estimate_tokens(sentences[idx])
+            if used + cost > budget:
+                continue
+            selected.append(idx)
+            used += cost
+
+        if not selected:
+            # 单句就超预算时，截断最相关的那句
+            best = sentences[order[0]]
+            return best[:budget]
+
+        return ' '.join(sentences[i] for i in sorted(selected))
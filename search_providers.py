@@ -0,0 +1,106 @@
+"""
+搜索服务提供方模块
+每个提供方实现 search(query, timeout)，返回 {'text': 摘要, 'urls': 相关链接} 或 None（没有结果），
+网络错误直接抛出，由SearchAPI区分"没有结果"和"搜索失败"
+"""
+
+import requests
+from typing import Dict, Optional
+
+
+class SearchProvider:
+    """搜索提供方基类"""
+    name = "base"
+    # 本地提供方（不走网络）会在网络请求之前同步查询，命中就不再联网
+    is_local = False
+
+    def search(self, query: str, timeout: float) -> Optional[Dict]:
+        """
+        搜索
+
+        Args:
+            query (str): 搜索关键词
+            timeout (float): 本次请求最多等待的秒数
+
+        Returns:
+            dict: {'text': 摘要, 'urls': 相关链接列表}，没有结果时返回None
+        """
+        raise NotImplementedError
+
+
+class DuckDuckGoProvider(SearchProvider):
+    """DuckDuckGo Instant Answer API"""
+    name = "duckduckgo"
+
+    def __init__(self, search_url="https://api.duckduckgo.com/"):
+        self.search_url = search_url
+        self.session = requests.Session()
+
+    def search(self, query, timeout):
+        params = {
+            'q': query,
+            'format': 'json',
+            'no_html': '1',
+            'skip_disambig': '1'
+        }
+
+        response = self.session.get(self.search_url, params=params, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+
+        # 收集相关链接
+        urls = [topic['FirstURL'] for topic in data.get('RelatedTopics', [])
+                if isinstance(topic, dict) and topic.get('FirstURL')]
+        if data.get('AbstractURL'):
+            urls.insert(0, data['AbstractURL'])
+
+        # 优先使用Abstract（摘要），然后使用Definition（定义）
+        text = data.get('Abstract') or data.get('Definition')
+
+        # 最后使用RelatedTopics的第一个
+        if not text and data.get('RelatedTopics'):
+            first_topic = data['RelatedTopics'][0]
+            if isinstance(first_topic, dict) and 'Text' in first_topic:
+                text = first_topic['Text']
+
+        if not text:
+            return None
+        return {'text': text, 'urls': urls}
+
+
+class SerperProvider(SearchProvider):
+    """Serper（Google搜索）API，需要API Key"""
+    name = "serper"
+
+    def __init__(self, api_key, search_url="https://google.serper.dev/search"):
+        self.api_key = api_key
+        self.search_url = search_url
+        self.session = requests.Session()
+
+    def search(self, query, timeout):
+        response = self.session.post(
+            self.search_url,
+            headers={'X-API-KEY': self.api_key, 'Content-Type': 'application/json'},
+            json={'q': query, 'gl': 'cn', 'hl': 'zh-cn'},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        texts = []
+        urls = []
+        answer_box = data.get('answerBox') or {}
+        if answer_box.get('answer') or answer_box.get('snippet'):
+            texts.append(answer_box.get('answer') or answer_box.get('snippet'))
+        knowledge = data.get('knowledgeGraph') or {}
+        if knowledge.get('description'):
+            texts.append(knowledge['description'])
+        for item in data.get('organic', [])[:5]:
+            if item.get('snippet'):
+                texts.append(item['snippet'])
+            if item.get('link'):
+                urls.append(item['link'])
+
+        if not texts:
+            return None
+        return {'text': ' '.join(texts), 'urls': urls}
@@ -0,0 +1,181 @@
+"""
+大模型复核模块
+大小模型配合识别时，小模型负责实时中间结果和句尾判断，确认开始说话后，
+送给小模型的人声同时交给这里的后台线程，由大模型（默认在独立识别进程里）一边录一边解码，
+句子结束时只需要等大模型解完最后一小段，再用大模型的结果替换小模型的结果
+大模型在后台加载，加载完成前直接用小模型的结果
+"""
+
+import json
+import queue
+import threading
+import time
+
+import vosk
+
+from recognizer_process import RecognizerProcess
+from config import RECOGNIZER_OUT_OF_PROCESS, RESCORE_TIMEOUT
+
+
+class SegmentRescorer:
+    def __init__(self, model_path, rate=16000, timeout=RESCORE_TIMEOUT):
+        """
+        在后台加载大模型
+
+        Args:
+            model_path (str): 大模型目录
+            rate (int): 采样率
+            timeout (float): 句子结束后最多等大模型多久（秒）
+        """
+        self.model_path = model_path
+        self.rate = rate
+        self.timeout = timeout
+        self.rec = None
+        self.ready = False
+        self.loaded = threading.Event()  # 加载结束（成功或失败）
+        self.jobs = queue.SimpleQueue()
+        self.pending_lock = threading.Lock()
+        self.pending = 0  # 已经排队、大模型还没处理完的请求数
+        self.utterance = 0  # 当前这句话的编号
+        self.dropped = 0  # 编号不超过它的句子已经放弃，剩下的音频不再解码
+
+        # 当前这句话的状态，只在识别线程中使用
+        self.active = False
+        self.confirmed = False
+        self.buffered = []
+
+        # 统计
+        self.load_seconds = 0.0
+        self.rescored = 0
+        self.corrections = 0  # 大模型结果和小模型不同的次数
+        self.timeouts = 0
+        self.skipped = 0  # 大模型还在处理前面的句子，没有复核的句子数
+        self.total_wait = 0.0  # 句子结束后等大模型的总时间（秒）
+        self.last_wait_ms = 0.0
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        """大模型线程：加载模型后按顺序处理音频、结束和重置请求"""
+        start_time = time.perf_counter()
+        try:
+            if RECOGNIZER_OUT_OF_PROCESS:
+                self.rec = RecognizerProcess(self.model_path, self.rate)
+            else:
+                self.rec = vosk.KaldiRecognizer(vosk.Model(self.model_path), self.rate)
+        except Exception as e:
+            print(f"⚠️ 大模型加载失败，只用小模型识别: {str(e)}")
+            self.loaded.set()
+            return
+        self.load_seconds = time.perf_counter() - start_time
+        self.ready = True
+        self.loaded.set()
+        print(f"✅ 大模型加载完成（{self.load_seconds:.1f}s），开始复核识别结果")
+
+        pieces = []
+        while True:
+            kind, utterance, payload = self.jobs.get()
+            if kind == 'stop':
+                break
+            dropped = utterance <= self.dropped
+            if kind == 'audio' and not dropped:
+                if self.rec.AcceptWaveform(payload):
+                    pieces.append(json.loads(self.rec.Result()).get('text', '').strip())
+            elif kind == 'final' and not dropped:
+                pieces.append(json.loads(self.rec.FinalResult()).get('text', '').strip())
+                payload['text'] = ' '.join(piece for piece in pieces if piece)
+                payload['event'].set()
+                pieces = []
+            elif kind != 'audio':
+                # 放弃的句子不再解码，清掉已经送进去的部分
+                self.rec.Reset()
+                pieces = []
+            with self.pending_lock:
+                self.pending -= 1
+
+    def put(self, kind, payload=None):
+        with self.pending_lock:
+            self.pending += 1
+        self.jobs.put((kind, self.utterance, payload))
+
+    def start_utterance(self):
+        """
+        开始一句话，大模型还没加载好或者还在处理前面的句子时返回False，这句话只用小模型
+        大模型跟不上时不再排队，免得积压越来越多
+        """
+        self.active = self.ready
+        if self.active and self.pending:
+            self.skipped += 1
+            self.active = False
+        self.utterance += 1
+        self.confirmed = False
+        self.buffered = []
+        return self.active
+
+    def add(self, samples):
+        """小模型解码过的人声，确认开始说话前先攒着"""
+        if not self.active:
+            return
+        if self.confirmed:
+            self.put('audio', samples.tobytes())
+        else:
+            self.buffered.append(samples)
+
+    def confirm(self):
+        """端点检测确认开始说话，攒下的人声交给大模型"""
+        if not self.active or self.confirmed:
+            return
+        self.confirmed = True
+        for samples in self.buffered:
+            self.put('audio', samples.tobytes())
+        self.buffered = []
+
+    def finish(self):
+        """
+        句子结束，等大模型解完
+
+        Returns:
+            str: 大模型的识别结果，超时或没有在复核时返回None
+        """
+        if not self.active:
+            return None
+        self.confirm()
+        self.active = False
+        job = {'event': threading.Event(), 'text': None}
+        self.put('final', job)
+        start_time = time.perf_counter()
+        finished = job['event'].wait(self.timeout)
+        self.last_wait_ms = (time.perf_counter() - start_time) * 1000
+        self.total_wait += self.last_wait_ms / 1000
+        if not finished:
+            # 放弃这句话，大模型跳过还没解码的音频
+            self.dropped = self.utterance
+            self.timeouts += 1
+            return None
+        self.rescored += 1
+        return job['text']
+
+    def cancel(self):
+        """没人说话或者识别失败，丢掉这句话"""
+        if self.active and self.confirmed:
+            self.dropped = self.utterance
+            self.put('reset')
+        self.active = False
+        self.buffered = []
+
+    def close(self):
+        self.put('stop')
+        if isinstance(self.rec, RecognizerProcess):
+            self.rec.close()
+
+    def get_stats(self):
+        return {
+            'load_seconds': self.load_seconds,
+            'rescored': self.rescored,
+            'corrections': self.corrections,
+            'timeouts': self.timeouts,
+            'skipped': self.skipped,
+            'avg_wait_ms': (self.total_wait / (self.rescored + self.timeouts) * 1000
+                            if self.rescored + self.timeouts else 0.0)
+        }
@@ -0,0 +1,197 @@
+"""
+语义答案复用模块
+把问过的问题用哈希字符n-gram向量表示，新问题和旧问题的余弦相似度超过阈值时直接复用旧答案，
+索引持久化到磁盘，条数有上限，超出时淘汰最久没用过的
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from config import (SEMANTIC_CACHE_PATH, SEMANTIC_CACHE_DIM, SEMANTIC_CACHE_MAX_ENTRIES,
+                    SEMANTIC_CACHE_THRESHOLD)
+
+NGRAM_SIZES = (1, 2)
+# 疑问词、语气词和标点不影响问题的意思，向量化前去掉
+STRIP_PATTERN = re.compile(
+    r'怎么样?|什么|如何|哪些|推荐|一下|请问|应该|可以|[是的吗呢呀啊吧了要]|[\s，。！？、,.!?~～：:；;“”"\']+'
+)
+# 答案会随时间变化的问题不复用
+TIME_SENSITIVE_PATTERN = re.compile(r'今天|明天|昨天|现在|最近|最新|今年|天气|几点|新闻|价格|多少钱')
+
+
+def embed(text, dim=SEMANTIC_CACHE_DIM):
+    """把文本哈希成L2归一化的字符n-gram向量"""
+    text = STRIP_PATTERN.sub('', text.lower())
+    vector = np.zeros(dim, dtype=np.float32)
+    for n in NGRAM_SIZES:
+        for i in range(len(text) - n + 1):
+            # crc32在不同进程间稳定，持久化后的向量仍然有效
+            vector[zlib.crc32(text[i:i + n].encode('utf-8')) % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def is_cacheable(question):
+    """问题的答案是否稳定到可以复用"""
+    return not TIME_SENSITIVE_PATTERN.search(question)
+
+
+class SemanticAnswerCache:
+    def __init__(self, path=SEMANTIC_CACHE_PATH, dim=SEMANTIC_CACHE_DIM,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES, threshold=SEMANTIC_CACHE_THRESHOLD):
+        """
+        初始化语义答案缓存
+
+        Args:
+            path (str): 持久化文件路径（不含扩展名），None表示只保存在内存中
+            dim (int): 哈希向量维度
+            max_entries (int): 最多保存多少个问题
+            threshold (float): 复用答案的最低余弦相似度
+        """
+        self.path = path
+        self.dim = dim
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.lock = threading.Lock()
+
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.entries = []  # [{'question', 'answer', 'last_used'}]
+
+        # 统计
+        self.lookups = 0
+        self.hits = 0
+        self.false_hits = 0
+        self.last_hit = None
+
+        self.load()
+
+    def load(self):
+        """从磁盘加载索引"""
+        if not self.path or not os.path.exists(self.path + '.json'):
+            return
+        try:
+            with open(self.path + '.json', 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            vectors = np.load(self.path + '.npy')
+            if vectors.shape[1] != self.dim or len(vectors) != len(data['entries']):
+                print("⚠️ 语义缓存格式不匹配，重新开始")
+                return
+            self.vectors = vectors.astype(np.float32)
+            self.entries = data['entries']
+            self.false_hits = data.get('false_hits', 0)
+            print(f"🧠 已加载语义缓存: {len(self.entries)} 个问题")
+        except Exception as e:
+            print(f"⚠️ 加载语义缓存失败: {str(e)}")
+
+    def save(self):
+        """保存索引到磁盘"""
+        if not self.path:
+            return
+        try:
+            np.save(self.path + '.tmp.npy', self.vectors)
+            with open(self.path + '.tmp.json', 'w', encoding='utf-8') as f:
+                json.dump({'entries': self.entries, 'false_hits': self.false_hits}, f, ensure_ascii=False)
+            os.replace(self.path + '.tmp.npy', self.path + '.npy')
+            os.replace(self.path + '.tmp.json', self.path + '.json')
+        except Exception as e:
+            print(f"⚠️ 保存语义缓存失败: {str(e)}")
+
+    def lookup(self, question):
+        """
+        查找相似问题的答案
+
+        Returns:
+            str: 可以复用的答案，没有足够相似的问题时返回None
+        """
+        if not is_cacheable(question):
+            return None
+
+        with self.lock:
+            self.lookups += 1
+            if not self.entries:
+                return None
+
+            similarities = self.vectors @ embed(question, self.dim)
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                return None
+
+            entry = self.entries[best]
+            entry['last_used'] = time.time()
+            self.hits += 1
+            self.last_hit = {'question': question, 'matched': entry['question'], 'similarity': similarity}
+            print(f"🧠 语义缓存命中({similarity:.2f}): \"{question}\" ≈ \"{entry['question']}\"")
+            return entry['answer']
+
+    def add(self, question, answer):
+        """记录一个问题和它的答案，满了就淘汰最久没用过的"""
+        if not is_cacheable(question):
+            return
+        vector = embed(question, self.dim)
+        with self.lock:
+            # 几乎相同的问题直接更新答案
+            if self.entries:
+                similarities = self.vectors @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] > 0.99:
+                    self.entries[best].update(answer=answer, last_used=time.time())
+                    self.save()
+                    return
+
+            if len(self.entries) >= self.max_entries:
+                oldest = min(range(len(self.entries)), key=lambda i: self.entries[i]['last_used'])
+                self.remove_at(oldest)
+
+            self.vectors = np.vstack([self.vectors, vector[None, :]])
+            self.entries.append({'question': question, 'answer': answer, 'last_used': time.time()})
+            self.save()
+
+    def remove_at(self, index):
+        """删除一条记录（调用方持有锁）"""
+        self.vectors = np.delete(self.vectors, index, axis=0)
+        del self.entries[index]
+
+    def clear_last_hit(self):
+        """新一轮对话：上一轮复用的答案只能在紧接着的一句里反馈答错了"""
+        with self.lock:
+            self.last_hit = None
+
+    def report_false_hit(self):
+        """
+        用户反馈上一次复用的答案不对：记一次误命中，并删掉那条记录
+
+        Returns:
+            dict: 被判定为误命中的复用记录，没有可反馈的复用时返回None
+        """
+        with self.lock:
+            hit = self.last_hit
+            if not hit:
+                return None
+            self.last_hit = None
+            self.false_hits += 1
+            for i, entry in enumerate(self.entries):
+                if entry['question'] == hit['matched']:
+                    self.remove_at(i)
+                    break
+            self.save()
+        print(f"🧐 语义缓存误命中: \"{hit['question']}\" ≠ \"{hit['matched']}\" ({hit['similarity']:.2f})")
+        return hit
+
+    def get_stats(self):
+        """获取命中率和误命中数"""
+        return {
+            'entries': len(self.entries),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'hit_rate': self.hits / self.lookups if self.lookups else 0.0,
+            'false_hits': self.false_hits
+        }
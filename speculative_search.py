@@ -0,0 +1,133 @@
+"""
+预测搜索模块
+用户还在说话时，把Vosk的中间识别结果交给意图识别，一旦稳定识别出搜索意图就提前在后台搜索，
+说完后最终文本的搜索关键词一致就直接用结果，不一致就丢弃
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from intent_engine import INTENT_SEARCH
+from search_cache import normalize_query
+from config import SPECULATIVE_MIN_CONFIDENCE, SPECULATIVE_STABLE_PARTIALS, SPECULATIVE_MAX_LAUNCHES
+
+
+class SpeculativeSearch:
+    def __init__(self, search_api, min_confidence=SPECULATIVE_MIN_CONFIDENCE,
+                 stable_partials=SPECULATIVE_STABLE_PARTIALS, max_launches=SPECULATIVE_MAX_LAUNCHES):
+        """
+        初始化预测搜索
+
+        Args:
+            search_api (SearchAPI): 搜索接口，提供意图识别和搜索
+            min_confidence (float): 意图置信度达到多少才提前搜索
+            stable_partials (int): 关键词连续几次中间结果不变才提前搜索，避免对半句话搜索
+            max_launches (int): 每句话最多提前发起几次搜索
+        """
+        self.search_api = search_api
+        self.min_confidence = min_confidence
+        self.stable_partials = stable_partials
+        self.max_launches = max_launches
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="speculative")
+        self.lock = threading.Lock()
+
+        self.futures = {}  # 归一化的关键词 -> (发起时间, Future)
+        self.last_query = None
+        self.stable_count = 0
+
+        # 统计
+        self.launched = 0
+        self.used = 0
+        self.discarded = 0
+        self.saved_time = 0.0
+
+    def feed(self, partial_text):
+        """收到一次中间识别结果（在识别线程中调用，必须很快返回）"""
+        intent = self.search_api.classify(partial_text)
+        if intent.kind != INTENT_SEARCH or intent.confidence < self.min_confidence:
+            self.last_query = None
+            self.stable_count = 0
+            return
+
+        key = normalize_query(intent.query)
+        with self.lock:
+            if key == self.last_query:
+                self.stable_count += 1
+            else:
+                self.last_query = key
+                self.stable_count = 1
+
+            if (self.stable_count < self.stable_partials or key in self.futures
+                    or len(self.futures) >= self.max_launches):
+                return
+
+            print(f"🔮 预测搜索: {intent.query}")
+            self.futures[key] = (time.time(), self.executor.submit(self.timed_search, intent.query))
+            self.launched += 1
+
+    def timed_search(self, query):
+        """执行搜索并记录耗时"""
+        start_time = time.time()
+        result = self.search_api.search_web(query)
+        return result, time.time() - start_time
+
+    def claim(self, query, timeout=None):
+        """
+        最终文本确定后取预测搜索的结果，并清空这句话的预测状态
+
+        Args:
+            query (str): 最终文本的搜索关键词
+            timeout (float): 预测搜索还没完成时最多等多久，默认等到完成
+
+        Returns:
+            str: 搜索结果，没有对应的预测搜索时返回None
+        """
+        key = normalize_query(query)
+        with self.lock:
+            futures = self.futures
+            self.futures = {}
+            self.last_query = None
+            self.stable_count = 0
+
+        entry = futures.pop(key, None)
+        self.discarded += len(futures)
+        for _, future in futures.values():
+            future.cancel()
+
+        if not entry:
+            return None
+
+        launch_time, future = entry
+        claim_time = time.time()
+        try:
+            result, duration = future.result(timeout=timeout)
+        except Exception as e:
+            print(f"⚠️ 预测搜索失败: {str(e)}")
+            return None
+
+        self.used += 1
+        # 藏在用户说话过程中的搜索耗时：最多为搜索本身的耗时
+        self.saved_time += min(duration, claim_time - launch_time)
+        print(f"🔮 使用预测搜索结果: {query}")
+        return result
+
+    def discard(self):
+        """最终文本不需要搜索，丢弃所有预测"""
+        with self.lock:
+            futures = self.futures
+            self.futures = {}
+            self.last_query = None
+            self.stable_count = 0
+        self.discarded += len(futures)
+        for _, future in futures.values():
+            future.cancel()
+
+    def get_stats(self):
+        """获取统计信息"""
+        return {
+            'launched': self.launched,
+            'used': self.used,
+            'discarded': self.discarded,
+            'avg_saved_ms': self.saved_time / self.used * 1000 if self.used else 0.0
+        }
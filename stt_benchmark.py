@@ -0,0 +1,170 @@
+"""
+语音识别回放测试
+把WAV/PCM文件（或整个目录）送进和麦克风完全相同的识别、VAD和端点检测流程，不需要声卡，
+统计实时率(RTF)、句尾延迟和字错误率(CER)
+
+转写文本：同名的 .txt 文件，或者目录下的 transcripts.tsv（每行：文件名<TAB>文本）
+
+用法：
+    python stt_benchmark.py 音频文件或目录 [--realtime]
+"""
+
+import os
+import re
+import sys
+import time
+
+from audio_capture import FileAudioSource
+from voice_handler_local import LocalVoiceHandler
+
+AUDIO_EXTENSIONS = ('.wav', '.pcm', '.raw')
+# 计算字错误率时忽略空格和标点（Vosk中文结果按词加空格）
+IGNORED_CHARS_PATTERN = re.compile(r'[\s，。！？、,.!?；;：:“”"\']')
+
+
+def normalize_transcript(text):
+    return IGNORED_CHARS_PATTERN.sub('', text.lower())
+
+
+def edit_distance(reference, hypothesis):
+    """字符级编辑距离"""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_char in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_char != hyp_char)))
+        previous = current
+    return previous[-1]
+
+
+def find_audio_files(path):
+    """收集音频文件和对应的转写文本"""
+    if os.path.isfile(path):
+        files = [path]
+        directory = os.path.dirname(path) or '.'
+    else:
+        directory = path
+        files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                       if name.lower().endswith(AUDIO_EXTENSIONS))
+
+    transcripts = {}
+    tsv_path = os.path.join(directory, 'transcripts.tsv')
+    if os.path.exists(tsv_path):
+        with open(tsv_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if '\t' in line:
+                    name, text = line.rstrip('\n').split('\t', 1)
+                    transcripts[name] = text
+
+    corpus = []
+    for file_path in files:
+        name = os.path.basename(file_path)
+        text = transcripts.get(name)
+        txt_path = os.path.splitext(file_path)[0] + '.txt'
+        if text is None and os.path.exists(txt_path):
+            with open(txt_path, 'r', encoding='utf-8') as f:
+                text = f.read().strip()
+        corpus.append((file_path, text))
+    return corpus
+
+
+def recognize_file(voice, file_path, realtime=False):
+    """
+    回放一个文件，文件里有几句话就识别几次
+
+    Returns:
+        dict: 识别文本、音频时长、处理用时和每句话的端点信息
+    """
+    source = FileAudioSource(file_path, voice.rate, realtime=realtime)
+    voice.capture = source
+    voice.resume_position = None
+    texts = []
+    fast_texts = []  # 大小模型配合时小模型的结果
+    endpoints = []
+    start_time = time.perf_counter()
+    while not source.finished:
+        # 和连续监听一样从上一句话结束的位置接着读
+        text = voice.listen_once(timeout=source.duration + 1, resume=True)
+        if voice.last_endpoint:
+            endpoints.append(voice.last_endpoint)
+        if text and not text.startswith("未识别") and not text.startswith("识别失败"):
+            texts.append(text)
+            fast_texts.append(voice.last_fast_text)
+    return {
+        'text': ' '.join(texts),
+        'fast_text': ' '.join(fast_texts),
+        'duration': source.duration,
+        'elapsed': time.perf_counter() - start_time,
+        'endpoints': endpoints
+    }
+
+
+def run_benchmark(path, realtime=False):
+    """跑整个语料并打印统计"""
+    corpus = find_audio_files(path)
+    if not corpus:
+        print(f"❌ 没有找到音频文件: {path}")
+        return None
+
+    voice = LocalVoiceHandler(audio_source=FileAudioSource(corpus[0][0]), use_tts=False)
+    # 第一次运行时等模型下载完，大小模型配合时等大模型加载完
+    voice.wait_for_models()
+    if not voice.rec:
+        return None
+
+    total_audio = total_elapsed = 0.0
+    total_errors = total_chars = 0
+    fast_errors = 0
+    eou_delays = []
+    for file_path, reference in corpus:
+        result = recognize_file(voice, file_path, realtime)
+        total_audio += result['duration']
+        total_elapsed += result['elapsed']
+        # 句尾延迟：用户停止说话到判断这句话结束之间的音频时长
+        eou_delays.extend(e.end_ms - e.speech_end_ms for e in result['endpoints'] if e.speech_end_ms is not None)
+
+        line = f"{os.path.basename(file_path)}: RTF {result['elapsed'] / max(result['duration'], 1e-6):.2f} | {result['text']}"
+        if reference is not None:
+            ref = normalize_transcript(reference)
+            errors = edit_distance(ref, normalize_transcript(result['text']))
+            total_errors += errors
+            total_chars += len(ref)
+            line += f" | CER {errors / max(len(ref), 1):.1%}"
+            if voice.rescorer:
+                fast_errors += edit_distance(ref, normalize_transcript(result['fast_text']))
+        print(line)
+
+    stats = {
+        'files': len(corpus),
+        'audio_seconds': total_audio,
+        'rtf': total_elapsed / total_audio if total_audio else 0.0,
+        'avg_eou_ms': sum(eou_delays) / len(eou_delays) if eou_delays else 0.0,
+        'cer': total_errors / total_chars if total_chars else None,
+        'fast_cer': fast_errors / total_chars if total_chars and voice.rescorer else None
+    }
+    print("=" * 60)
+    print(f"📊 {stats['files']} 个文件，共 {stats['audio_seconds']:.1f}s 音频")
+    print(f"⏱️ 实时率 RTF: {stats['rtf']:.3f}")
+    print(f"🔇 平均句尾延迟: {stats['avg_eou_ms']:.0f}ms（{len(eou_delays)} 句）")
+    if stats['cer'] is not None:
+        print(f"🎯 字错误率 CER: {stats['cer']:.1%}")
+    vad_stats = voice.get_stats()
+    print(f"🎚️ VAD跳过 {vad_stats['skipped_fraction']:.0%} 的音频")
+    print(f"📚 模型加载: {vad_stats['model_load_seconds']:.1f}s")
+    rescore_stats = vad_stats['rescore']
+    if rescore_stats:
+        # 端到端延迟 = 句尾延迟 + 句子结束后等大模型的时间
+        print(f"🔁 大模型复核: 加载 {rescore_stats['load_seconds']:.1f}s，复核 {rescore_stats['rescored']} 句，"
+              f"修正 {rescore_stats['corrections']} 句，超时 {rescore_stats['timeouts']} 句，"
+              f"跟不上跳过 {rescore_stats['skipped']} 句，"
+              f"平均多等 {rescore_stats['avg_wait_ms']:.0f}ms")
+        if stats['fast_cer'] is not None:
+            print(f"🎯 只用小模型的字错误率 CER: {stats['fast_cer']:.1%}")
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    run_benchmark(sys.argv[1], realtime='--realtime' in sys.argv)
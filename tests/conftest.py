@@ -0,0 +1,53 @@
+"""测试公用：把项目根目录加进导入路径，提供本地静态HTTP服务器"""
+
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    """按路径返回预先设置的页面，routes: 路径 -> (状态码, 响应头dict, 内容bytes)"""
+    routes = {}
+    body = b''
+
+    def do_POST(self):
+        self.body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.do_GET()
+
+    def do_GET(self):
+        route = self.routes.get(self.path)
+        if route is None:
+            self.send_error(404)
+            return
+        status, headers, body = route(self) if callable(route) else route
+        if body is None:
+            return
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if 'Content-Length' not in headers:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def static_server():
+    """启动一个本地HTTP服务器，返回 (根地址, 路由表)，路由值也可以是 handler -> (状态码, 响应头, 内容) 的函数"""
+    routes = {}
+    handler = type('Handler', (StaticHandler,), {'routes': routes})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}', routes
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,92 @@
+import wave
+
+import numpy as np
+import pytest
+
+from barge_in import EchoGate, read_wav
+
+RATE = 16000
+
+
+def write_wav(path, samples):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes(samples.astype(np.int16).tobytes())
+    return str(path)
+
+
+def tts_reference(seconds=3.0):
+    """像TTS一样一个字一个字的浊音，字间有停顿"""
+    t = np.arange(int(RATE * seconds)) / RATE
+    voice = sum(np.sin(2 * np.pi * 180 * k * t) / k for k in range(1, 6))
+    syllables = (np.sin(2 * np.pi * 4 * t) > -0.3).astype(float)
+    return voice * syllables * 8000
+
+
+def user_voice(seconds, seed=1):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(RATE * seconds)) / RATE
+    return (np.sin(2 * np.pi * 240 * t) * 0.6 + rng.normal(0, 0.4, len(t))) * 6000
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    """生成参考音频、只有回声的录音、回声加用户插话的录音（1.5s处开始说0.6s）"""
+    rng = np.random.default_rng(0)
+    reference = tts_reference()
+    delay = int(RATE * 0.06)
+    echo = np.concatenate([np.zeros(delay), reference[:-delay]]) * 0.1 + rng.normal(0, 30, len(reference))
+    mixed = echo.copy()
+    start = int(RATE * 1.5)
+    speech = user_voice(0.6)
+    mixed[start:start + len(speech)] += speech
+    return {
+        'reference': write_wav(tmp_path / 'reference.wav', reference),
+        'echo': write_wav(tmp_path / 'echo.wav', echo),
+        'barge_in': write_wav(tmp_path / 'barge_in.wav', mixed),
+    }
+
+
+def run_gate(mic_path, reference_path=None, chunk_ms=30):
+    """按小块送进回声门，返回 (触发插话的毫秒数或None, 每块是否算作用户说话)"""
+    mic, rate = read_wav(mic_path)
+    reference = read_wav(reference_path)[0] if reference_path else None
+    gate = EchoGate(rate)
+    gate.start(reference)
+    chunk = int(rate * chunk_ms / 1000)
+    triggered_at = None
+    speech = []
+    for start in range(0, len(mic), chunk):
+        user, triggered = gate.process(mic[start:start + chunk], start * 1000 / rate)
+        speech.append(user)
+        if triggered and triggered_at is None:
+            triggered_at = start * 1000 / rate
+    return triggered_at, speech
+
+
+@pytest.mark.parametrize('use_reference', [True, False])
+def test_echo_only_does_not_trigger(fixtures, use_reference):
+    triggered_at, speech = run_gate(fixtures['echo'], fixtures['reference'] if use_reference else None)
+    assert triggered_at is None
+    assert not any(speech)
+
+
+@pytest.mark.parametrize('use_reference', [True, False])
+def test_user_speech_over_echo_triggers(fixtures, use_reference):
+    triggered_at, _ = run_gate(fixtures['barge_in'], fixtures['reference'] if use_reference else None)
+    # 用户1.5s开口，连续说够BARGE_IN_MIN_SPEECH_MS后触发
+    assert triggered_at is not None
+    assert 1500 <= triggered_at <= 1900
+
+
+def test_short_pause_keeps_user_speech(tmp_path):
+    """字间的短暂停顿还算在说话，攒着的开头不会被丢掉"""
+    mic = np.zeros(int(RATE * 1.2))
+    mic[int(RATE * 0.5):int(RATE * 0.6)] = user_voice(0.1)
+    mic[int(RATE * 0.7):int(RATE * 0.8)] = user_voice(0.1, seed=2)
+    _, speech = run_gate(write_wav(tmp_path / 'pause.wav', mic), chunk_ms=50)
+    # 0.5s~0.8s 之间（包括0.6s~0.7s的停顿）每块都算在说话，结束后很快不算
+    assert all(speech[10:16])
+    assert not any(speech[20:])
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import deepseek_api
+from intent_engine import IntentEngine
+
+
+class FakeSearchAPI:
+    """只做意图识别，不联网"""
+
+    def __init__(self):
+        self.intent_engine = IntentEngine()
+
+    def classify(self, text):
+        return self.intent_engine.classify(text)
+
+
+@pytest.fixture
+def api(static_server, monkeypatch):
+    """指向本地替身接口的DeepSeekAPI，返回 (api, 收到的请求列表)"""
+    base, routes = static_server
+    requests_received = []
+
+    def chat_completions(handler):
+        requests_received.append(json.loads(handler.body))
+        reply = {'choices': [{'message': {'content': '[emotion:happy] 看到啦'}}]}
+        return 200, {'Content-Type': 'application/json'}, json.dumps(reply).encode('utf-8')
+
+    routes['/v1/chat/completions'] = chat_completions
+    monkeypatch.setattr(deepseek_api, 'SearchAPI', FakeSearchAPI)
+    client = deepseek_api.DeepSeekAPI()
+    client.base_url = base + '/v1/chat/completions'
+    client.headers['Authorization'] = 'Bearer test-key'
+    return client, requests_received
+
+
+def test_text_only_model_keeps_screenshot_context(api):
+    client, received = api
+    assert not client.supports_images()
+    assert client.chat_with_image('帮我看看屏幕上是什么', None) == '[emotion:happy] 看到啦'
+    message = received[0]['messages'][-1]
+    assert isinstance(message['content'], str)
+    assert '用户发送了一张屏幕截图' in message['content']
+    assert '帮我看看屏幕上是什么' in message['content']
+
+
+def test_vision_model_sends_image_part(api):
+    client, received = api
+    client.vision_models = {client.current_model}
+    client.chat_with_image('帮我看看这个画面', 'aGVsbG8=')
+    content = received[0]['messages'][-1]['content']
+    assert content[0] == {'type': 'text', 'text': '帮我看看这个画面'}
+    assert content[1]['image_url']['url'] == 'data:image/jpeg;base64,aGVsbG8='
+
+
+def test_desktop_pet_screenshot_mode_without_vision_uses_fallback_prompt(api):
+    pytest.importorskip('tkinter')
+    import desktop_pet
+
+    client, received = api
+    pet = desktop_pet.DesktopPet.__new__(desktop_pet.DesktopPet)
+    pet.api = client
+    pet.screenshot_mode = True
+    pet.conversation_history = []
+    pet.screen_capture = None  # 不支持图像时不应该截图
+    responses = []
+    pet.root = type('Root', (), {'after': lambda self, delay, callback: callback()})()
+    pet.show_response = responses.append
+
+    pet.handle_api_response('屏幕上这个报错怎么办')
+    assert responses == ['[emotion:happy] 看到啦']
+    assert '用户发送了一张屏幕截图' in received[0]['messages'][-1]['content']
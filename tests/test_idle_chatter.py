@@ -0,0 +1,69 @@
+import time
+
+from idle_chatter import IdleChatterPrefetcher
+
+
+class FakeAPI:
+    """按最后一句用户消息生成闲聊"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+
+    def chat(self, prompt, history, allow_search=True):
+        time.sleep(self.delay)
+        topic = history[-2]['content'] if history else '无'
+        return f'[emotion:happy] 还在想{topic}'
+
+
+class FakeTTS:
+    def synthesize(self, text):
+        return text.encode('utf-8')
+
+
+def turn(history, question):
+    return history + [{'role': 'user', 'content': question}, {'role': 'assistant', 'content': f'答{question}'}]
+
+
+def fill(prefetcher, history, count):
+    for _ in range(count):
+        prefetcher.prefetch_async(history)
+        wait_idle(prefetcher)
+
+
+def wait_idle(prefetcher):
+    deadline = time.time() + 2
+    while prefetcher.is_generating and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_new_turn_replaces_full_cache():
+    prefetcher = IdleChatterPrefetcher(FakeAPI(), FakeTTS(), budget_per_hour=100, cache_size=2)
+    history = turn([], '王者荣耀')
+    fill(prefetcher, history, 2)
+    assert len(prefetcher.cache) == 2
+
+    history = turn(history, '明天天气')
+    fill(prefetcher, history, 1)
+    assert prefetcher.pop(history)[1] == '还在想明天天气'
+    assert prefetcher.get_stats()['stale'] == 2
+
+
+def test_pop_skips_lines_from_older_turns():
+    prefetcher = IdleChatterPrefetcher(FakeAPI(), FakeTTS(), budget_per_hour=100, cache_size=2)
+    history = turn([], '王者荣耀')
+    fill(prefetcher, history, 1)
+    assert prefetcher.pop(turn(history, '明天天气')) is None
+    assert prefetcher.get_stats()['misses'] == 1
+
+
+def test_line_generated_during_new_turn_is_dropped_and_regenerated():
+    prefetcher = IdleChatterPrefetcher(FakeAPI(delay=0.2), FakeTTS(), budget_per_hour=100, cache_size=2)
+    old = turn([], '王者荣耀')
+    prefetcher.prefetch_async(old)
+    new = turn(old, '明天天气')
+    prefetcher.prefetch_async(new)  # 正在生成，先记下新的对话
+    deadline = time.time() + 2
+    while not prefetcher.cache and time.time() < deadline:
+        time.sleep(0.01)
+    assert prefetcher.get_stats()['stale'] == 1
+    assert [entry[3] for entry in prefetcher.cache] == ['还在想明天天气']
@@ -0,0 +1,87 @@
+import hashlib
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+from model_installer import ModelInstaller
+
+ETAG = '"model-v1"'
+
+
+@pytest.fixture
+def archive():
+    """一个小的模型压缩包，顶层是模型目录"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('vosk-model-test/README', '测试模型')
+        zf.writestr('vosk-model-test/am/final.mdl', os.urandom(300 * 1024))
+        zf.writestr('vosk-model-test/conf/model.conf', '--sample-frequency=16000\n')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def server(static_server, archive):
+    """支持 Range / If-Range 的下载地址，返回 (地址, 收到的Range头列表)"""
+    base, routes = static_server
+    ranges = []
+
+    def download(handler):
+        range_header = handler.headers.get('Range')
+        ranges.append(range_header)
+        if range_header and handler.headers.get('If-Range') in (None, ETAG):
+            start = int(range_header.split('=')[1].split('-')[0])
+            if start >= len(archive):
+                return 416, {'Content-Range': f'bytes */{len(archive)}'}, b''
+            headers = {'ETag': ETAG, 'Content-Range': f'bytes {start}-{len(archive) - 1}/{len(archive)}'}
+            return 206, headers, archive[start:]
+        return 200, {'ETag': ETAG}, archive
+
+    routes['/model.zip'] = download
+    return base + '/model.zip', ranges
+
+
+def check_installed(target, archive):
+    with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+        assert open(target / 'am' / 'final.mdl', 'rb').read() == zf.read('vosk-model-test/am/final.mdl')
+    assert (target / 'README').read_text(encoding='utf-8') == '测试模型'
+    assert sorted(os.listdir(target.parent)) == ['model']
+
+
+def test_fresh_install(server, archive, tmp_path):
+    url, ranges = server
+    target = tmp_path / 'model'
+    installer = ModelInstaller(url, target, hashlib.sha256(archive).hexdigest(), retries=0)
+    assert installer.install()
+    assert ranges == [None]
+    assert installer.get_progress()['state'] == 'done'
+    check_installed(target, archive)
+
+
+def test_resume_from_partial(server, archive, tmp_path):
+    url, ranges = server
+    target = tmp_path / 'model'
+    installer = ModelInstaller(url, target, hashlib.sha256(archive).hexdigest(), retries=0)
+    # 上次下载到一半断了
+    offset = len(archive) // 2
+    with open(installer.part_path, 'wb') as f:
+        f.write(archive[:offset])
+    with open(installer.meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'validator': ETAG}, f)
+
+    assert installer.install()
+    assert ranges == [f'bytes={offset}-']
+    assert installer.get_progress()['resumed_from'] == offset
+    check_installed(target, archive)
+
+
+def test_sha_mismatch_removes_download(server, tmp_path):
+    url, _ = server
+    target = tmp_path / 'model'
+    installer = ModelInstaller(url, target, 'ab' * 32, retries=0)
+    assert not installer.install()
+    assert installer.get_progress()['state'] == 'failed'
+    assert 'SHA-256' in installer.get_progress()['error']
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,75 @@
+import time
+
+from page_enricher import PageEnricher, SNIFF_BYTES
+
+PARAGRAPH = '后羿前期出急速战靴和无尽战刃，中期补破晓。'
+
+
+def page(body, head=''):
+    return f'<html><head>{head}<title>攻略</title></head><body>' \
+           f'<nav>首页 攻略 论坛 下载中心</nav>{body}<script>var x = "不是正文内容";</script></body></html>'
+
+
+def test_utf8_without_charset_is_not_mojibake(static_server):
+    base, routes = static_server
+    routes['/a'] = (200, {'Content-Type': 'text/html'}, page(f'<p>{PARAGRAPH}</p>').encode('utf-8'))
+    assert PageEnricher().enrich([base + '/a']) == PARAGRAPH
+
+
+def test_meta_charset_is_sniffed(static_server):
+    base, routes = static_server
+    routes['/gbk'] = (200, {'Content-Type': 'text/html'},
+                      page(f'<p>{PARAGRAPH}</p>', head='<meta charset="gb2312">').encode('gbk'))
+    routes['/http-equiv'] = (200, {'Content-Type': 'text/html'},
+                             page(f'<p>{PARAGRAPH}</p>', head='<meta http-equiv="Content-Type" '
+                                  'content="text/html; charset=GBK">').encode('gbk'))
+    enricher = PageEnricher()
+    assert enricher.enrich([base + '/gbk']) == PARAGRAPH
+    assert enricher.enrich([base + '/http-equiv']) == PARAGRAPH
+
+
+def test_header_charset_wins(static_server):
+    base, routes = static_server
+    routes['/a'] = (200, {'Content-Type': 'text/html; charset="gbk"'}, page(f'<p>{PARAGRAPH}</p>').encode('gbk'))
+    assert PageEnricher().enrich([base + '/a']) == PARAGRAPH
+
+
+def test_utf8_split_across_chunks(static_server):
+    base, routes = static_server
+    # 正文在判断编码用的开头之后，多字节字符会跨块
+    filler = '<p>' + 'x' * (SNIFF_BYTES + 1) + '</p>'
+    routes['/a'] = (200, {'Content-Type': 'text/html'}, page(filler + f'<p>{PARAGRAPH * 200}</p>').encode('utf-8'))
+    text = PageEnricher(max_bytes=64 * 1024).enrich([base + '/a'])
+    assert text.splitlines()[1] == PARAGRAPH * 200
+
+
+def test_byte_cap_keeps_parsed_prefix(static_server):
+    base, routes = static_server
+    blocks = ''.join(f'<p>第{i}段：{PARAGRAPH}</p>' for i in range(5000))
+    routes['/big'] = (200, {'Content-Type': 'text/html; charset=utf-8'}, page(blocks).encode('utf-8'))
+    text = PageEnricher(max_bytes=2000).enrich([base + '/big'])
+    assert text.startswith(f'第0段：{PARAGRAPH}')
+    assert len(text.encode('utf-8')) < 2000
+
+
+def test_non_html_and_errors_are_skipped(static_server):
+    base, routes = static_server
+    routes['/a'] = (200, {'Content-Type': 'text/html'}, page(f'<p>{PARAGRAPH}</p>').encode('utf-8'))
+    routes['/pdf'] = (200, {'Content-Type': 'application/pdf'}, b'%PDF-1.4')
+    text = PageEnricher().enrich([base + '/pdf', base + '/missing', base + '/a', base + '/a'])
+    assert text == PARAGRAPH
+
+
+def test_deadline_drops_slow_pages(static_server):
+    base, routes = static_server
+
+    def slow(handler):
+        time.sleep(1.5)
+        return 200, {'Content-Type': 'text/html'}, page('<p>很慢的网页正文内容</p>').encode('utf-8')
+
+    routes['/slow'] = slow
+    routes['/fast'] = (200, {'Content-Type': 'text/html'}, page(f'<p>{PARAGRAPH}</p>').encode('utf-8'))
+    start = time.time()
+    text = PageEnricher(deadline=0.5).enrich([base + '/slow', base + '/fast'])
+    assert time.time() - start < 1.0
+    assert text == PARAGRAPH
@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from parallel_recognizer import ParallelRecognizer
+
+LANGUAGES = ['zh-CN', 'zh-TW', 'zh-HK']
+
+
+class FakeBackend:
+    """按语言返回预设结果：(延迟秒数, 文本或异常)，记录被调用的语言"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.calls = []
+
+    def __call__(self, audio, language):
+        self.calls.append(language)
+        delay, result = self.spec[language]
+        time.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def recognize(spec, policy, timeout=2):
+    recognizer = ParallelRecognizer(FakeBackend(spec), LANGUAGES, policy, timeout)
+    try:
+        return recognizer.recognize(b'audio'), recognizer
+    finally:
+        recognizer.close()
+
+
+def test_first_takes_earliest_non_empty():
+    spec = {'zh-CN': (0.3, '你好'), 'zh-TW': (0.05, ''), 'zh-HK': (0.1, '妳好')}
+    text, recognizer = recognize(spec, 'first')
+    assert text == '妳好'
+    assert recognizer.get_stats()['wins'] == {'zh-HK': 1}
+
+
+def test_priority_waits_for_earlier_languages():
+    spec = {'zh-CN': (0.2, '你好'), 'zh-TW': (0.05, '妳好'), 'zh-HK': (0.05, '妳好')}
+    assert recognize(spec, 'priority')[0] == '你好'
+
+
+def test_priority_falls_back_when_earlier_languages_miss():
+    spec = {'zh-CN': (0.05, None), 'zh-TW': (0.1, IOError('network')), 'zh-HK': (0.15, '係咪')}
+    assert recognize(spec, 'priority')[0] == '係咪'
+
+
+def test_combine_votes_ignoring_spaces_and_punctuation():
+    spec = {'zh-CN': (0.05, '妳好'), 'zh-TW': (0.1, '你 好'), 'zh-HK': (0.15, '你好。')}
+    text, recognizer = recognize(spec, 'combine')
+    assert text == '你 好'
+    assert recognizer.get_stats()['wins'] == {'zh-TW': 1}
+
+
+def test_timeout_returns_what_is_available():
+    spec = {'zh-CN': (1.0, '太慢了'), 'zh-TW': (0.05, '台灣'), 'zh-HK': (0.05, None)}
+    start = time.perf_counter()
+    text, _ = recognize(spec, 'priority', timeout=0.3)
+    assert text == '台灣'
+    assert time.perf_counter() - start < 0.6
+
+
+def test_timeout_without_results_returns_none():
+    spec = {'zh-CN': (1.0, '太慢了'), 'zh-TW': (0.05, ''), 'zh-HK': (0.05, None)}
+    start = time.perf_counter()
+    assert recognize(spec, 'combine', timeout=0.3)[0] is None
+    assert time.perf_counter() - start < 0.6
+
+
+def test_pending_requests_are_cancelled():
+    backend = FakeBackend({'zh-CN': (0.05, '你好'), 'zh-TW': (0.3, '妳好'), 'zh-HK': (0.05, '妳好')})
+    recognizer = ParallelRecognizer(backend, LANGUAGES, 'priority', 2)
+    # 只有一个线程时后面的请求排队等待，选定结果时还没开始的请求应该被取消
+    recognizer.executor.shutdown()
+    recognizer.executor = ThreadPoolExecutor(max_workers=1)
+    assert recognizer.recognize(b'audio') == '你好'
+    recognizer.executor.shutdown(wait=True)
+    assert 'zh-HK' not in backend.calls
+
+
+def test_all_empty_returns_none():
+    spec = {language: (0.05, '') for language in LANGUAGES}
+    assert recognize(spec, 'priority')[0] is None
+
+
+@pytest.mark.parametrize('policy', ['first', 'priority', 'combine'])
+def test_all_errors_raise(policy):
+    spec = {language: (0.05, IOError(language)) for language in LANGUAGES}
+    with pytest.raises(IOError):
+        recognize(spec, policy)
+
+
+@pytest.mark.parametrize('policy', ['first', 'priority', 'combine'])
+def test_errors_with_only_empty_results_raise(policy):
+    spec = {'zh-CN': (0.05, IOError('network')), 'zh-TW': (0.05, ''), 'zh-HK': (0.1, None)}
+    with pytest.raises(IOError):
+        recognize(spec, policy)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ParallelRecognizer(FakeBackend({}), LANGUAGES, 'fastest')
@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from search_cache import SearchCache, normalize_query
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('什么是 C++？', '什么是c++'),
+    ('C#', 'c#'),
+    ('Node.js 教程。', 'node.js教程'),
+    ('GPT-4 是什么', 'gpt-4是什么'),
+    ('python 3.5', 'python 3.5'),
+    ('你好，世界！', '你好世界'),
+    ('ＡＢＣ', 'abc'),
+    ('"后羿" 出装', '后羿出装'),
+])
+def test_normalize_query(query, expected):
+    assert normalize_query(query) == expected
+
+
+def test_symbols_inside_tokens_keep_queries_apart():
+    assert len({normalize_query(q) for q in ['c++', 'c#', 'c', 'c.']}) == 3
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SearchCache(str(tmp_path / 'search_cache.db'), hit_ttl=60, miss_ttl=0.2)
+    yield cache
+    cache.conn.close()
+
+
+def test_hits_and_negative_hits(cache):
+    cache.put('C++ 教程', 'C++入门')
+    cache.put('C 教程', None)
+    assert cache.get('c++教程？') == (True, 'C++入门')
+    assert cache.get('c 教程') == (True, None)
+    time.sleep(0.25)
+    assert cache.get('c 教程') == (False, None)
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_expired_rows_are_purged_on_open(tmp_path):
+    path = str(tmp_path / 'search_cache.db')
+    cache = SearchCache(path, miss_ttl=0.1)
+    cache.put('没有结果的问题', None)
+    cache.conn.close()
+    time.sleep(0.15)
+    reopened = SearchCache(path, miss_ttl=0.1)
+    assert reopened.get_stats()['purged'] == 1
+    reopened.conn.close()
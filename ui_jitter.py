@@ -0,0 +1,52 @@
+"""
+界面卡顿测量模块
+用Tk的after按固定间隔打点，记录每次实际触发比预期晚了多少毫秒，
+主线程被GIL或耗时操作卡住时延迟会明显变大，用来对比识别放在进程内和独立进程时动画的流畅度
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+
+
+class FrameJitterMonitor:
+    def __init__(self, root, interval_ms=33, max_samples=3000):
+        """
+        Args:
+            root (tk.Tk): Tk根窗口
+            interval_ms (int): 打点间隔，和动画帧间隔差不多
+            max_samples (int): 最多保留多少个延迟记录
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.delays = deque(maxlen=max_samples)
+        self.last_tick = None
+        self.timer = None
+
+    def start(self):
+        self.last_tick = time.perf_counter()
+        self.timer = self.root.after(self.interval_ms, self.tick)
+
+    def tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0.0, (now - self.last_tick) * 1000 - self.interval_ms))
+        self.last_tick = now
+        self.timer = self.root.after(self.interval_ms, self.tick)
+
+    def stop(self):
+        if self.timer:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+
+    def get_stats(self):
+        """获取延迟的中位数、95分位和最大值（毫秒）"""
+        if not self.delays:
+            return {'samples': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        delays = np.array(self.delays)
+        return {
+            'samples': len(delays),
+            'p50_ms': float(np.percentile(delays, 50)),
+            'p95_ms': float(np.percentile(delays, 95)),
+            'max_ms': float(delays.max())
+        }
@@ -0,0 +1,167 @@
+"""
+语音活动检测(VAD)模块
+把音频切成10ms小帧，用NumPy一次算出每帧的RMS能量和过零率，和自适应的噪声底比较判断有没有人声，
+只有人声（加上前面一小段预录）才送进Vosk，安静时不做Kaldi解码，桌宠24小时监听也不怎么占CPU
+装了webrtcvad时可以改用WebRTC的VAD判断
+"""
+
+from collections import deque
+
+import numpy as np
+
+from config import (VAD_FRAME_MS, VAD_MARGIN_DB, VAD_MIN_DB, VAD_ZCR_MAX, VAD_PRE_ROLL_MS,
+                    VAD_HANGOVER_MS, VAD_USE_WEBRTC, VAD_NOISE_WINDOW_MS, VAD_NOISE_PERCENTILE)
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+
+def frame_energies_db(frames):
+    """每帧的RMS能量（dBFS），frames是(帧数, 帧长)的int16数组"""
+    x = frames.astype(np.float32)
+    rms = np.sqrt(np.mean(x * x, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+
+
+def split_frames(samples, frame_size):
+    """切成(帧数, 帧长)的二维数组，不满一帧的尾巴丢掉"""
+    n_frames = len(samples) // frame_size
+    return samples[:n_frames * frame_size].reshape(n_frames, frame_size)
+
+
+class EnergyVAD:
+    def __init__(self, rate=16000, frame_ms=VAD_FRAME_MS, margin_db=VAD_MARGIN_DB, min_db=VAD_MIN_DB,
+                 zcr_max=VAD_ZCR_MAX, noise_window_ms=VAD_NOISE_WINDOW_MS,
+                 noise_percentile=VAD_NOISE_PERCENTILE, use_webrtc=VAD_USE_WEBRTC):
+        """
+        初始化VAD
+
+        Args:
+            rate (int): 采样率
+            frame_ms (int): 判断的帧长（毫秒），WebRTC VAD只支持10/20/30
+            margin_db (float): 能量比噪声底高多少dB算人声
+            min_db (float): 能量至少多少dBFS才算人声，避免很安静时把底噪当人声
+            zcr_max (float): 过零率超过这个值像是嘶嘶的噪声，除非能量明显更高
+            noise_window_ms (int): 用最近多少毫秒的帧估计噪声底
+            noise_percentile (float): 窗口内所有帧能量的这个分位数当噪声底（最小值统计），
+                持续的嗡嗡声、风扇声会把噪声底抬上去，说话中的停顿又能把它拉下来
+            use_webrtc (bool): 装了webrtcvad时是否改用WebRTC VAD
+        """
+        self.rate = rate
+        self.frame_size = int(rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.zcr_max = zcr_max
+        self.noise_percentile = noise_percentile
+        # 最近一段时间每帧的能量（环形数组），开头按很安静处理，噪声底要等持续的噪声占满大部分窗口才会升上去
+        self.noise_window = np.full(max(1, int(noise_window_ms / frame_ms)), min_db - margin_db, dtype=np.float32)
+        self.noise_index = 0
+        self.noise_floor_db = min_db - margin_db
+        self.webrtc = webrtcvad.Vad(2) if use_webrtc and webrtcvad else None
+
+    def frame_decisions(self, samples):
+        """
+        逐帧判断有没有人声
+
+        Returns:
+            np.ndarray: 每帧一个bool，不满一帧的尾巴不参与判断
+        """
+        frames = split_frames(samples, self.frame_size)
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+
+        if self.webrtc:
+            return np.array([self.webrtc.is_speech(frame.tobytes(), self.rate) for frame in frames])
+
+        energy_db = frame_energies_db(frames)
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+
+        threshold = max(self.noise_floor_db + self.margin_db, self.min_db)
+        speech = (energy_db > threshold) & ((zcr < self.zcr_max) | (energy_db > threshold + self.margin_db))
+
+        self.update_noise_floor(energy_db)
+        return speech
+
+    def update_noise_floor(self, energy_db):
+        """所有帧（不管是不是人声）都进窗口，噪声底取窗口的低分位数，能升能降"""
+        size = len(self.noise_window)
+        energy_db = energy_db[-size:]
+        index = (self.noise_index + np.arange(len(energy_db))) % size
+        self.noise_window[index] = energy_db
+        self.noise_index = (self.noise_index + len(energy_db)) % size
+        self.noise_floor_db = float(np.percentile(self.noise_window, self.noise_percentile))
+
+
+class VoiceGate:
+    def __init__(self, vad, pre_roll_ms=VAD_PRE_ROLL_MS, hangover_ms=VAD_HANGOVER_MS):
+        """
+        VAD门：只放人声和前后一小段音频通过
+
+        Args:
+            vad (EnergyVAD): 逐帧VAD
+            pre_roll_ms (int): 检测到人声时，把之前多少毫秒的音频一起放行
+            hangover_ms (int): 人声消失后继续放行多少毫秒，避免切掉字尾
+        """
+        self.vad = vad
+        self.pre_roll_samples = int(vad.rate * pre_roll_ms / 1000)
+        self.hangover_ms = hangover_ms
+
+        # 统计
+        self.total_samples = 0
+        self.passed_samples = 0
+        self.recognizer_cpu = 0.0  # 识别器处理放行音频用的CPU时间（秒）
+        self.reset()
+
+    def reset(self):
+        """开始新的一句话"""
+        self.pre_roll = deque()
+        self.pre_roll_len = 0
+        self.hangover_left = 0.0
+
+    def process(self, samples):
+        """
+        判断一段音频要不要送给识别器
+
+        Returns:
+            tuple: (要送给识别器的int16样本或None, 这段里有没有人声)
+        """
+        self.total_samples += len(samples)
+        duration_ms = len(samples) * 1000.0 / self.vad.rate
+        speech = bool(self.vad.frame_decisions(samples).any())
+
+        if speech:
+            self.hangover_left = self.hangover_ms
+        elif self.hangover_left > 0:
+            self.hangover_left -= duration_ms
+        else:
+            # 安静：先存进预录，超出长度的最旧音频直接丢弃
+            self.pre_roll.append(samples)
+            self.pre_roll_len += len(samples)
+            while self.pre_roll_len - len(self.pre_roll[0]) >= self.pre_roll_samples:
+                self.pre_roll_len -= len(self.pre_roll.popleft())
+            return None, False
+
+        if self.pre_roll:
+            self.pre_roll.append(samples)
+            samples = np.concatenate(self.pre_roll)
+            self.pre_roll.clear()
+            self.pre_roll_len = 0
+        self.passed_samples += len(samples)
+        return samples, speech
+
+    def note_recognizer_cpu(self, seconds):
+        """记录识别器处理放行音频用的CPU时间，用来估算跳过的音频省下多少CPU"""
+        self.recognizer_cpu += seconds
+
+    def get_stats(self):
+        """获取跳过比例和估算节省的CPU时间"""
+        skipped = self.total_samples - self.passed_samples
+        cpu_per_sample = self.recognizer_cpu / self.passed_samples if self.passed_samples else 0.0
+        return {
+            'audio_seconds': self.total_samples / self.vad.rate,
+            'skipped_fraction': skipped / self.total_samples if self.total_samples else 0.0,
+            'recognizer_cpu_seconds': self.recognizer_cpu,
+            'cpu_saved_seconds': skipped * cpu_per_sample
+        }
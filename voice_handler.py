@@ -8,19 +8,77 @@ import pyttsx3
 import threading
 import queue
 import time
+from collections import deque
+
+import numpy as np
+
+from parallel_recognizer import ParallelRecognizer
+from config import (MIC_NOISE_WINDOW_SECONDS, MIC_NOISE_PERCENTILE, MIC_ENERGY_RATIO,
+                    MIC_MIN_ENERGY_THRESHOLD, MIC_PHRASE_TIME_LIMIT, RECOGNITION_TIMEOUT)
+
+
+class NoiseFloorTracker:
+    def __init__(self, window_buffers, percentile=MIC_NOISE_PERCENTILE, ratio=MIC_ENERGY_RATIO,
+                 min_threshold=MIC_MIN_ENERGY_THRESHOLD):
+        """
+        滚动窗口噪声底估计：记录最近每个缓冲块的能量，取低分位数当噪声底，
+        说话时音节之间的停顿也会落在低分位，不用专门停下来校准
+
+        Args:
+            window_buffers (int): 窗口里保留多少个缓冲块
+            percentile (float): 取哪个分位数当噪声底
+            ratio (float): 能量门限是噪声底的多少倍
+            min_threshold (float): 能量门限下限
+        """
+        self.energies = deque(maxlen=max(1, window_buffers))
+        self.percentile = percentile
+        self.ratio = ratio
+        self.min_threshold = min_threshold
+
+    def update(self, energy):
+        """加入一个缓冲块的能量，返回新的能量门限"""
+        self.energies.append(energy)
+        return self.threshold()
+
+    def threshold(self):
+        if not self.energies:
+            return self.min_threshold
+        noise = float(np.percentile(np.fromiter(self.energies, dtype=np.float64), self.percentile))
+        return max(self.min_threshold, noise * self.ratio)
+
+
+def buffer_energy(buffer):
+    """16位PCM缓冲块的RMS能量（和speech_recognition的energy_threshold同一单位）"""
+    samples = np.frombuffer(buffer, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
 
 class VoiceHandler:
-    def __init__(self):
-        """初始化语音处理器"""
+    def __init__(self, recognizer_backend=None):
+        """
+        初始化语音处理器
+
+        Args:
+            recognizer_backend (callable): 在线识别后端 backend(audio, language) -> 文本，
+                没听清返回None，默认用Google识别（测试时可以换成本地假后端）
+        """
         self.recognizer = sr.Recognizer()
         self.microphone = None  # 延迟初始化
-        
+        self.source = None  # 一直打开的麦克风音频流
+        self.noise_floor = None
+
         # 设置语音识别参数
         self.recognizer.pause_threshold = 0.8  # 0.8秒静音后认为说完一句话
         self.recognizer.phrase_threshold = 0.3  # 降低语音检测阈值，更敏感
         self.recognizer.energy_threshold = 300  # 降低能量阈值，更容易检测到语音
         self.recognizer.non_speaking_duration = 0.5  # 开始前的静音时间
-        
+        # 能量门限由滚动噪声底持续更新，不用库自带的只在等待说话时调整的方式
+        self.recognizer.dynamic_energy_threshold = False
+        # 已经选定结果后，还在进行的识别请求取消不了，设置网络超时让卡住的请求自己结束，不占着线程池
+        self.recognizer.operation_timeout = RECOGNITION_TIMEOUT
+        # 几个中文语言版本同时识别，不再一个没听清再试下一个
+        self.parallel_recognizer = ParallelRecognizer(recognizer_backend or self.recognize_google)
+
         # TTS引擎
         self.tts_engine = pyttsx3.init()
         self.setup_tts()
@@ -28,10 +86,12 @@ class VoiceHandler:
         # 控制变量
         self.is_listening = False
         self.is_speaking = False
-        self.listen_thread = None
+        self.listen_thread = None  # 采集线程：一直读麦克风并切句
+        self.recognize_thread = None  # 识别线程：把切好的句子送去识别，不耽误采集
         self.thread_lock = threading.Lock()  # 线程锁
-        
-        # 音频队列
+        self.source_lock = threading.Lock()  # 同一时间只有一个地方读麦克风
+
+        # 音频队列（切好的句子）
         self.audio_queue = queue.Queue()
         
         # 初始化麦克风
@@ -84,43 +144,110 @@ class VoiceHandler:
                 pass
     
     def init_microphone(self):
-        """安全初始化麦克风"""
+        """安全初始化麦克风：只打开一次，之后一直使用同一个音频流"""
         try:
             self.microphone = sr.Microphone()
             print("🎙️ 正在调整麦克风...")
-            with self.microphone as source:
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+            self.source = self.microphone.__enter__()
+            self.recognizer.adjust_for_ambient_noise(self.source, duration=1)
+            # 用启动时的校准结果作为噪声底的初值，之后随环境持续更新
+            seconds_per_buffer = self.source.CHUNK / self.source.SAMPLE_RATE
+            self.noise_floor = NoiseFloorTracker(int(MIC_NOISE_WINDOW_SECONDS / seconds_per_buffer))
+            self.noise_floor.update(self.recognizer.energy_threshold / MIC_ENERGY_RATIO)
             print("✅ 麦克风调整完成")
         except Exception as e:
             print(f"❌ 麦克风初始化失败: {str(e)}")
-            self.microphone = None
-    
+            self.close_microphone()
+
+    def close_microphone(self):
+        """关闭麦克风音频流"""
+        if self.microphone and self.source:
+            try:
+                self.microphone.__exit__(None, None, None)
+            except Exception:
+                pass
+        self.microphone = None
+        self.source = None
+
+    def read_buffer(self):
+        """读一个缓冲块并用它更新噪声底，返回 (音频数据, 是否超过能量门限)"""
+        buffer = self.source.stream.read(self.source.CHUNK)
+        energy = buffer_energy(buffer)
+        is_speech = energy > self.recognizer.energy_threshold
+        self.recognizer.energy_threshold = self.noise_floor.update(energy)
+        return buffer, is_speech
+
+    def capture_phrases(self):
+        """
+        采集线程：连续读麦克风，按能量门限切出一句句话放进音频队列，
+        识别在另一个线程进行，采集不会停下来，也不会重新打开设备
+        """
+        seconds_per_buffer = self.source.CHUNK / self.source.SAMPLE_RATE
+        pause_buffers = int(np.ceil(self.recognizer.pause_threshold / seconds_per_buffer))
+        phrase_buffers = int(np.ceil(self.recognizer.phrase_threshold / seconds_per_buffer))
+        max_buffers = int(np.ceil(MIC_PHRASE_TIME_LIMIT / seconds_per_buffer))
+        # 开始说话前的一小段音频也要带上，避免开头被截掉
+        pre_roll = deque(maxlen=int(np.ceil(self.recognizer.non_speaking_duration / seconds_per_buffer)))
+
+        frames = None
+        speech_buffers = silent_buffers = 0
+        while self.is_listening:
+            buffer, is_speech = self.read_buffer()
+            if frames is None:
+                pre_roll.append(buffer)
+                if is_speech:
+                    frames = list(pre_roll)
+                    speech_buffers, silent_buffers = 1, 0
+                continue
+
+            frames.append(buffer)
+            if is_speech:
+                speech_buffers += 1
+                silent_buffers = 0
+            else:
+                silent_buffers += 1
+
+            if silent_buffers >= pause_buffers or len(frames) >= max_buffers:
+                # 太短的声音（咳嗽、敲桌子）不送去识别
+                if speech_buffers >= phrase_buffers:
+                    audio = sr.AudioData(b''.join(frames), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+                    self.audio_queue.put(audio)
+                frames = None
+                pre_roll.clear()
+
+    def recognize_google(self, audio, language):
+        """Google语音识别的一个语言版本，没听清返回None"""
+        try:
+            return self.recognizer.recognize_google(audio, language=language)
+        except sr.UnknownValueError:
+            return None
+
+    def recognize(self, audio):
+        """识别一句话，听不清时抛出 sr.UnknownValueError"""
+        # zh-CN、zh-TW、zh-HK同时发出，按配置的策略选结果
+        text = self.parallel_recognizer.recognize(audio)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
     def listen_once(self, timeout=10):
         """单次语音识别 - 智能监听模式：检测到语音后，等待0.8秒静音才结束"""
         try:
+            if not self.source:
+                return "语音识别失败: 麦克风不可用"
             print("🎙️ 开始监听...")
-            with self.microphone as source:
+            with self.source_lock:
                 # 等待检测到语音输入并录音
                 print("⏳ 等待您开始说话...")
                 audio = self.recognizer.listen(
-                    source, 
+                    self.source,
                     timeout=timeout,           # 等待开始说话的超时时间
                     phrase_time_limit=None     # 不限制单次录音长度，由pause_threshold控制
                 )
-            
+
             print("🔄 正在识别语音...")
-            # 使用Google语音识别（中文），添加更多语言选项提高准确度
-            try:
-                # 首先尝试中文识别
-                text = self.recognizer.recognize_google(audio, language='zh-CN')
-            except sr.UnknownValueError:
-                # 如果中文识别失败，尝试中文（台湾）
-                try:
-                    text = self.recognizer.recognize_google(audio, language='zh-TW')
-                except sr.UnknownValueError:
-                    # 最后尝试中文（香港）
-                    text = self.recognizer.recognize_google(audio, language='zh-HK')
-            
+            text = self.recognize(audio)
+
             print(f"✅ 识别结果: {text}")
             return text
             
@@ -160,92 +287,102 @@ class VoiceHandler:
         speak_thread.daemon = True
         speak_thread.start()
     
+    def join_threads(self):
+        """
+        等待采集线程和识别线程结束，识别线程可能正在等一次在线识别，最多等识别超时
+
+        Returns:
+            bool: 两个线程是否都已经结束
+        """
+        timeouts = ((self.listen_thread, 2), (self.recognize_thread, self.parallel_recognizer.timeout + 1))
+        for thread, timeout in timeouts:
+            if thread and thread.is_alive():
+                thread.join(timeout=timeout)
+        return not any(thread and thread.is_alive() for thread, _ in timeouts)
+
     def stop_listening(self):
-        """安全停止监听"""
+        """安全停止监听（麦克风保持打开，下次开始监听不用重新校准）"""
         with self.thread_lock:
             if self.is_listening:
                 self.is_listening = False
                 print("⏹️ 停止监听")
-                
-                # 等待监听线程结束
-                if self.listen_thread and self.listen_thread.is_alive():
-                    self.listen_thread.join(timeout=2)
-                
-                # 重新初始化麦克风，清除可能的状态问题
-                self.init_microphone()
+                self.join_threads()
+
+            # 还没识别的句子丢掉，不留到下次开始监听
+            while True:
+                try:
+                    self.audio_queue.get_nowait()
+                except queue.Empty:
+                    break
 
     def start_continuous_listening(self, callback=None):
-        """开始连续监听模式 - 每次创建新麦克风对象"""
+        """开始连续监听模式 - 一直使用同一个麦克风音频流，采集和识别分开在两个线程"""
         with self.thread_lock:
             if self.is_listening:
                 return
+            # 上次的线程还没退出时不能再开一组，否则两个线程同时读麦克风
+            if not self.join_threads():
+                print("⚠️ 上次的监听线程还没有结束，暂不开始监听")
+                return
+            if not self.source:
+                self.init_microphone()
+                if not self.source:
+                    return
             self.is_listening = True
-        
-        def _listen():
+
+        def _capture():
             consecutive_errors = 0
             max_errors = 5
-            
+
             while self.is_listening:
                 try:
-                    # 每次监听都创建全新的麦克风对象 - 避免上下文冲突
-                    mic = sr.Microphone()
-                    
-                    with mic as source:
-                        # 快速调整环境噪音
-                        self.recognizer.adjust_for_ambient_noise(source, duration=0.2)
-                        
-                        # 监听语音
-                        audio = self.recognizer.listen(
-                            source, 
-                            timeout=2,
-                            phrase_time_limit=None
-                        )
-                    
-                    # 在with语句外进行语音识别
-                    text = None
-                    try:
-                        text = self.recognizer.recognize_google(audio, language='zh-CN')
-                        consecutive_errors = 0  # 重置错误计数
-                    except sr.UnknownValueError:
-                        try:
-                            text = self.recognizer.recognize_google(audio, language='zh-TW')
-                            consecutive_errors = 0
-                        except sr.UnknownValueError:
-                            try:
-                                text = self.recognizer.recognize_google(audio, language='zh-HK')
-                                consecutive_errors = 0
-                            except sr.UnknownValueError:
-                                pass
-                    
-                    if text and callback:
-                        callback(text)
-                    
-                    time.sleep(0.1)
-                    
-                except sr.WaitTimeoutError:
-                    # 正常超时，继续监听
-                    pass
+                    with self.source_lock:
+                        self.capture_phrases()
                 except Exception as e:
                     consecutive_errors += 1
-                    error_msg = f"语音识别失败: {str(e)}"
-                    print(f"🎤 {error_msg}")
-                    
-                    if callback:
-                        callback(error_msg)
-                    
-                    # 连续错误过多时稍微等待更久
+                    print(f"🎤 麦克风读取失败: {str(e)}")
+
+                    # 连续出错多半是设备断开了，重新打开麦克风
                     if consecutive_errors >= max_errors:
-                        print("❌ 连续错误过多，暂停1秒...")
+                        print("❌ 连续错误过多，重新打开麦克风...")
                         time.sleep(1)
+                        with self.source_lock:
+                            self.close_microphone()
+                            self.init_microphone()
                         consecutive_errors = 0
+                        if not self.source:
+                            self.is_listening = False
                     else:
                         time.sleep(0.5)
-        
-        self.listen_thread = threading.Thread(target=_listen)
+
+        def _recognize():
+            while self.is_listening:
+                try:
+                    audio = self.audio_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+
+                try:
+                    text = self.recognize(audio)
+                except sr.UnknownValueError:
+                    continue
+                except Exception as e:
+                    error_msg = f"语音识别失败: {str(e)}"
+                    print(f"🎤 {error_msg}")
+                    text = error_msg
+
+                # 停止监听后才识别完的句子不再回调
+                if text and callback and self.is_listening:
+                    callback(text)
+
+        self.listen_thread = threading.Thread(target=_capture)
         self.listen_thread.daemon = True
         self.listen_thread.start()
+        self.recognize_thread = threading.Thread(target=_recognize)
+        self.recognize_thread.daemon = True
+        self.recognize_thread.start()
         print("🎙️ 开始连续监听...")
-    
+
     def listen(self, timeout=5):
         """语音识别（兼容性方法）"""
         return self.listen_once(timeout)
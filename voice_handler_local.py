@@ -10,37 +10,70 @@ import pyttsx3
 import threading
 import queue
 import time
-import os
-import requests
-import zipfile
 from pathlib import Path
 
+import numpy as np
+
+from audio_capture import AudioCapture
+from endpointing import EndpointDetector, END_RECOGNIZER, END_NO_SPEECH
+from vad import EnergyVAD, VoiceGate
+from barge_in import EchoGate
+from recognizer_process import RecognizerProcess
+from command_recognizer import CommandRecognizer, compact
+from model_installer import ModelInstaller
+from segment_rescorer import SegmentRescorer
+from config import (AUDIO_PERIOD_MS, VOSK_FEED_MS, ENDPOINT_MAX_UTTERANCE_MS, BARGE_IN_ENABLED,
+                    RECOGNIZER_OUT_OF_PROCESS, COMMAND_MODEL_PATH, VOICE_COMMANDS, WAKE_WORD_REQUIRED,
+                    WAKE_WINDOW_SECONDS, VOSK_MODEL_URL, VOSK_MODEL_SHA256, DUAL_MODEL_ENABLED, SMALL_MODEL_URL,
+                    SMALL_MODEL_SHA256)
+
 class LocalVoiceHandler:
-    def __init__(self):
-        """初始化本地语音处理器"""
+    def __init__(self, audio_source=None, use_tts=True):
+        """
+        初始化本地语音处理器
+        
+        Args:
+            audio_source: 代替麦克风的音频源（如FileAudioSource），None时使用麦克风
+            use_tts (bool): 是否初始化本地TTS（没有声卡的机器上测试识别时关掉）
+        """
         print("🎤 初始化本地语音处理器...")
         
         # 模型路径
         self.model_path = Path("vosk_model_cn")
-        self.model_url = "https://alphacephei.com/vosk/models/vosk-model-cn-0.22.zip"
+        self.model_installers = []  # 没有模型时在后台下载
         
         # 音频参数 - 必须在setup_vosk_model之前定义
         self.format = pyaudio.paInt16
         self.channels = 1
         self.rate = 16000
-        self.chunk = 8192
+        self.chunk = int(self.rate * AUDIO_PERIOD_MS / 1000)  # 采集周期
+        self.feed_samples = int(self.rate * VOSK_FEED_MS / 1000)  # 每次送给Vosk的样本数
         
         # 初始化Vosk模型
         self.model = None
         self.rec = None
+        self.model_load_seconds = 0.0
+        # 大小模型配合识别时，大模型复核小模型的结果
+        self.rescorer = None
+        self.last_fast_text = ''  # 上一句话小模型的结果
         self.setup_vosk_model()
         
         # PyAudio
-        self.audio = pyaudio.PyAudio()
+        self.audio = None if audio_source else pyaudio.PyAudio()
+        # 麦克风输入流只打开一次（回调模式），音频写进环形缓冲区，识别线程从读取器取音频
+        self.capture = audio_source or AudioCapture(self.audio, self.rate, AUDIO_PERIOD_MS)
+        # VAD门：安静时不把音频送给Vosk解码
+        self.gate = VoiceGate(EnergyVAD(self.rate))
+        # 回声门：播放期间区分回声和用户插话
+        self.echo_gate = EchoGate(self.rate)
+        self.playback_position = 0
+        # 连续识别时上一句话读到的位置，下一句从这里接着读，处理上一句期间说的话不会丢
+        self.resume_position = None
         
         # TTS引擎
-        self.tts_engine = pyttsx3.init()
-        self.setup_tts()
+        self.tts_engine = pyttsx3.init() if use_tts else None
+        if self.tts_engine:
+            self.setup_tts()
         
         # 控制变量
         self.is_listening = False
@@ -48,78 +81,114 @@ class LocalVoiceHandler:
         self.listen_thread = None
         self.thread_lock = threading.Lock()
         
+        # 识别中间结果回调，用户还在说话时就能做准备工作
+        self.partial_callback = None
+        # 上一句话的端点信息，用于追踪延迟
+        self.last_endpoint = None
+        # 播放期间检测到用户插话时的回调（在识别线程中调用）
+        self.barge_in_callback = None
+        # 插话的这句话没识别出内容时的回调（在识别线程中调用）
+        self.barge_in_missed_callback = None
+        self.barged_in = False  # 这次识别期间用户插过话
+        
+        # 语音指令识别（小模型+限定语法），识别到指令时回调 command_callback(指令名, 短语)
+        self.command_callback = None
+        self.command_recognizer = None
+        self.awake_until = 0.0
+        if not audio_source:
+            self.setup_command_recognizer()
+        
         print("✅ 本地语音处理器初始化完成")
     
     def setup_vosk_model(self):
-        """设置Vosk中文模型"""
+        """
+        设置Vosk中文模型，没有模型时在后台下载，不耽误启动
+        大小模型配合时，小模型加载快、解码快，负责中间结果和句尾判断；大模型在后台加载，只复核说话的那段音频
+        """
+        if DUAL_MODEL_ENABLED:
+            self.ensure_model(Path(COMMAND_MODEL_PATH), SMALL_MODEL_URL, SMALL_MODEL_SHA256, self.load_vosk_model)
+            self.ensure_model(self.model_path, VOSK_MODEL_URL, VOSK_MODEL_SHA256, self.load_rescorer)
+        else:
+            self.ensure_model(self.model_path, VOSK_MODEL_URL, VOSK_MODEL_SHA256, self.load_vosk_model)
+
+    def ensure_model(self, model_path, url, sha256, load):
+        """模型已经在时直接加载，否则在后台下载，装好后再加载（在下载线程中调用load）"""
+        if model_path.exists():
+            load(model_path)
+            return
+        print(f"🔄 首次使用，正在后台下载语音模型 {model_path}，下载完成后自动开始识别...")
+
+        def on_done(success):
+            if success:
+                load(model_path)
+            else:
+                print(f"💡 手动下载地址: {url}")
+                print(f"💡 解压后重命名为: {model_path}")
+
+        installer = ModelInstaller(url, model_path, sha256)
+        self.model_installers.append(installer)
+        installer.start(on_done=on_done)
+
+    def load_vosk_model(self, model_path):
+        """加载Vosk中文模型"""
         try:
-            # 检查模型是否存在
-            if not self.model_path.exists():
-                print("🔄 首次使用，正在下载中文语音模型...")
-                self.download_chinese_model()
-            
-            # 加载模型
-            if self.model_path.exists():
-                print("📚 加载中文语音模型...")
-                self.model = vosk.Model(str(self.model_path))
-                self.rec = vosk.KaldiRecognizer(self.model, self.rate)
-                print("✅ 中文语音模型加载成功")
+            print(f"📚 加载中文语音模型 {model_path}...")
+            start_time = time.perf_counter()
+            if RECOGNIZER_OUT_OF_PROCESS:
+                # 解码放到独立进程，不和界面线程抢GIL
+                self.rec = RecognizerProcess(str(model_path), self.rate)
             else:
-                print("❌ 无法找到语音模型，请手动下载")
-                
+                self.model = vosk.Model(str(model_path))
+                self.rec = vosk.KaldiRecognizer(self.model, self.rate)
+            self.model_load_seconds = time.perf_counter() - start_time
+            print(f"✅ 中文语音模型加载成功（{self.model_load_seconds:.1f}s）")
         except Exception as e:
             print(f"❌ 模型设置失败: {str(e)}")
             print("💡 请尝试手动下载模型或检查网络连接")
     
-    def download_chinese_model(self):
-        """下载中文语音模型"""
+    def setup_command_recognizer(self):
+        """加载指令识别用的小模型，没有小模型时不启用"""
+        if not Path(COMMAND_MODEL_PATH).exists():
+            print(f"💡 没有找到指令识别小模型 {COMMAND_MODEL_PATH}，\"停\"等指令走完整识别")
+            return
         try:
-            model_zip = "vosk-model-cn.zip"
-            
-            print("⬇️ 正在下载中文语音模型（约40MB）...")
-            print("🌐 下载地址：vosk官方中文模型")
-            
-            # 下载模型
-            response = requests.get(self.model_url, stream=True)
-            response.raise_for_status()
-            
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(model_zip, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if total_size > 0:
-                        percent = downloaded / total_size * 100
-                        print(f"\r📥 下载进度: {percent:.1f}%", end='', flush=True)
-            
-            print(f"\n✅ 模型下载完成: {model_zip}")
-            
-            # 解压模型
-            print("📦 正在解压模型...")
-            with zipfile.ZipFile(model_zip, 'r') as zip_ref:
-                zip_ref.extractall(".")
-            
-            # 重命名文件夹
-            extracted_folder = None
-            for item in Path(".").iterdir():
-                if item.is_dir() and item.name.startswith("vosk-model-cn"):
-                    extracted_folder = item
-                    break
-            
-            if extracted_folder:
-                extracted_folder.rename(self.model_path)
-                print(f"✅ 模型解压完成: {self.model_path}")
-            
-            # 清理zip文件
-            os.remove(model_zip)
-            
+            self.command_recognizer = CommandRecognizer(
+                self.capture, COMMAND_MODEL_PATH, VOICE_COMMANDS, self.rate, callback=self.on_command
+            )
         except Exception as e:
-            print(f"❌ 模型下载失败: {str(e)}")
-            print("💡 请检查网络连接或手动下载模型")
-            print(f"💡 手动下载地址: {self.model_url}")
-            print(f"💡 解压后重命名为: {self.model_path}")
+            print(f"⚠️ 指令识别加载失败: {str(e)}")
+    
+    def on_command(self, name, phrase):
+        """指令识别线程识别到指令"""
+        if name == 'wake':
+            self.awake_until = time.time() + WAKE_WINDOW_SECONDS
+        if self.command_callback:
+            self.command_callback(name, phrase)
+    
+    def is_awake(self):
+        """不需要唤醒词，或者最近叫过桌宠的名字"""
+        return not WAKE_WORD_REQUIRED or not self.command_recognizer or time.time() < self.awake_until
+    
+    def load_rescorer(self, model_path):
+        """在后台加载复核用的大模型"""
+        self.rescorer = SegmentRescorer(str(model_path), self.rate)
+
+    def get_model_progress(self):
+        """模型下载进度（有几个模型在下载时显示还没下完的那个），没有在下载时返回None"""
+        if not self.model_installers:
+            return None
+        for installer in self.model_installers:
+            progress = installer.get_progress()
+            if progress['state'] != 'done':
+                return progress
+        return progress
+
+    def wait_for_models(self):
+        """等所有模型下载、加载完成（测试识别速度时用，避免把加载时间算进去）"""
+        for installer in self.model_installers:
+            installer.thread.join()
+        if self.rescorer:
+            self.rescorer.loaded.wait()
     
     def setup_tts(self):
         """设置TTS引擎为好听的女声"""
@@ -152,71 +221,99 @@ class LocalVoiceHandler:
         except Exception as e:
             print(f"⚠️ TTS设置失败: {str(e)}")
     
-    def listen_once(self, timeout=10):
-        """单次语音识别 - 本地离线识别"""
-        if not self.model or not self.rec:
+    def listen_once(self, timeout=10, resume=False):
+        """
+        单次语音识别 - 本地离线识别
+
+        Args:
+            timeout (int): 多少秒内没人说话就放弃
+            resume (bool): 从上一句话结束的位置接着读（连续识别），否则从预录开始
+        """
+        if not self.rec:
             return "语音模型未加载，请检查模型文件"
         
+        reader = None
         try:
             print("🎙️ 开始本地语音识别...")
             
-            # 打开音频流
-            stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                frames_per_buffer=self.chunk
-            )
+            # 输入流一直开着，连续识别时从上一句话结束的位置接着读，两次识别之间的音频不会丢；
+            # 中间播放过TTS时不往回读，免得把回声当成用户说的话，从几百毫秒之前开始读
+            self.capture.start()
+            position = self.resume_position if resume else None
+            if position is not None and position < self.playback_position:
+                position = None
+            reader = self.capture.reader(position=position)
             
             print("⏳ 请开始说话...")
             
-            frames = []
-            silent_chunks = 0
-            max_silent_chunks = 30  # 大约3秒静音
-            speech_detected = False
+            # 按音频时长做端点检测，timeout秒内没人说话就放弃
+            detector = EndpointDetector(no_speech_timeout_ms=timeout * 1000)
+            self.last_endpoint = None
+            self.barged_in = False
+            self.gate.reset()
+            held = []  # 播放期间疑似插话、还没确认的人声
             start_time = time.time()
+            # 大模型加载好时，送给小模型的人声同时交给大模型复核
+            rescoring = self.rescorer.start_utterance() if self.rescorer else False
             
             while True:
-                # 检查超时
-                if time.time() - start_time > timeout:
+                # 音频流出问题收不到数据时的兜底超时
+                if time.time() - start_time > timeout + ENDPOINT_MAX_UTTERANCE_MS / 1000:
                     print("⏱️ 录音超时")
                     break
                 
-                # 读取音频数据
-                data = stream.read(self.chunk, exception_on_overflow=False)
-                frames.append(data)
+                # 读取音频数据，凑够一次送给Vosk的量
+                data = reader.read(self.feed_samples, timeout=1)
+                if not data:
+                    if reader.finished:
+                        break
+                    continue
+                samples = np.frombuffer(data, dtype=np.int16)
                 
-                # 检测语音活动
-                if self.rec.AcceptWaveform(data):
-                    result = json.loads(self.rec.Result())
-                    if result.get('text', '').strip():
-                        speech_detected = True
-                        text = result['text'].strip()
-                        print(f"🎯 识别到完整语句: {text}")
-                        stream.stop_stream()
-                        stream.close()
-                        return text
-                else:
-                    partial = json.loads(self.rec.PartialResult())
-                    if partial.get('partial', '').strip():
-                        if not speech_detected:
-                            speech_detected = True
-                            print("🔊 检测到语音...")
-                        silent_chunks = 0
+                # 只有人声（和前面的预录）才送给Vosk，安静时中间结果保持不变
+                voiced, is_speech = self.gate.process(samples)
+                if self.echo_gate.active:
+                    voiced, is_speech = self.filter_echo(samples, voiced, is_speech, reader.position, held)
+                elif held:
+                    # 还没确认插话播放就结束了，攒着的是用户这句话的开头，一起送给识别器
+                    voiced = np.concatenate(held + ([voiced] if voiced is not None else []))
+                    held.clear()
+                    is_speech = True
+                partial_text = detector.last_partial
+                if voiced is not None:
+                    if rescoring:
+                        self.rescorer.add(voiced)
+                    cpu_start = self.recognizer_cpu_time()
+                    if self.rec.AcceptWaveform(voiced.tobytes()):
+                        text = json.loads(self.rec.Result()).get('text', '').strip()
+                        self.gate.note_recognizer_cpu(self.recognizer_cpu_time() - cpu_start)
+                        if text:
+                            detector.update(samples, text, is_speech=is_speech)
+                            self.last_endpoint = detector.finish(END_RECOGNIZER)
+                            print(f"🎯 识别到完整语句: {text}")
+                            return self.reconcile(text, rescoring)
+                        partial_text = ''
                     else:
-                        if speech_detected:
-                            silent_chunks += 1
-                            if silent_chunks >= max_silent_chunks:
-                                print("🔇 检测到静音，结束录音")
-                                break
+                        partial_text = json.loads(self.rec.PartialResult()).get('partial', '').strip()
+                        self.gate.note_recognizer_cpu(self.recognizer_cpu_time() - cpu_start)
+                        if partial_text and self.partial_callback:
+                            self.partial_callback(partial_text)
+                
+                was_in_speech = detector.in_speech
+                endpoint = detector.update(samples, partial_text, is_speech=is_speech)
+                if detector.in_speech and not was_in_speech:
+                    print("🔊 检测到语音...")
+                    if rescoring:
+                        self.rescorer.confirm()
+                if endpoint:
+                    self.last_endpoint = endpoint
+                    if endpoint.reason != END_NO_SPEECH:
+                        print(f"🔇 检测到句子结束（{endpoint.reason}，静音 {endpoint.end_ms - endpoint.speech_end_ms:.0f}ms）")
+                    break
             
             # 获取最终结果
             final_result = json.loads(self.rec.FinalResult())
-            text = final_result.get('text', '').strip()
-            
-            stream.stop_stream()
-            stream.close()
+            text = self.reconcile(final_result.get('text', '').strip(), rescoring)
             
             if text:
                 print(f"✅ 最终识别结果: {text}")
@@ -227,6 +324,93 @@ class LocalVoiceHandler:
         except Exception as e:
             print(f"❌ 语音识别失败: {str(e)}")
             return f"识别失败: {str(e)}"
+        finally:
+            if self.rescorer:
+                # 出错时丢掉这句话，已经复核完的话什么都不做
+                self.rescorer.cancel()
+            if reader:
+                self.resume_position = reader.position
+                reader.close()
+    
+    def reconcile(self, fast_text, rescoring):
+        """
+        合并大小模型的结果：小模型没听出内容时不等大模型，大模型超时或没听出内容时用小模型的结果
+
+        Args:
+            fast_text (str): 小模型的识别结果
+            rescoring (bool): 这句话是否交给了大模型
+
+        Returns:
+            str: 最终识别结果
+        """
+        self.last_fast_text = fast_text
+        if not rescoring or not fast_text:
+            return fast_text
+        text = self.rescorer.finish()
+        if not text:
+            return fast_text
+        if compact(text) != compact(fast_text):
+            self.rescorer.corrections += 1
+            print(f"🔁 大模型复核: {fast_text} -> {text}（等待 {self.rescorer.last_wait_ms:.0f}ms）")
+        return text
+    
+    def recognizer_cpu_time(self):
+        """识别器用掉的CPU时间：独立进程时由识别进程统计，否则用当前线程的CPU时间"""
+        if isinstance(self.rec, RecognizerProcess):
+            return self.rec.cpu_time
+        return time.thread_time()
+    
+    def filter_echo(self, samples, voiced, is_speech, position, held):
+        """
+        播放期间过滤回声：确认用户插话前先攒着人声，确认后（或者播放结束后）连同攒下的一起送给识别器
+        回声门判断用户的声音停了一小段才丢掉攒着的人声，字间停顿不会截掉开头的音节
+
+        Returns:
+            tuple: (要送给识别器的样本或None, 是否算作有人说话)
+        """
+        elapsed_ms = (position - len(samples) - self.playback_position) * 1000 / self.rate
+        user_speech, triggered = self.echo_gate.process(samples, elapsed_ms)
+        if not user_speech and not self.echo_gate.triggered:
+            held.clear()
+            return None, False
+        if voiced is not None:
+            held.append(voiced)
+        if not self.echo_gate.triggered:
+            return None, False
+        if triggered:
+            print("🗣️ 检测到用户插话，停止播放")
+            self.barged_in = True
+            if self.barge_in_callback:
+                self.barge_in_callback()
+        if not held:
+            return None, is_speech
+        voiced = np.concatenate(held)
+        held.clear()
+        return voiced, True
+    
+    def start_playback(self, reference=None):
+        """
+        开始播放TTS，之后的麦克风音频按插话检测处理
+        
+        Args:
+            reference (np.ndarray): 正在播放的音频（16kHz int16单声道），用来估计回声
+        """
+        self.playback_position = self.capture.ring.written
+        if not BARGE_IN_ENABLED:
+            return
+        self.echo_gate.start(reference)
+    
+    def end_playback(self):
+        """TTS播放结束"""
+        self.echo_gate.stop()
+    
+    def get_stats(self):
+        """获取VAD跳过的音频比例、节省的识别CPU时间、各个识别器的CPU用时、模型加载时间和大模型复核统计"""
+        stats = self.gate.get_stats()
+        stats['command_cpu_seconds'] = self.command_recognizer.get_stats()['cpu_seconds'] if self.command_recognizer else 0.0
+        stats['model_load_seconds'] = self.model_load_seconds
+        stats['rescore'] = self.rescorer.get_stats() if self.rescorer else None
+        return stats
     
     def speak(self, text, callback=None):
         """文字转语音播放"""
@@ -234,13 +418,16 @@ class LocalVoiceHandler:
             try:
                 self.is_speaking = True
                 print(f"🔊 本地TTS播放: {text}")
+                self.start_playback()
                 self.tts_engine.say(text)
                 self.tts_engine.runAndWait()
+                self.end_playback()
                 self.is_speaking = False
                 if callback:
                     callback()
             except Exception as e:
                 print(f"❌ 语音播放失败: {str(e)}")
+                self.end_playback()
                 self.is_speaking = False
                 if callback:
                     callback()
@@ -255,15 +442,32 @@ class LocalVoiceHandler:
             if self.is_listening:
                 return
             self.is_listening = True
+        self.resume_position = None
+        
+        if self.command_recognizer:
+            self.command_recognizer.start()
         
         def _listen():
             while self.is_listening:
                 try:
-                    if not self.is_speaking:  # 只在不说话时监听
-                        text = self.listen_once(timeout=5)
+                    # 模型还在后台下载
+                    if not self.rec:
+                        time.sleep(0.5)
+                        continue
+                    # 需要唤醒词时，叫名字之前大模型不解码
+                    if not self.is_awake():
+                        time.sleep(0.05)
+                        continue
+                    # 支持插话时说话期间也继续监听，回声由回声门过滤
+                    if BARGE_IN_ENABLED or not self.is_speaking:
+                        text = self.listen_once(timeout=5, resume=True)
                         if text and not text.startswith("未识别") and not text.startswith("识别失败"):
+                            # 对话进行中不用每句都叫名字
+                            self.awake_until = max(self.awake_until, time.time() + WAKE_WINDOW_SECONDS)
                             if callback:
                                 callback(text)
+                        elif self.barged_in and self.barge_in_missed_callback:
+                            self.barge_in_missed_callback()
                     time.sleep(0.1)
                 except Exception as e:
                     print(f"🎤 连续监听错误: {str(e)}")
@@ -278,6 +482,8 @@ class LocalVoiceHandler:
         """停止监听"""
         with self.thread_lock:
             self.is_listening = False
+        if self.command_recognizer:
+            self.command_recognizer.stop()
         print("⏹️ 停止本地监听")
     
     def is_busy(self):
@@ -288,6 +494,7 @@ class LocalVoiceHandler:
         """停止语音播放"""
         try:
             self.tts_engine.stop()
+            self.end_playback()
             self.is_speaking = False
             print("⏹️ 停止语音播放")
         except Exception as e:
@@ -296,7 +503,15 @@ class LocalVoiceHandler:
     def __del__(self):
         """清理资源"""
         try:
-            if hasattr(self, 'audio'):
+            if hasattr(self, 'capture'):
+                self.capture.stop()
+            if isinstance(getattr(self, 'rec', None), RecognizerProcess):
+                self.rec.close()
+            if getattr(self, 'command_recognizer', None):
+                self.command_recognizer.close()
+            if getattr(self, 'rescorer', None):
+                self.rescorer.close()
+            if getattr(self, 'audio', None):
                 self.audio.terminate()
         except:
             pass
@@ -15,14 +15,44 @@ import re
 from deepseek_api import DeepSeekAPI
 from voice_handler_local import LocalVoiceHandler  # 改为使用本地语音识别
 from edge_tts_handler import EdgeTTSHandler
-from config import WINDOW_TITLE
+from local_skills import LocalSkillDispatcher
+from connection_warmer import ConnectionWarmer
+from idle_chatter import IdleChatterPrefetcher
+from semantic_cache import SemanticAnswerCache
+from intent_engine import INTENT_SEARCH
+from ui_jitter import FrameJitterMonitor
+from config import WINDOW_TITLE, EDGE_TTS_HOST, RECOGNIZER_OUT_OF_PROCESS
 
 class VoicePet:
     def __init__(self):
         self.root = tk.Tk()
+        # 测量界面卡顿，对比语音识别在进程内/独立进程时动画是否流畅
+        self.jitter_monitor = FrameJitterMonitor(self.root)
+        self.jitter_monitor.start()
         self.api = DeepSeekAPI()
         self.voice = LocalVoiceHandler()  # 使用本地语音处理器
         self.tts = EdgeTTSHandler()
+        self.skills = LocalSkillDispatcher()  # 本地技能，简单意图不走网络
+        self.semantic_cache = SemanticAnswerCache()  # 相似问题复用旧答案
+        self.retry_question = None  # 用户说答错了时需要重新回答的问题
+        
+        # 连接预热：启动时和用户开始说话时提前建立连接
+        self.warmer = ConnectionWarmer(self.api.session, [self.api.base_url], [EDGE_TTS_HOST])
+        self.api.connection_warmer = self.warmer
+        self.voice.partial_callback = self.on_voice_partial
+        self.warmer.warm_async()
+        
+        # 插话：桌宠说话时继续监听，用户开口就停止播放并开始新一轮对话
+        self.tts.on_playback_start = self.voice.start_playback
+        self.tts.on_playback_end = self.voice.end_playback
+        self.voice.barge_in_callback = self.on_barge_in
+        self.voice.barge_in_missed_callback = self.on_barge_in_missed
+        self.barge_in_pending = False
+        # 语音指令：小模型限定语法识别，"停"之类的指令不用等大模型
+        self.voice.command_callback = self.on_voice_command
+        
+        # 闲聊预生成：安静时提前准备好带上下文的闲聊和语音
+        self.idle_chatter = IdleChatterPrefetcher(self.api, self.tts)
         self.conversation_history = []
         
         # 状态控制
@@ -53,6 +83,9 @@ class VoicePet:
             "主人主人，笨逼有话要说~"
         ]
         
+        # 注册依赖桌宠状态的本地技能
+        self.setup_local_skills()
+        
         # 初始化动画队列
         self.shuffle_animation_queue()
         
@@ -390,6 +423,26 @@ class VoicePet:
         print("🎙️ 启动自动语音监听...")
         self.voice.start_continuous_listening(callback=self.on_voice_input)
     
+    def on_voice_partial(self, partial_text):
+        """语音识别中间结果回调（在识别线程中调用）"""
+        self.warmer.on_voice_activity()
+        # 识别出搜索意图就趁用户还在说话时提前搜索
+        self.api.speculative_search.feed(partial_text)
+    
+    def on_barge_in(self):
+        """用户在桌宠说话时开口（在识别线程中调用）"""
+        self.barge_in_pending = True
+        self.root.after(0, self.interrupt_speech)
+    
+    def on_barge_in_missed(self):
+        """插话的这句话没识别出内容（在识别线程中调用），下一句不再当作插话"""
+        self.barge_in_pending = False
+    
+    def on_voice_command(self, name, phrase):
+        """语音指令回调（在指令识别线程中调用）"""
+        if name == 'stop' and self.is_speaking:
+            self.root.after(0, self.interrupt_speech)
+    
     def on_voice_input(self, text):
         """语音输入回调"""
         print(f"🎤 收到语音: {text}")
@@ -409,6 +462,7 @@ class VoicePet:
         
         if is_error:
             print(f"🚫 检测到错误信息，不发送给API: {text}")
+            self.api.speculative_search.discard()
             return
         
         # 更新活动时间
@@ -425,9 +479,23 @@ class VoicePet:
 
     def process_voice_input(self, text):
         """处理语音输入"""
+        if self.barge_in_pending and self.skills.match(text, busy=True):
+            # 插话本身就是"别说了"之类的指令，播放已经停了，不再开始新一轮
+            self.barge_in_pending = False
+            self.api.speculative_search.discard()
+            return
+        
         if self.is_processing or self.is_speaking:
+            if self.barge_in_pending:
+                # 插话打断后上一轮还在收尾，稍后作为新一轮处理
+                self.root.after(100, lambda: self.process_voice_input(text))
+                return
+            # 忙碌时只响应"别说了"之类可以打断的本地指令，这句话的预测搜索用不上了
+            self.skills.dispatch(text, busy=True)
+            self.api.speculative_search.discard()
             return
         
+        self.barge_in_pending = False
         self.is_processing = True
         print(f"🤔 正在处理: {text}")
         
@@ -460,15 +528,90 @@ class VoicePet:
                 print(f"语音处理失败: {str(e)}")
             finally:
                 self.is_processing = False
+                # 对话结束后趁安静准备下一次闲聊
+                self.idle_chatter.prefetch_async(self.conversation_history)
         
         thread = threading.Thread(target=process_thread)
         thread.daemon = True
         thread.start()
 
+    def setup_local_skills(self):
+        """注册需要操作桌宠的本地技能"""
+        self.skills.register(
+            'stop_speaking',
+            r'(?:笨逼)?(?:停止说话|停下|停|别说了|不要说了|闭嘴|安静)(?:吧|啦|了)?',
+            self.handle_stop_speaking_skill,
+            allow_while_busy=True
+        )
+        self.skills.register(
+            'wrong_answer',
+            r'(?:笨逼)?(?:你)?(?:回答|答|说)错了|不对(?:吧|啊|呀)?',
+            self.handle_wrong_answer_skill
+        )
+        self.skills.register(
+            'switch_model',
+            r'(?:切换|换)(?:一下|个)?(?:AI|ai)?模型|(?:切换|换)到?(?P<target>.+?)模型',
+            self.handle_switch_model_skill
+        )
+    
+    def handle_wrong_answer_skill(self, match):
+        """本地技能：用户说答错了，如果上一个答案是复用的就记一次误命中，由正常流程重新回答原问题"""
+        hit = self.semantic_cache.report_false_hit()
+        if hit:
+            self.retry_question = hit['question']
+        # 重新回答要走网络，不算本地处理
+        return None
+    
+    def handle_stop_speaking_skill(self, match):
+        """本地技能：停止说话"""
+        was_speaking = self.is_speaking
+        self.root.after(0, self.interrupt_speech)
+        # 正在说话时直接打断，不再回复
+        return "" if was_speaking else "[emotion:shy] 好的，笨逼安静啦~"
+    
+    def handle_switch_model_skill(self, match):
+        """本地技能：切换模型，说了模型名就切到对应模型，否则切到下一个"""
+        models = self.api.get_available_models()
+        target = match.group('target') or ''
+        keywords = {'推理': 'R1', 'r1': 'R1', '代码': '代码', '编程': '代码', '聊天': 'Chat', '对话': 'Chat'}
+        
+        model_name = None
+        for keyword, model_keyword in keywords.items():
+            if keyword in target.lower():
+                model_name = next((m for m in models if model_keyword in m), None)
+                break
+        if not model_name:
+            current_index = models.index(self.api.get_current_model_name())
+            model_name = models[(current_index + 1) % len(models)]
+        
+        if self.api.set_model(model_name):
+            return f"[emotion:happy] 已经切换到{model_name}啦~"
+        return "[emotion:sad] 模型切换失败了..."
+    
     def get_ai_response(self, text):
         """获取AI回复"""
         try:
-            response = self.api.chat(text, self.conversation_history)
+            # 先尝试本地技能，命中则不走网络
+            local_response = self.skills.dispatch(text)
+            # 答错了技能已经处理过上一轮的复用记录，之后的句子不能再反馈
+            retry_question, self.retry_question = self.retry_question, None
+            self.semantic_cache.clear_last_hit()
+            if local_response is not None:
+                # 不走对话接口，这句话说话时发起的预测搜索不会被取用
+                self.api.speculative_search.discard()
+                return local_response
+            
+            # 知识类问题先找语义相近的旧问题，复用答案；用户说答错了时直接重新回答原问题
+            question = retry_question or text
+            reusable = retry_question is None and self.api.search_api.classify(text).kind == INTENT_SEARCH
+            response = self.semantic_cache.lookup(text) if reusable else None
+            if response is not None:
+                self.api.speculative_search.discard()
+            else:
+                response = self.api.chat(question, self.conversation_history)
+                # 只缓存带情绪标签的正常回复，不缓存错误信息
+                if (reusable or retry_question) and response.startswith('[emotion:'):
+                    self.semantic_cache.add(question, response)
             
             # 更新对话历史
             self.conversation_history.append({"role": "user", "content": text})
@@ -541,9 +684,51 @@ class VoicePet:
             # 如果动画文件不存在，恢复事件动画状态
             self.is_playing_event_animation = False
 
+    def print_stats(self):
+        """打印本次运行的性能统计"""
+        skill_stats = self.skills.get_stats()
+        print(f"⚡ 本地技能: {skill_stats['local_turns']}/{skill_stats['total_turns']} 次对话未走网络")
+        warm_stats = self.warmer.get_stats()
+        print(f"🔥 连接预热: 冷连接 {warm_stats['avg_cold_ms']:.0f}ms / 热连接 {warm_stats['avg_hot_ms']:.0f}ms，"
+              f"{warm_stats['warm_requests']} 次请求用上热连接，约节省 {warm_stats['estimated_saved_ms']:.0f}ms")
+        search_cache_stats = self.api.search_api.cache.get_stats()
+        print(f"📦 搜索缓存: 命中率 {search_cache_stats['hit_rate']:.0%}（有结果 {search_cache_stats['hits']} 次 / "
+              f"无结果 {search_cache_stats['negative_hits']} 次 / 未命中 {search_cache_stats['misses']} 次），"
+              f"清理过期 {search_cache_stats['purged']} 条")
+        for name, provider_stats in self.api.search_api.get_provider_stats().items():
+            print(f"🔍 搜索提供方[{name}]: 调用 {provider_stats['calls']} 次，胜出率 {provider_stats['win_rate']:.0%}，"
+                  f"出错 {provider_stats['errors']} 次，平均 {provider_stats['avg_latency_ms']:.0f}ms")
+        speculative_stats = self.api.speculative_search.get_stats()
+        print(f"🔮 预测搜索: 发起 {speculative_stats['launched']} 次，用上 {speculative_stats['used']} 次，"
+              f"平均提前 {speculative_stats['avg_saved_ms']:.0f}ms")
+        cache_stats = self.semantic_cache.get_stats()
+        print(f"🧠 语义缓存: 命中率 {cache_stats['hit_rate']:.0%} ({cache_stats['hits']}/{cache_stats['lookups']})，"
+              f"误命中反馈 {cache_stats['false_hits']} 次")
+        if hasattr(self.voice, 'get_stats'):
+            vad_stats = self.voice.get_stats()
+            print(f"🎚️ 语音VAD: 跳过 {vad_stats['skipped_fraction']:.0%} 的音频（共 {vad_stats['audio_seconds']:.0f}s），"
+                  f"约节省识别CPU {vad_stats['cpu_saved_seconds']:.1f}s")
+            print(f"🧮 识别CPU: 完整识别 {vad_stats['recognizer_cpu_seconds']:.1f}s / "
+                  f"指令识别 {vad_stats['command_cpu_seconds']:.1f}s")
+            rescore_stats = vad_stats['rescore']
+            if rescore_stats:
+                print(f"🔁 大模型复核: 小模型加载 {vad_stats['model_load_seconds']:.1f}s / 大模型加载 "
+                      f"{rescore_stats['load_seconds']:.1f}s，修正 {rescore_stats['corrections']}/{rescore_stats['rescored']} 句，"
+                      f"超时 {rescore_stats['timeouts']} 句，跟不上跳过 {rescore_stats['skipped']} 句，"
+                      f"平均多等 {rescore_stats['avg_wait_ms']:.0f}ms")
+        jitter_stats = self.jitter_monitor.get_stats()
+        mode = "独立进程" if RECOGNIZER_OUT_OF_PROCESS else "进程内"
+        print(f"🎞️ 界面延迟（识别{mode}）: 中位 {jitter_stats['p50_ms']:.1f}ms / 95分位 {jitter_stats['p95_ms']:.1f}ms / "
+              f"最大 {jitter_stats['max_ms']:.0f}ms")
+        chatter_stats = self.idle_chatter.get_stats()
+        print(f"💭 闲聊预生成: 命中 {chatter_stats['served']} 次，未命中 {chatter_stats['misses']} 次，"
+              f"过期 {chatter_stats['expired']} 句，话题变了作废 {chatter_stats['stale']} 句")
+    
     def close_app(self):
         """关闭应用"""
         try:
+            self.print_stats()
+            
             # 停止所有活动
             self.voice.stop_listening()
             self.tts.stop_speaking()
@@ -658,6 +843,10 @@ class VoicePet:
                 importlib.reload(config)  # 重新加载配置
                 
                 self.api = DeepSeekAPI()
+                self.warmer.session = self.api.session
+                self.api.connection_warmer = self.warmer
+                self.warmer.warm_async(force=True)
+                self.idle_chatter.api = self.api
                 
                 if self.api.is_api_key_valid():
                     messagebox.showinfo("成功", "API Key设置成功！")
@@ -687,7 +876,12 @@ class VoicePet:
     def idle_chat(self):
         """闲置聊天"""
         if not self.is_processing and not self.is_speaking:
-            phrase = random.choice(self.idle_phrases)
+            # 优先使用预生成好的闲聊，语音已经合成好可以立即播放
+            prepared = self.idle_chatter.pop(self.conversation_history)
+            if prepared:
+                emotion, phrase, audio_data = prepared
+            else:
+                emotion, phrase, audio_data = None, random.choice(self.idle_phrases), None
             print(f"😴 闲置骚扰: {phrase}")
             
             # 不再停止监听，改为设置speaking标志
@@ -695,14 +889,19 @@ class VoicePet:
             self.is_speaking = True
             
             # 播放表情
-            self.switch_to_expression_animation()
+            if emotion:
+                self.play_emotion_animation(emotion)
+            else:
+                self.switch_to_expression_animation()
             
             def idle_speak():
-                self.tts.speak(phrase)
+                self.tts.speak(phrase, audio_data=audio_data)
                 # 等待TTS播放完成
                 while self.tts.is_speaking:
                     time.sleep(0.1)
                 self.is_speaking = False
+                # 为下一次闲置准备新的闲聊
+                self.idle_chatter.prefetch_async(self.conversation_history)
                 # 不再需要重新启动监听，因为监听从未停止
                 # self.start_auto_listening()  # 移除此行
             
@@ -738,6 +937,12 @@ class VoicePet:
         # 分隔线
         self.context_menu.add_separator()
         
+        # 语音模型还在后台下载时显示进度
+        self.model_progress_index = None
+        if self.voice.get_model_progress():
+            self.context_menu.add_command(label="📥 语音模型: 准备下载", state=tk.DISABLED)
+            self.model_progress_index = self.context_menu.index("end")
+
         # 其他功能
         self.context_menu.add_command(label="🎤 开始/停止监听", command=self.toggle_listening)
         self.context_menu.add_command(label="🤐 停止说话", command=self.interrupt_speech)
@@ -749,6 +954,7 @@ class VoicePet:
         try:
             # 更新当前模型状态显示
             self.update_model_menu_status()
+            self.update_model_download_status()
             
             # 显示右键菜单
             self.context_menu.post(event.x_root, event.y_root)
@@ -771,6 +977,23 @@ class VoicePet:
         except Exception as e:
             print(f"更新模型菜单状态失败: {str(e)}")
     
+    def update_model_download_status(self):
+        """更新语音模型下载进度显示"""
+        progress = self.voice.get_model_progress()
+        if self.model_progress_index is None or not progress:
+            return
+        if progress['state'] == 'downloading':
+            label = f"📥 语音模型: 下载中 {progress['percent']:.0f}%"
+        elif progress['state'] == 'extracting':
+            label = "📦 语音模型: 正在安装"
+        elif progress['state'] == 'done':
+            label = "✅ 语音模型: 已就绪"
+        elif progress['state'] == 'failed':
+            label = "❌ 语音模型: 下载失败"
+        else:
+            label = "📥 语音模型: 准备下载"
+        self.context_menu.entryconfig(self.model_progress_index, label=label)
+    
     def switch_model(self, model_name):
         """切换AI模型"""
         success = self.api.set_model(model_name)